@@ -0,0 +1,67 @@
+"""
+Compares the storage backends (STORAGE_BACKEND): the in-memory indexes against the SQLite
+database with its FTS5 index, for phrase, keyword (ranked) and category searches and detail
+lookups on synthetic directories, and reports the time to compile the database and its size.
+
+Run from the repository root:
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --sizes 10000,100000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_keyword_search import percentile, time_queries
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+PHRASE_QUERIES = ['youth', 'counseling', 'food', 'youth counseling', 'blue mountain church', 'mental health',
+                  'food vouchers', 'the', '(509)', 'crisis line']
+KEYWORD_QUERIES = ['youth', 'counseling', 'food', 'youth counseling', 'blue mountain church', 'mental health',
+                   'legal advice', 'senior housing assistance', 'hope', 'the']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated resource counts')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'operation':<16}{'backend':<9}{'p50 ms':>10}{'p99 ms':>10}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            web.CSV_FILE_NAME = os.path.join(tmp, 'directory.csv')
+            write_synthetic_csv(web.CSV_FILE_NAME, size)
+            web.load_data()
+            snapshot = web.SNAPSHOT
+
+            sqlite_backend = web.SQLiteBackend()
+            start = time.perf_counter()
+            sqlite_backend.compile(snapshot, web.CSV_FILE_NAME)
+            compile_seconds = time.perf_counter() - start
+            database_mb = os.path.getsize(sqlite_backend.path) / 1024 / 1024
+
+            resource_ids = list(snapshot.resources_by_id)[::max(1, len(snapshot.resources_by_id) // 50)]
+            categories = snapshot.categories + ['HEALTH', 'SERVICES', 'NOTHING']
+            for backend_name, backend in (('memory', web.MEMORY_BACKEND), ('sqlite', sqlite_backend)):
+                operations = {
+                    'phrase': (lambda query: backend.keyword_search(query, snapshot), PHRASE_QUERIES),
+                    'keyword': (lambda query: backend.ranked_search(query, snapshot), KEYWORD_QUERIES),
+                    'category': (lambda query: backend.category_search(query, snapshot), categories),
+                    'detail': (lambda resource_id: backend.get_resource(resource_id, snapshot), resource_ids),
+                }
+                for operation, (function, queries) in operations.items():
+                    samples = time_queries(function, queries, args.repeat)
+                    print(f"{size:>8}  {operation:<16}{backend_name:<9}{statistics.median(samples):>10.3f}"
+                          f"{percentile(samples, 99):>10.3f}")
+            print(f"{size:>8}  SQLite database compiled in {compile_seconds:.2f}s, {database_mb:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures the bytes sent and the latency of the home page, a category results page (rendered
+once and cached), a keyword results page (streamed) and a detail page, for each of the
+Accept-Encoding values identity, gzip and br, plus the stylesheet the pages link to, if any.
+
+Run from the repository root:
+    python benchmarks/bench_compression.py
+    python benchmarks/bench_compression.py --rows 1000 --repeat 50
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+
+from bench_keyword_search import percentile
+from bench_suite import time_calls
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+ENCODINGS = ('identity', 'gzip', 'br')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'directory.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, args.rows)
+        web.load_data()
+
+    if web.SEARCH_LOG is not None:
+        # Still recorded, like any search, but kept out of the real search log
+        web.SEARCH_LOG.path = os.devnull
+    client = web.app.test_client()
+    resource_id = next(iter(web.SNAPSHOT.resources_by_id))
+    urls = {
+        '/': '/',
+        '/results (category)': '/results?query=HEALTH&search_type=category',
+        '/results (keyword)': '/results?query=youth+counseling&search_type=keyword',
+        '/resource/<id>': f'/resource/{resource_id}',
+    }
+    stylesheet = re.search(r'<link rel="stylesheet" href="([^"]+)"', client.get('/').get_data(as_text=True))
+    if stylesheet:
+        urls['stylesheet'] = stylesheet.group(1)
+
+    print(f"{args.rows} resources")
+    print(f"{'page':<22}{'encoding':<10}{'bytes':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, url in urls.items():
+        for encoding in ENCODINGS:
+            headers = {'Accept-Encoding': encoding}
+            response = client.get(url, headers=headers)
+            body = response.get_data()
+            sent = response.headers.get('Content-Encoding', 'identity')
+            samples = time_calls(lambda _: client.get(url, headers=headers).get_data(), range(args.repeat), 1)
+            print(f"{label:<22}{sent:<10}{len(body):>10}{statistics.median(samples):>10.3f}"
+                  f"{percentile(samples, 99):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Times the data checks run on every load (validate_snapshot()) on synthetic directories,
+next to the time to parse the CSV they check, and lists how many rows failed each check.
+
+Run from the repository root:
+    python benchmarks/bench_data_health.py
+    python benchmarks/bench_data_health.py --sizes 100000,1000000 --repeat 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000', help='comma-separated resource counts')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'operation':<22}{'p50 ms':>10}{'max ms':>10}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'directory.csv')
+            write_synthetic_csv(path, size)
+            with open(path, 'rb') as f:
+                raw_csv = f.read()
+
+        start = time.perf_counter()
+        snapshot = web.parse_csv_snapshot(raw_csv, '', None)
+        parse_ms = (time.perf_counter() - start) * 1000
+        print(f"{size:>8}  {'parse CSV':<22}{parse_ms:>10.3f}{parse_ms:>10.3f}")
+
+        samples = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            report = web.validate_snapshot(snapshot, snapshot, source=path)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{size:>8}  {'validate_snapshot':<22}{statistics.median(samples):>10.3f}{max(samples):>10.3f}")
+        print(f"{size:>8}  failed checks: {dict(report.counts) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmarks the near search on synthetic directories: locating the addresses and building the
+spatial grid at load time, and the k nearest open resources to an origin through the grid
+against a scan computing the distance to every located resource.
+
+Run from the repository root:
+    python benchmarks/bench_geo.py
+    python benchmarks/bench_geo.py --sizes 10000,100000,1000000 --k 10,100
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_keyword_search import percentile, time_queries
+from synthetic_directory import TOWNS, write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+
+def scan_nearest(snapshot, latitude, longitude, mask, k):
+    """The k nearest by computing every distance, what the grid avoids."""
+    bits = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    distances = [
+        (snapshot.spatial_grid.miles(location, latitude, longitude), index)
+        for index, location in snapshot.locations.items()
+        if location.latitude is not None and index >> 3 < len(bits) and bits[index >> 3] >> (index & 7) & 1
+    ]
+    distances.sort()
+    return distances[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma-separated resource counts')
+    parser.add_argument('--k', default='10,100', help='comma-separated numbers of nearest resources')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Every town's ZIP code, and points scattered over the region around them
+    origins = [web.GAZETTEER.zip_codes[zip_code][2:] for _, _, zip_code in TOWNS]
+    origins += [(rng.uniform(45.5, 46.5), rng.uniform(-119.5, -117.8)) for _ in range(len(origins))]
+
+    print(f"{'rows':>8}  {'benchmark':<28}{'p50 ms':>10}{'p99 ms':>10}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        with tempfile.TemporaryDirectory() as tmp:
+            web.CSV_FILE_NAME = os.path.join(tmp, 'directory.csv')
+            write_synthetic_csv(web.CSV_FILE_NAME, size)
+            web.load_data()
+        snapshot = web.SNAPSHOT
+        mask = web.facet_mask(snapshot, ())
+
+        samples = []
+        for _ in range(3):
+            start = time.perf_counter()
+            web.SpatialGrid(web.locate_resources(snapshot.resources, web.GAZETTEER))
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{size:>8}  {'locate + build grid':<28}{statistics.median(samples):>10.3f}{max(samples):>10.3f}")
+
+        for k in (int(k) for k in args.k.split(',')):
+            for label, nearest in (
+                ('grid', lambda origin: snapshot.spatial_grid.nearest(*origin, mask, k)),
+                ('scan', lambda origin: scan_nearest(snapshot, *origin, mask, k)),
+            ):
+                samples = time_queries(nearest, origins, args.repeat)
+                print(f"{size:>8}  {f'{k} nearest ({label})':<28}{statistics.median(samples):>10.3f}"
+                      f"{percentile(samples, 99):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
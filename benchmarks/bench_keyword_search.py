@@ -0,0 +1,91 @@
+"""
+Compares keyword_search latency using the prebuilt word index against the
+per-request regex scan over every valid resource, on a synthetic directory,
+and the memory the Resource records take next to the CSV rows they are built from.
+
+Run from the repository root:
+    python benchmarks/bench_keyword_search.py --rows 100000
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+from synthetic_directory import write_synthetic_csv  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def time_queries(search, queries, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            search(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def traced_mb(build):
+    """Returns what build() returns and the memory (MB) still allocated by it afterwards."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        return kept, tracemalloc.get_traced_memory()[0] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'synthetic.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, args.rows)
+        start = time.perf_counter()
+        web.load_data()
+        print(f"load_data() with index build: {time.perf_counter() - start:.2f}s for {len(web.SNAPSHOT.resources)} rows")
+        with open(web.CSV_FILE_NAME, 'rb') as f:
+            raw_csv = f.read()
+
+    headers = web.find_headers(web.read_csv_rows(raw_csv))
+    _, rows_mb = traced_mb(lambda: web.read_csv_rows(raw_csv))
+    _, resources_mb = traced_mb(lambda: web.build_resources(web.read_csv_rows(raw_csv), headers))
+    print(f"memory: CSV rows {rows_mb:.1f} MB, Resource records {resources_mb:.1f} MB")
+
+    queries = [q.upper() for q in web.SNAPSHOT.common_keywords] + ['FOOD VOUCHERS', 'YOUTH COUNSELING', 'HOPE', 'THE']
+    snapshot = web.SNAPSHOT
+    resource_rows = web.get_resource_rows_with_index(snapshot.resources)
+
+    def indexed(query):
+        return web.keyword_search(query, snapshot)
+
+    def scan(query):
+        return web.scan_keyword_rows(query, web.get_resource_rows_with_index(snapshot.resources))
+
+    for query in queries:
+        assert indexed(query) == web.scan_keyword_rows(query, resource_rows), query
+
+    scan_samples = time_queries(scan, queries, 1)
+    index_samples = time_queries(indexed, queries, args.repeat)
+    print(f"{'':<12}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, samples in (('regex scan', scan_samples), ('word index', index_samples)):
+        print(f"{label:<12}{statistics.median(samples):>10.3f}{percentile(samples, 99):>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
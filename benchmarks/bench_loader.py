@@ -0,0 +1,63 @@
+"""
+Compares a cold import of the app against the same import with pandas loaded up
+front, as the module used to do. Both starts parse the CSV (no snapshot file) in a
+fresh interpreter and report wall time and resident memory. The RSS figures are read
+from /proc, so they are Linux only. That the stdlib loader gives the rows pandas gave
+is checked by tests/test_loader.py.
+
+Run from the repository root:
+    python benchmarks/bench_loader.py
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import serviceproviderWeb as web  # noqa: E402
+
+# ru_maxrss survives exec on Linux, so read the resident size of the new process from /proc
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+{preload}
+import serviceproviderWeb
+seconds = time.perf_counter() - start
+with open('/proc/self/status') as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+print(seconds, rss_kb, 'pandas' in sys.modules)
+"""
+
+
+def time_startup(work_dir, preload):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    snapshot_path = os.path.join(work_dir, web.CSV_FILE_NAME + web.SNAPSHOT_FILE_SUFFIX)
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT.format(preload=preload)], cwd=work_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[-3]), int(output[-2]) / 1024, output[-1] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(REPO_DIR, web.CSV_FILE_NAME))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(args.csv, os.path.join(tmp, web.CSV_FILE_NAME))
+        print(f"{'':<18}{'median s':>10}{'RSS MB':>13}  pandas imported")
+        for label, preload in (('stdlib loader', ''), ('pandas imported', 'import pandas')):
+            runs = [time_startup(tmp, preload) for _ in range(args.repeat)]
+            print(f"{label:<18}{statistics.median(r[0] for r in runs):>10.3f}"
+                  f"{statistics.median(r[1] for r in runs):>13.1f}  {runs[-1][2]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Latency and relevance harness for the BM25 ranked keyword search.
+
+Latency: p50/p99 of ranked_search on a synthetic directory (100k rows by default), for the
+top-k and for RANKED_SEARCH_LIMIT results. The run fails if a p99 is over the budget.
+Relevance: recall@k of the limited ranking against the full (unlimited) ranking on the
+synthetic directory, which must be 1.0 with the same order, and a few judged queries on the
+shipped sheet, each listing names that should appear in the top results.
+
+Run from the repository root:
+    python benchmarks/bench_ranked_search.py --rows 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+from bench_keyword_search import percentile, time_queries
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+SYNTHETIC_QUERIES = ['youth', 'counseling', 'youth counseling', 'food vouchers', 'blue mountain church',
+                     'family health care', 'senior housing assistance', 'kids club', 'legal advice', 'hope']
+
+# (query, names expected among the top results) for the shipped sheet
+JUDGED_QUERIES = [
+    ('food bank', ['BMAC Food Bank']),
+    ('youth counseling', ['Anchor Point Counseling']),
+    ('blue mountain counseling', ['Blue Mountain Counseling']),
+    ('ymca', ['Walla Walla YMCA']),
+]
+# Slowest a ranked search may be (p99) on the synthetic directory
+BUDGET_MS = 1.0
+
+
+def judge_shipped_sheet(top_k):
+    web.CSV_FILE_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'CapstoneSpreadsheet - Sheet1.csv')
+    web.load_data()
+    found = 0
+    for query, expected_names in JUDGED_QUERIES:
+        top_names = [resource.name for _, resource in web.ranked_search(query, web.SNAPSHOT, top_k)]
+        hits = [name for name in expected_names if name in top_names]
+        found += len(hits)
+        print(f"  {query!r:<28} {len(hits)}/{len(expected_names)} expected in top {top_k}: {top_names[:3]}")
+    total = sum(len(names) for _, names in JUDGED_QUERIES)
+    print(f"Judged queries: {found}/{total} expected resources in the top {top_k}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--top-k', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    judge_shipped_sheet(args.top_k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'synthetic.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, args.rows)
+        web.load_data()
+    snapshot = web.SNAPSHOT
+
+    recalls = []
+    for query in SYNTHETIC_QUERIES:
+        exhaustive = [index for index, _ in web.ranked_search(query, snapshot, None)[:args.top_k]]
+        limited = [index for index, _ in web.ranked_search(query, snapshot, args.top_k)]
+        recalls.append(len(set(exhaustive) & set(limited)) / max(1, len(exhaustive)))
+        assert limited == exhaustive, f"{query!r}: top {args.top_k} differs from the full ranking"
+    print(f"\n{len(snapshot.resources)} synthetic rows: mean recall@{args.top_k} against exhaustive BM25 "
+          f"{statistics.mean(recalls):.3f} (min {min(recalls):.3f})")
+    assert min(recalls) == 1.0
+
+    print(f"{'limit':<12}{'p50 ms':>10}{'p99 ms':>10}")
+    for limit in (args.top_k, web.RANKED_SEARCH_LIMIT):
+        samples = time_queries(lambda query: web.ranked_search(query, snapshot, limit), SYNTHETIC_QUERIES,
+                               args.repeat)
+        print(f"{limit:<12}{statistics.median(samples):>10.3f}{percentile(samples, 99):>10.3f}")
+        assert percentile(samples, 99) < args.budget_ms, \
+            f"limit {limit}: p99 {percentile(samples, 99):.3f} ms is over the {args.budget_ms} ms budget"
+
+
+if __name__ == '__main__':
+    main()
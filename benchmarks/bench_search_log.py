@@ -0,0 +1,88 @@
+"""
+Measures what the search log costs: /results latency with the log on and off (alternating rounds,
+so drift on the machine hits both alike), the time of one SearchLog.record() on the request path,
+and the time the search-report command takes to aggregate a large log.
+
+Run from the repository root:
+    python benchmarks/bench_search_log.py
+    python benchmarks/bench_search_log.py --rows 1000 --log-entries 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_keyword_search import percentile
+from bench_suite import time_calls
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+URLS = ['/results?query=youth&search_type=keyword', '/results?query=youth+counseling&search_type=keyword',
+        '/results?query=food&search_type=phrase', '/results?query=HEALTH&search_type=category']
+QUERIES = ['YOUTH', 'COUNSELING', 'FOOD', 'FOOD BANK', 'MENTAL HEALTH', 'HOUSING', 'LEGAL ADVICE', 'ZZQ']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--log-entries', type=int, default=200000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'directory.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, args.rows)
+        web.load_data()
+
+        search_log = web.SEARCH_LOG or web.SearchLog('')
+        search_log.path = os.path.join(tmp, 'searches.jsonl')
+        client = web.app.test_client()
+
+        def get(url):
+            response = client.get(url)
+            response.get_data()
+            response.close()
+
+        print(f"{'benchmark':<28}{'p50 ms':>10}{'p99 ms':>10}")
+        samples = {'off': [], 'on': []}
+        for _ in range(args.rounds):
+            for state, value in (('off', None), ('on', search_log)):
+                web.SEARCH_LOG = value
+                samples[state] += time_calls(get, URLS * args.repeat, 1)
+        for state, state_samples in samples.items():
+            print(f"{f'/results, search log {state}':<28}{statistics.median(state_samples):>10.3f}"
+                  f"{percentile(state_samples, 99):>10.3f}")
+
+        entry = (time.time(), 'YOUTH', 'keyword', (), (), 12)
+        start = time.perf_counter()
+        for _ in range(100000):
+            search_log.record((*entry, 0.001, 200))
+        print(f"{'SearchLog.record()':<28}{(time.perf_counter() - start) * 10:>10.4f}  (microseconds)")
+
+        # A log of searches spread over a month, then aggregated like the search-report command does
+        rng = random.Random(0)
+        search_log.buffer.clear()
+        now = time.time()
+        for i in range(args.log_entries):
+            query = rng.choice(QUERIES)
+            search_log.buffer.append((now - rng.uniform(0, 30 * 86400), query, rng.choice(['keyword', 'phrase']),
+                                      (), (), 0 if query == 'ZZQ' else rng.randint(1, 100), rng.uniform(0.0002, 0.01),
+                                      200))
+            if len(search_log.buffer) == search_log.buffer.maxlen:
+                search_log.flush()
+        search_log.flush()
+        start = time.perf_counter()
+        web.aggregate_search_log(search_log.path)
+        print(f"aggregate {args.log_entries} entries ({os.path.getsize(search_log.path) / 1024 / 1024:.1f} MB): "
+              f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmarks loading a data directory of several sheets (e.g. one per county): the first load,
+which parses every sheet, against a reload after one sheet changed, which only parses that
+sheet again (also right after a restart, from the saved sheet files) and splices the others
+into the merge, and against one CSV holding the same resources.
+
+Run from the repository root:
+    python benchmarks/bench_sheets.py                     # 8 sheets of 5k resources
+    python benchmarks/bench_sheets.py --sheets 20 --rows 20000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+
+def time_load(path, repeat, before_each):
+    """Loads path repeat times, calling before_each(i) first, and returns the median seconds."""
+    web.CSV_FILE_NAME = path
+    samples = []
+    for i in range(repeat):
+        before_each(i)
+        start = time.perf_counter()
+        web.load_data()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def remove_snapshot(path):
+    snapshot_path = os.path.normpath(path) + web.SNAPSHOT_FILE_SUFFIX
+    if os.path.exists(snapshot_path):
+        os.remove(snapshot_path)
+
+
+def remove_sheet_files(directory):
+    for name in os.listdir(directory):
+        if name.endswith(web.SHEET_FILE_SUFFIX):
+            os.remove(os.path.join(directory, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sheets', type=int, default=8)
+    parser.add_argument('--rows', type=int, default=5000, help='resources per sheet')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, 'sheets')
+        os.mkdir(directory)
+        for i in range(args.sheets):
+            write_synthetic_csv(os.path.join(directory, f'county-{i:02}.csv'), args.rows, seed=i)
+        single_csv = os.path.join(tmp, 'directory.csv')
+        write_synthetic_csv(single_csv, args.sheets * args.rows)
+
+        def cold(_):
+            remove_snapshot(directory)
+            remove_sheet_files(directory)
+            web.SHEETS.clear()
+
+        def one_sheet_changed(i):
+            remove_snapshot(directory)
+            write_synthetic_csv(os.path.join(directory, 'county-00.csv'), args.rows, seed=1000 + i)
+
+        def one_sheet_changed_after_restart(i):
+            one_sheet_changed(args.repeat + i)
+            web.SHEETS.clear()
+
+        results = [
+            ('single CSV, parsed', time_load(single_csv, args.repeat, lambda _: remove_snapshot(single_csv))),
+            ('directory, all sheets parsed', time_load(directory, args.repeat, cold)),
+            ('directory, one sheet changed', time_load(directory, args.repeat, one_sheet_changed)),
+            ('one sheet changed, restarted', time_load(directory, args.repeat, one_sheet_changed_after_restart)),
+            ('directory, snapshot file', time_load(directory, args.repeat, lambda _: web.SHEETS.clear())),
+        ]
+        resources = len(web.SNAPSHOT.resources_by_id)
+
+    print(f"{args.sheets} sheets x {args.rows} resources ({resources} after removing duplicates), "
+          f"{os.cpu_count()} CPUs")
+    for label, seconds in results:
+        print(f"{label:<32}{seconds:>8.3f} s")
+
+
+if __name__ == '__main__':
+    main()
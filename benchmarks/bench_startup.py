@@ -0,0 +1,68 @@
+"""
+Compares cold start of the app with and without a saved snapshot file: the first
+start parses the CSV, later starts map the snapshot instead.
+Each start is a fresh interpreter importing serviceproviderWeb.
+
+Run from the repository root:
+    python benchmarks/bench_startup.py --rows 100000
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from synthetic_directory import write_synthetic_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports the app (which loads the CSV from the working directory) and reports the time taken
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import serviceproviderWeb
+print(time.perf_counter() - start, len(serviceproviderWeb.SNAPSHOT.resources), 'pandas' in sys.modules)
+"""
+
+
+def time_startup(work_dir):
+    env = dict(os.environ, PYTHONPATH=REPO_DIR)
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=work_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return float(output[-3]), int(output[-2]), output[-1] == 'True'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'CapstoneSpreadsheet - Sheet1.csv')
+        snapshot_path = csv_path + '.snapshot'
+        write_synthetic_csv(csv_path, args.rows)
+
+        parse_times = []
+        for _ in range(args.repeat):
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            seconds, rows, used_pandas = time_startup(tmp)
+            parse_times.append(seconds)
+
+        snapshot_times = []
+        for _ in range(args.repeat):
+            seconds, snapshot_rows, snapshot_pandas = time_startup(tmp)
+            snapshot_times.append(seconds)
+        assert snapshot_rows == rows
+
+        print(f"{rows} rows, snapshot file {os.path.getsize(snapshot_path) / 1e6:.1f} MB")
+        print(f"{'':<16}{'median s':>10}{'min s':>10}  pandas imported")
+        print(f"{'CSV parse':<16}{statistics.median(parse_times):>10.3f}{min(parse_times):>10.3f}  {used_pandas}")
+        print(f"{'snapshot file':<16}{statistics.median(snapshot_times):>10.3f}{min(snapshot_times):>10.3f}  "
+              f"{snapshot_pandas}")
+
+
+if __name__ == '__main__':
+    main()
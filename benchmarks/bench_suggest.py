@@ -0,0 +1,67 @@
+"""
+Latency of the as-you-type suggestions and the typo-tolerant keyword search.
+
+Times suggest() on every prefix of a few queries (one call per keystroke) and ranked_search()
+on misspelled queries, on the shipped sheet and on a synthetic directory (100k rows by
+default), without the /api/suggest answer cache.
+
+Run from the repository root:
+    python benchmarks/bench_suggest.py --rows 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+from bench_keyword_search import percentile, time_queries
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+TYPED_QUERIES = ['counseling', 'ymca', 'food bank', 'blue mountain church', 'youth services']
+MISSPELLED_QUERIES = ['counceling', 'ymc', 'chruch', 'blue mountian', 'yuoth servises', 'helth care']
+
+
+def keystrokes(queries):
+    """Every prefix of every query, as sent while it is being typed."""
+    return [query[:end] for query in queries for end in range(1, len(query) + 1) if query[:end].strip()]
+
+
+def report(label, snapshot, repeat):
+    print(f"\n{label}: {len(snapshot.resources)} rows, {len(snapshot.terms)} indexed terms")
+    for query in MISSPELLED_QUERIES:
+        suggestions, _ = web.suggest(query, snapshot)
+        print(f"  {query!r:<20} -> {suggestions[:3]}")
+
+    print(f"{'operation':<24}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, search, queries in (
+            ('suggest (keystrokes)', lambda query: web.suggest(query, snapshot), keystrokes(TYPED_QUERIES)),
+            ('ranked_search (typos)', lambda query: web.ranked_search(query, snapshot), MISSPELLED_QUERIES),
+    ):
+        samples = time_queries(search, queries, repeat)
+        print(f"{name:<24}{statistics.median(samples):>10.3f}{percentile(samples, 99):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    web.CSV_FILE_NAME = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'CapstoneSpreadsheet - Sheet1.csv')
+    web.load_data()
+    report('Shipped sheet', web.SNAPSHOT, args.repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'synthetic.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, args.rows)
+        web.load_data()
+    report('Synthetic directory', web.SNAPSHOT, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Benchmark suite: loading, searching and every route, on synthetic directories of several
+sizes, with a regression report against a stored baseline.
+
+For each size it times load_data() from the CSV and from the snapshot file, keyword_search
+(phrase), ranked_search, category_block_search and suggest, and each route through Flask's
+test client, each after one untimed call (result caches warm, as in production, even with a
+small --repeat, but no conditional requests).
+The p50/p99 of each benchmark is compared with the baseline and the run fails (exit status 1)
+when a p50 is more than --threshold slower, and by more than --min-delta-ms (sub-millisecond
+timings jitter by a few tenths of a millisecond between runs).
+
+Run from the repository root:
+    python benchmarks/bench_suite.py                      # 1k and 10k rows, compare with baseline
+    python benchmarks/bench_suite.py --sizes 1000,10000,100000,1000000 --repeat 5
+    python benchmarks/bench_suite.py --save-baseline      # after an intended change
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from bench_keyword_search import percentile
+from synthetic_directory import write_synthetic_csv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serviceproviderWeb as web  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+KEYWORD_QUERIES = ['youth', 'counseling', 'food', 'youth counseling', 'blue mountain church', 'mental health',
+                   'legal advice', 'senior housing assistance', 'hope', 'the']
+TYPED_QUERIES = ['c', 'co', 'cou', 'coun', 'counc', 'yo', 'you', 'yout', 'foo', 'heal']
+
+
+def time_calls(function, arguments, repeat, warm_up=False):
+    """Calls function(argument) for every argument, repeat times over, and returns the durations in ms.
+
+    With warm_up, every argument is called once untimed first, so that the caches are warm even
+    when repeat is small.
+    """
+    if warm_up:
+        for argument in arguments:
+            function(argument)
+    samples = []
+    for _ in range(repeat):
+        for argument in arguments:
+            start = time.perf_counter()
+            function(argument)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    return {'p50_ms': round(statistics.median(samples), 4), 'p99_ms': round(percentile(samples, 99), 4),
+            'calls': len(samples)}
+
+
+def run_size(rows, repeat):
+    """Runs every benchmark on a directory of the given number of resources, returning their summaries."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        web.CSV_FILE_NAME = os.path.join(tmp, 'directory.csv')
+        write_synthetic_csv(web.CSV_FILE_NAME, rows)
+        snapshot_path = web.CSV_FILE_NAME + web.SNAPSHOT_FILE_SUFFIX
+
+        def load_from_csv(_):
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            web.load_data()
+
+        # Loads are slow on large directories, so they run fewer times than the queries
+        load_repeat = max(1, min(repeat, 3))
+        results['load_data (csv)'] = summarize(time_calls(load_from_csv, [None], load_repeat))
+        results['load_data (snapshot)'] = summarize(time_calls(lambda _: web.load_data(), [None], load_repeat))
+
+    snapshot = web.SNAPSHOT
+    categories = snapshot.categories
+    valid_ids = [resource.resource_id for _, resource in web.get_resource_rows_with_index(snapshot.resources)]
+    detail_ids = valid_ids[::max(1, len(valid_ids) // 20)][:20]
+
+    searches = {
+        'keyword_search': (lambda query: web.keyword_search(query, snapshot), KEYWORD_QUERIES),
+        'ranked_search': (lambda query: web.ranked_search(query, snapshot), KEYWORD_QUERIES),
+        'category_block_search': (lambda query: web.category_block_search(query, snapshot),
+                                  categories + ['HEALTH', 'SERVICES', 'NOTHING']),
+        'suggest': (lambda query: web.suggest(query, snapshot), TYPED_QUERIES),
+    }
+    for name, (search, queries) in searches.items():
+        results[name] = summarize(time_calls(search, queries, repeat, warm_up=True))
+
+    if web.SEARCH_LOG is not None:
+        # Still recorded, like any search, but kept out of the real search log
+        web.SEARCH_LOG.path = os.devnull
+    client = web.app.test_client()
+    routes = {
+        'GET /': ['/'],
+        'GET /results (keyword)': [f'/results?query={query}&search_type=keyword' for query in KEYWORD_QUERIES],
+        'GET /results (phrase)': [f'/results?query={query}&search_type=phrase' for query in KEYWORD_QUERIES],
+        'GET /results (category)': [f'/results?query={category}&search_type=category' for category in categories],
+        'GET /results (facets)': [f'/results?query={query}&search_type=keyword&has=website&category={categories[0]}'
+                                  for query in KEYWORD_QUERIES] + ['/results?has=email', '/results?status=closed'],
+        'GET /results (near)': [f'/results?query={query}&search_type=keyword&near=99362' for query in KEYWORD_QUERIES]
+                               + ['/results?near=97801', '/results?near=46.1,-118.3&within=10'],
+        'GET /resource/<id>': [f'/resource/{resource_id}' for resource_id in detail_ids],
+        'GET /api/search': [f'/api/search?query={query}' for query in KEYWORD_QUERIES],
+        'GET /api/search (ndjson)': [f'/api/search?query={query}&format=ndjson' for query in KEYWORD_QUERIES],
+        'GET /api/suggest': [f'/api/suggest?query={query}' for query in TYPED_QUERIES],
+        'GET /api/categories': ['/api/categories'],
+        'GET /api/resource/<id>': [f'/api/resource/{resource_id}' for resource_id in detail_ids],
+    }
+    for name, urls in routes.items():
+        # Reading the body runs streamed responses to the end
+        results[name] = summarize(time_calls(lambda url: client.get(url).get_data(), urls, repeat, warm_up=True))
+
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Prints each benchmark next to its baseline and returns the names that got slower than the threshold."""
+    regressions = []
+    print(f"\n{'rows':>8}  {'benchmark':<28}{'p50 ms':>10}{'base p50':>10}{'change':>9}{'p99 ms':>10}")
+    for size, benchmarks in results.items():
+        for name, summary in benchmarks.items():
+            base = baseline.get(size, {}).get(name)
+            if base:
+                change = summary['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+                slower = change > threshold and summary['p50_ms'] - base['p50_ms'] > min_delta_ms
+                flag = '  REGRESSION' if slower else ''
+                if flag:
+                    regressions.append(f'{size} rows: {name}')
+                base_text, change_text = f"{base['p50_ms']:.3f}", f'{change:+.0%}'
+            else:
+                flag, base_text, change_text = '', '-', 'new'
+            print(f"{size:>8}  {name:<28}{summary['p50_ms']:>10.3f}{base_text:>10}{change_text:>9}"
+                  f"{summary['p99_ms']:>10.3f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000', help='comma-separated resource counts')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed p50 slowdown, 0.25 = 25%%')
+    parser.add_argument('--min-delta-ms', type=float, default=0.25, help='smallest p50 slowdown reported')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the new baseline')
+    parser.add_argument('--output', help='also write this run as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    for size in (int(size) for size in args.sizes.split(',')):
+        print(f"Running {size} rows...", flush=True)
+        results[str(size)] = run_size(size, args.repeat)
+
+    run = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'processor': platform.processor() or platform.machine()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nSaved the baseline to {args.baseline}")
+    elif regressions:
+        print(f"\n{len(regressions)} benchmark(s) more than {args.threshold:.0%} slower than the baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
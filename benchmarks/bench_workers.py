@@ -0,0 +1,166 @@
+"""
+Load test of the production server: requests/sec and memory as the number of gunicorn
+workers grows, on a synthetic directory.
+
+For each worker count it starts gunicorn with gunicorn.conf.py (data loaded once in the master,
+workers forked from it), drives it from --clients client processes over keep-alive
+connections for --duration seconds, and then reads the memory of the master and its workers.
+RSS counts the shared pages once per process; PSS splits them between the processes
+sharing them, so its total is what the server really uses.
+
+Requests/sec can only scale with workers up to the number of CPUs, including the ones the
+clients use.
+
+Run from the repository root:
+    python benchmarks/bench_workers.py --rows 100000 --workers 1,2,4,8
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_keyword_search import percentile
+from synthetic_directory import write_synthetic_csv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_FILE_NAME = 'CapstoneSpreadsheet - Sheet1.csv'
+
+# A mix of the app's traffic: home page, keyword and category results, the JSON API and (added
+# once the server is up) the detail pages of DETAIL_PAGES resources
+URLS = ['/', '/results?query=youth&search_type=keyword', '/results?query=COUNSELING&search_type=keyword',
+        '/results?query=FOOD&search_type=category', '/results?query=HEALTH&search_type=category',
+        '/api/search?query=food', '/api/suggest?query=cou', '/api/categories']
+DETAIL_PAGES = 2
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_serving(port, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/api/categories')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"the server on port {port} did not come up")
+
+
+def get_detail_urls(port):
+    """Detail page URLs of a few resources, by their IDs."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    connection.request('GET', f'/api/search?query=youth&limit={DETAIL_PAGES}')
+    return [f"/resource/{result['id']}" for result in json.loads(connection.getresponse().read())['results']]
+
+
+def run_client(port, duration, urls):
+    """Sends requests over one keep-alive connection for duration seconds, returning the latencies in ms."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        connection.request('GET', urls[i % len(urls)])
+        response = connection.getresponse()
+        response.read()
+        if response.status != 200:
+            errors += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+        i += 1
+    return latencies, errors
+
+
+def process_tree(pid):
+    """The pid and the pids of all its descendants."""
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task'):
+        with open(f'/proc/{pid}/task/{task}/children') as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_mb(pid):
+    """(RSS, PSS) in MB of one process, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0]] = int(parts[1]) / 1024
+    return values['Rss:'], values['Pss:']
+
+
+def run_server(work_dir, workers, clients, duration):
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, WEB_CONCURRENCY=str(workers))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_DIR, 'gunicorn.conf.py'),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'serviceproviderWeb:app'],
+        cwd=work_dir, env=env)
+    try:
+        wait_until_serving(port)
+        urls = URLS + get_detail_urls(port)
+        with multiprocessing.Pool(clients) as pool:
+            start = time.perf_counter()
+            outcomes = pool.starmap(run_client, [(port, duration, urls)] * clients)
+            elapsed = time.perf_counter() - start
+        latencies = [latency for client_latencies, _ in outcomes for latency in client_latencies]
+        errors = sum(client_errors for _, client_errors in outcomes)
+        memory = [memory_mb(pid) for pid in process_tree(server.pid)]
+        return {
+            'requests_per_second': len(latencies) / elapsed,
+            'p50_ms': statistics.median(latencies),
+            'p99_ms': percentile(latencies, 99),
+            'errors': errors,
+            'rss_mb': sum(rss for rss, _ in memory),
+            'pss_mb': sum(pss for _, pss in memory),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--workers', default='1,2,4')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    args = parser.parse_args()
+
+    if not shutil.which('gunicorn') and subprocess.run([sys.executable, '-m', 'gunicorn', '--version'],
+                                                       capture_output=True).returncode:
+        sys.exit("gunicorn is not installed (pip install -r requirements.txt)")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        write_synthetic_csv(os.path.join(work_dir, CSV_FILE_NAME), args.rows)
+        # Save the snapshot file first, so every server start maps it instead of parsing the CSV
+        subprocess.run([sys.executable, '-c', 'import serviceproviderWeb'], cwd=work_dir, check=True,
+                       env=dict(os.environ, PYTHONPATH=REPO_DIR))
+        print(f"{args.rows} resources, {args.clients} clients, {os.cpu_count()} CPUs")
+        print(f"{'workers':<9}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}{'PSS MB':>9}")
+        for workers in (int(workers) for workers in args.workers.split(',')):
+            result = run_server(work_dir, workers, args.clients, args.duration)
+            print(f"{workers:<9}{result['requests_per_second']:>9.0f}{result['p50_ms']:>9.2f}"
+                  f"{result['p99_ms']:>9.2f}{result['errors']:>8}{result['rss_mb']:>9.1f}{result['pss_mb']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""
+Generates synthetic service directories in the layout of the shipped sheet, for the benchmarks.
+
+A directory is a run of county sections, each with the sheet's category blocks: a
+'Community Services- X' (or 'Community Services - X' / 'OTHER- X') label row, a blank row and
+the NAME,DETAILS:,... header, then the block's resources. Names and details draw on a
+Zipf-distributed vocabulary that grows with the directory, so large directories have a long
+tail of rare words like real ones. Some addresses span several lines, a few resources are
+marked closed and some organisations are listed in more than one category.
+
+Run from the repository root:
+    python benchmarks/synthetic_directory.py --rows 100000 directory-100k.csv
+"""
+import argparse
+import csv
+import itertools
+import random
+
+# (label cell, share of a section's resources); labels as written in the shipped sheet,
+# including the 'Community Services - ' spelling that has no category button
+CATEGORY_BLOCKS = [
+    ('Community Services- FOOD', 0.08),
+    ('Community Services- MENTAL HEALTH', 0.10),
+    ('Community Services-  HEALTH', 0.10),
+    ('Community Services - LAW ENFORCEMENT', 0.03),
+    ('Community Services - LEGAL', 0.04),
+    ('Community Services - TRANSPORTATION', 0.04),
+    ('Community Services - EDUCATION', 0.06),
+    ('Community Services - UTILITIES/RENT ASSISTANCE', 0.05),
+    ('Community Services - Employment Support', 0.05),
+    ('Community Services - AGING AND DISABILITY', 0.06),
+    ('Community Services - PARENTING', 0.05),
+    ('Community Services- ARTS, CULTURES, AND HUMANITIES', 0.08),
+    ('Community Services- EDUCATION AND RESEARCH', 0.08),
+    ('Community Services- ENVIROMENT AND ANIMALS', 0.06),
+    ('Community Services- Religious Groups', 0.10),
+    ('OTHER- VOLUNTEER OPPORTUNITIES', 0.02),
+]
+# Resources per county section, about the size of the shipped sheet
+SECTION_ROWS = 400
+HEADER_ROW = ['NAME', 'DETAILS:', 'NUMBER:', 'VOLUNTEER LEAD/DIRECTOR', 'EMAIL ADDRESS ', 'ADDRESS:',
+              'WEBSITE:', 'FUNCTION:', '']
+
+NAME_WORDS = ['Blue', 'Mountain', 'Community', 'Center', 'Youth', 'Family', 'Health', 'Church', 'Club',
+              'Society', 'Catholic', 'Charities', 'Valley', 'Home', 'Care', 'Columbia', 'Milton', 'YWCA',
+              'YMCA', 'Hope', 'Harvest', 'Kids', 'Senior', 'Clinic', 'Pantry', 'Shelter', 'Counseling',
+              'Services', 'Umatilla', 'Children', 'Child', 'Hotline', 'Program', 'College', 'Freewater',
+              'Department', 'National', 'WWCC', 'Action', 'Council', 'Food', 'Bank', 'Point', 'Serenity',
+              'Alliance', 'Foundation', 'Habitat', 'Humanity', 'Adventist', 'Methodist', 'Baptist', 'Library',
+              'Museum', 'Arts', 'Legal', 'Aid', 'Transit', 'Veterans', 'Recovery', 'Mission', 'Partners']
+DETAIL_WORDS = ['provides', 'food', 'vouchers', 'meals', 'counseling', 'for', 'youth', 'and', 'families',
+                'support', 'groups', 'housing', 'assistance', 'rent', 'utilities', 'transportation', 'legal',
+                'advice', 'medical', 'dental', 'care', 'the', 'community', 'seniors', 'children', 'program',
+                'free', 'low', 'income', 'individuals', 'persons', 'in', 'need', 'pantry', 'referrals',
+                'mental', 'health', 'services', 'recovery', 'addiction', 'education', 'classes', 'volunteer',
+                'students', 'veterans', 'disability', 'parenting', 'employment', 'job', 'training', 'shelter',
+                'emergency', 'crisis', 'line', 'open', 'weekly', 'through', 'center', 'with', 'of', 'to']
+STREET_NAMES = ['Main', 'Alder', 'Birch', 'Cherry', 'Rose', 'Poplar', 'Isaacs', 'Howard', 'Sprague', 'Palouse',
+                'Kelly', 'Wilbur', 'Clinton', 'Park', 'Orchard', 'Myra', 'Plaza', '2nd', '3rd', '4th', '9th']
+STREET_TYPES = ['St', 'Street', 'Ave', 'Rd', 'Blvd', 'Dr', 'Way', 'Place']
+TOWNS = [('Walla Walla', 'WA', '99362'), ('College Place', 'WA', '99324'), ('Milton-Freewater', 'OR', '97862'),
+         ('Dayton', 'WA', '99328'), ('Waitsburg', 'WA', '99361'), ('Pendleton', 'OR', '97801'),
+         ('Kennewick', 'WA', '99336'), ('Pasco', 'WA', '99301'), ('Richland', 'WA', '99352')]
+FIRST_NAMES = ['Celia', 'Trevor', 'Mike', 'Judy', 'Jane', 'Pam', 'Troy', 'Deedee', 'Jeanette', 'Christopher',
+               'Maria', 'Jose', 'Linda', 'David', 'Sarah', 'Ahmed', 'Mei', 'Olga', 'Kwame', 'Priya']
+LAST_NAMES = ['Landa', 'Sandjathe', 'Barnett', 'Chacon', 'Kaminsky', 'Milleson', 'Fitzgerald', 'Rachor',
+              'Garcia', 'Nguyen', 'Smith', 'Johnson', 'Okafor', 'Ivanova', 'Patel', 'Chen', 'Brown', 'Lopez']
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'ven', 'tor', 'sil', 'an', 'dre', 'qua', 'bel', 'nor', 'wes', 'tam',
+             'rin', 'cho', 'lux', 'ped', 'gar', 'vin', 'sol', 'mar', 'ett', 'ox', 'ul', 'ny']
+
+
+def zipf_cum_weights(count, exponent=1.4):
+    """Cumulative weights giving the word of rank r a share proportional to 1 / r**exponent."""
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def make_rare_words(rng, count):
+    """Pseudo-words for the long tail of the vocabulary (program names, places, acronyms...)."""
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_phone(rng):
+    area = rng.choice(['509', '541'])
+    exchange, line = rng.randint(200, 999), rng.randint(1000, 9999)
+    style = rng.random()
+    if style < 0.6:
+        return f'{area}-{exchange}-{line}'
+    if style < 0.85:
+        return f'({area}) {exchange}-{line}'
+    return f'{area}-{exchange}-{line} (ext {rng.randint(1, 9)})'
+
+
+def make_address(rng):
+    town, state, zip_code = rng.choice(TOWNS)
+    street = f'{rng.randint(1, 2999)} {rng.choice(["", "W ", "E ", "S ", "N "])}{rng.choice(STREET_NAMES)} ' \
+             f'{rng.choice(STREET_TYPES)}'
+    style = rng.random()
+    if style < 0.15:
+        # Multi-line, quoted in the CSV like the shipped addresses
+        return f'{street}\n{town}, {state} {zip_code}'
+    if style < 0.2:
+        return 'N/A'
+    return f'{street}, {town}, {state} {zip_code}'
+
+
+def generate_rows(row_count, seed=0):
+    """Yields the CSV rows of a directory with row_count resources."""
+    rng = random.Random(seed)
+    # Vocabulary grows with the square root of the directory, roughly like real text (Heaps' law)
+    rare_words = make_rare_words(rng, int(20 * row_count ** 0.5))
+    name_words = NAME_WORDS + [word.capitalize() for word in rare_words]
+    detail_words = DETAIL_WORDS + rare_words
+    name_weights = zipf_cum_weights(len(name_words))
+    detail_weights = zipf_cum_weights(len(detail_words))
+
+    previous_names = []
+    written = 0
+    while written < row_count:
+        for label, share in CATEGORY_BLOCKS:
+            block_rows = min(max(1, round(SECTION_ROWS * share)), row_count - written)
+            if block_rows <= 0:
+                break
+            yield ['\xa0', '\xa0', '\xa0', label, '', '\xa0', '\xa0', '\xa0', '']
+            yield [''] * len(HEADER_ROW)
+            yield HEADER_ROW
+
+            for _ in range(block_rows):
+                if previous_names and rng.random() < 0.03:
+                    # The same organisation listed under another category
+                    name = rng.choice(previous_names)
+                else:
+                    name = ' '.join(rng.choices(name_words, cum_weights=name_weights, k=rng.randint(1, 4)))
+                    previous_names.append(name)
+                if rng.random() < 0.01:
+                    name += rng.choice(['-CLOSED', ' (Closed)', ' - closed'])
+
+                details = ' '.join(rng.choices(detail_words, cum_weights=detail_weights, k=rng.randint(1, 15)))
+                slug = ''.join(word[0] for word in name.lower().split()) + str(written)
+                yield [
+                    name,
+                    details[0].upper() + details[1:],
+                    make_phone(rng),
+                    f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}' if rng.random() < 0.9 else ' ',
+                    f'info@{slug}.org' if rng.random() < 0.05 else '',
+                    make_address(rng),
+                    f'https://www.{slug}.org/',
+                    rng.choice(DETAIL_WORDS).capitalize() if rng.random() < 0.1 else ' ',
+                    '',
+                ]
+                written += 1
+
+
+def write_synthetic_csv(path, row_count, seed=0):
+    """Writes a directory with row_count resources to path; the same seed always gives the same file."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(generate_rows(row_count, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output')
+    parser.add_argument('--rows', type=int, default=10_000, help='resources to generate, e.g. 1k to 1M')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_synthetic_csv(args.output, args.rows, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,4 +4,10 @@ import vue from '@vitejs/plugin-vue'
 // https://vite.dev/config/
 export default defineConfig({
   plugins: [vue()],
+  server: {
+    // Forward the JSON API to the Flask app during development
+    proxy: {
+      '/api': 'http://127.0.0.1:5000',
+    },
+  },
 })
@@ -0,0 +1,47 @@
+"""
+Production server settings, used with:
+    gunicorn -c gunicorn.conf.py serviceproviderWeb:app
+
+The app, and with it the CSV data, is loaded once in the master process and every worker is
+forked from it, so the workers share the loaded data copy-on-write instead of each parsing
+the CSV and holding its own copy.
+
+Edits to the CSV are reloaded once, in the master: its data watcher only notices the change and
+sends the master a HUP, the master reloads the data (see on_reload) and gunicorn then forks a
+fresh set of workers from it and lets the old ones finish their requests and exit. Workers
+never reload on their own, so they all serve the same data, and a worker started to replace
+one that died gets the current data too.
+
+WEB_CONCURRENCY, WEB_THREADS and BIND override the number of worker processes (one per CPU),
+the threads per worker and the listening address.
+"""
+import gc
+import multiprocessing
+import os
+import signal
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# Threads let a worker keep serving while another request waits on a slow client
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+preload_app = True
+
+
+def when_ready(server):
+    # The watcher thread only checks the files and signals; the reload itself runs in the
+    # master's main loop, so no worker is ever forked half-way through one
+    import serviceproviderWeb
+    serviceproviderWeb.start_data_watcher(reload=lambda: os.kill(server.pid, signal.SIGHUP))
+
+
+def on_reload(server):
+    # Called on HUP, before the new workers are forked. A rejected reload keeps the current data.
+    import serviceproviderWeb
+    serviceproviderWeb.load_data()
+
+
+def pre_fork(server, worker):
+    # Everything loaded so far is long-lived; keeping it out of the collector's generations means
+    # collections in the workers never write to (and so copy) the shared pages
+    gc.freeze()
@@ -1,30 +1,232 @@
+import atexit
+import bisect
+import csv
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import json
+import marshal
+import math
+import mmap
+import multiprocessing
 import os
 import re
-
-import pandas as pd
-from flask import Flask, render_template_string, request, url_for
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+from contextlib import nullcontext
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+import click
+import numpy as np
+from flask import Flask, g, jsonify, redirect, render_template, request, stream_template, url_for
+from markupsafe import escape
+
+try:
+    import brotli
+except ImportError:
+    # Optional (pip install Brotli): without it, responses are only compressed with gzip
+    brotli = None
 
 app = Flask(__name__)
 
-# data loading
-ALL_DATA = []
-HEADERS = []
-CATEGORIES = []
 # NOTE: The actual data file must be in the same directory as this script.
-CSV_FILE_NAME = 'CapstoneSpreadsheet - Sheet1.csv'
+# SERVICE_DIRECTORY_DATA may name another CSV, or a directory of CSV sheets in the same block
+# format (e.g. one per county) that are merged into one directory, see build_directory_snapshot().
+CSV_FILE_NAME = os.environ.get('SERVICE_DIRECTORY_DATA', 'CapstoneSpreadsheet - Sheet1.csv')
+# Files of a data directory that are loaded as sheets
+SHEET_FILE_EXTENSION = '.csv'
+# Changed sheets are parsed in worker processes when there are several adding up to this many bytes
+SHEET_POOL_MIN_BYTES = 4 * 1024 * 1024
+
+# The parsed data and indexes are saved next to the CSV, so later starts can skip the parse
+SNAPSHOT_FILE_SUFFIX = '.snapshot'
+# Bump whenever the layout or the contents of the snapshot file change
+SNAPSHOT_FORMAT_VERSION = 12
+SNAPSHOT_MAGIC = b'SPDSNAP\0'
+# magic, format version, little-endian flag, CSV SHA-1, marshalled metadata length
+SNAPSHOT_HEADER = struct.Struct('<8sH?20sQ')
+# Each sheet of a data directory is also saved parsed next to it, so that after a restart (which
+# reads the snapshot file and parses nothing) an edit still only parses the sheet that changed
+SHEET_FILE_SUFFIX = '.sheet'
+# Indexes saved in the snapshot file as flat arrays: DataSnapshot attribute -> array typecodes
+# of the values kept for each key (one array per key, or a tuple of parallel arrays)
+SNAPSHOT_INDEXES = {'word_index': ('I',), 'rank_index': ('I', 'f'), 'rank_dense': ('f',), 'trigram_index': ('I',)}
+
+# BM25 ranking of keyword searches: weight of a term found in each detail field (fields not
+# listed count RANK_OTHER_FIELD_WEIGHT), and the usual k1 and b parameters
+RANK_FIELD_WEIGHTS = {'NAME': 3.0, 'DETAILS': 1.5, 'FUNCTION': 1.5, 'ADDRESS': 0.5}
+RANK_OTHER_FIELD_WEIGHT = 0.25
+RANK_K1 = 1.2
+RANK_B = 0.75
+# Most results a keyword search returns, best first
+RANKED_SEARCH_LIMIT = 100
+# Terms found in at least 1/RANK_DENSE_FRACTION of the rows also keep their scores as one value
+# per row (0 where the term is missing), so a query adds them up without touching each posting.
+# At most RANK_DENSE_FRACTION such columns per term a row contains, each 4 bytes a row.
+RANK_DENSE_FRACTION = 8
+
+# Typo tolerance: a keyword missing from the index is replaced by the closest indexed term.
+# Candidates come from a character trigram index and only those are checked by edit distance.
+FUZZY_MIN_TERM_LENGTH = 3
+# Terms at least this long may be two edits away from the query, shorter ones only one
+FUZZY_TWO_EDITS_MIN_LENGTH = 8
+# Most candidates (by shared trigrams) whose edit distance is computed for one term
+FUZZY_MAX_CANDIDATES = 50
+
+# As-you-type suggestions: default and largest number returned by /api/suggest, and how many
+# answers are kept in memory (the same prefixes come back at every keystroke)
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_CACHE_MAX_ENTRIES = 1024
+
+# Resource IDs are a slug of the name (at most this long) and this many hex digits of a hash
+# of the name and category block, e.g. 'bmac-food-bank-5e0c2a1f'
+RESOURCE_ID_SLUG_LENGTH = 40
+RESOURCE_ID_HASH_LENGTH = 8
+# Slug of names with no letters or digits to take one from, so an ID is never all digits
+# (and never mistaken for the row index of an old /resource/<row_index> link)
+RESOURCE_ID_EMPTY_SLUG = 'r'
+# Saved next to the CSV: the resource each row index pointed to, for old /resource/<row_index> links
+ROW_ID_MAP_SUFFIX = '.row-ids.json'
+
+# Engine answering the phrase, keyword and category searches and the detail lookups: 'memory'
+# (the snapshot's own indexes) or 'sqlite' (a SQLite database with an FTS5 index, compiled from
+# the snapshot on every load and saved next to the CSV with this suffix), see BACKENDS
+STORAGE_BACKEND = os.environ.get('SERVICE_DIRECTORY_BACKEND', 'memory')
+SQLITE_FILE_SUFFIX = '.sqlite3'
+
+# Facets results can be narrowed by (?category=, ?has=, ?status=), each value a precomputed
+# bitset of row indices. Values of one facet are alternatives, different facets must all match.
+FACET_GROUPS = ('category', 'has', 'status')
+# Headings of the facet groups in the results page sidebar
+FACET_TITLES = {'category': 'Category', 'has': 'Contact', 'status': 'Status'}
+# ?has= values: the detail field that must be filled in
+FACET_FIELDS = {'phone': 'NUMBER', 'email': 'EMAIL ADDRESS', 'website': 'WEBSITE'}
+# Field values that mean the field is empty
+FACET_MISSING_VALUES = {'N/A', 'NA', 'NONE', '-'}
+FACET_STATUSES = ('open', 'closed')
+# Searches only ever match open resources; browsing by facets alone does too unless ?status= says otherwise
+FACET_DEFAULT_STATUS = ('open',)
+
+# Near search: results can be ordered by distance from a ZIP code or "latitude,longitude" (?near=)
+# and limited to a radius in miles (?within=). Addresses are located offline from this table of
+# ZIP code centroids (zip,place,state,latitude,longitude), so distances are between town centres.
+GEO_CENTROIDS_FILE = os.environ.get('SERVICE_DIRECTORY_CENTROIDS', 'zip-centroids.csv')
+# Detail field holding the address
+GEO_ADDRESS_FIELD = 'ADDRESS'
+# State names some addresses spell out
+GEO_STATE_NAMES = {'WASHINGTON': 'WA', 'OREGON': 'OR', 'IDAHO': 'ID'}
+MILES_PER_DEGREE = 69.09
+# Characters before an address's ZIP code searched for its town first, see parse_address()
+GEO_PLACE_WINDOW = 40
+# Side of the spatial grid's cells, see SpatialGrid
+GEO_CELL_MILES = 5.0
+# Largest ?within= radius
+GEO_MAX_RADIUS_MILES = 500.0
+
+# Data checks run on every load, before the data is published (see validate_snapshot()). A load
+# failing an error check is rejected and the current data kept; warnings are only reported, on
+# /admin/data-health and /api/data-health. A reload keeping fewer than DATA_HEALTH_MIN_KEPT_FRACTION
+# of the open resources is taken for a truncated or half-saved sheet.
+DATA_HEALTH_MIN_KEPT_FRACTION = 0.5
+DATA_HEALTH_CHECKS = {
+    'missing_headers': ('error', "No header row starting with NAME, so no column can be read"),
+    'no_resources': ('error', "No open resources"),
+    'resources_dropped': ('error', f"Fewer than {DATA_HEALTH_MIN_KEPT_FRACTION:.0%} of the open resources of the "
+                                   f"current data are left"),
+    'missing_column': ('warning', "A column the facets or the near search read is missing"),
+    'no_category': ('warning', "Listed before the first category label row, so no category button finds it"),
+    'empty_category': ('warning', "Category with no open resources"),
+    'duplicate_name': ('warning', "Name listed more than once in the same category"),
+    'malformed_phone': ('warning', "NUMBER holds no phone number"),
+    'malformed_website': ('warning', "WEBSITE is not a link"),
+    'malformed_email': ('warning', "EMAIL ADDRESS holds no email address"),
+    'closed_inside_word': ('warning', "Hidden as closed, but 'closed' is only part of a word of the name"),
+    'closed_outside_name': ('warning', "Mentions 'closed' outside the name, but is listed as open"),
+    'unlocated_address': ('warning', "ADDRESS has no ZIP code or town of the ZIP code table, so near searches miss it"),
+}
+# Columns the facets and the near search read
+DATA_HEALTH_COLUMNS = ('NAME', *FACET_FIELDS.values(), GEO_ADDRESS_FIELD)
+# Rows listed per check in the report
+DATA_HEALTH_MAX_EXAMPLES = 20
+
+# Number of service buttons per chunk when a results page is streamed
+RESULTS_CHUNK_SIZE = 100
+
+# JSON API paging: page size when no limit is given, and the largest page a client may ask for
+API_DEFAULT_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+# Resource fields a client can select with ?fields=, mapped to the Resource attribute
+API_FIELDS = {'id': 'resource_id', 'row': 'row_index', 'name': 'name', 'category': 'category', 'closed': 'closed', 'details': 'details'}
+API_DEFAULT_SEARCH_FIELDS = ('id', 'name')
+
+# How often (in seconds) the data watcher checks the CSV for changes
+DATA_WATCH_INTERVAL = 2.0
+
+# Maximum number of rendered pages kept in memory
+RENDER_CACHE_MAX_ENTRIES = 256
+# Search results (row indices) kept in memory, and for how many seconds. Results never outlive
+# their data, the TTL only frees entries for queries that stopped being asked.
+RESULT_CACHE_MAX_ENTRIES = 1024
+RESULT_CACHE_TTL = 600.0
+# Most cached queries listed with their hit counts by /api/cache-stats
+CACHE_STATS_TOP_QUERIES = 20
+
+# Pages and JSON of at least this many bytes are compressed for clients that accept it, brotli
+# preferred over gzip. A whole body is compressed once at a high level and kept (COMPRESSED_CACHE),
+# a streamed one is compressed as it is sent at a faster level.
+COMPRESS_MIN_BYTES = 512
+COMPRESS_MIMETYPES = {'text/html', 'text/css', 'application/json', 'application/x-ndjson'}
+COMPRESS_LEVELS = {'br': 9, 'gzip': 9}
+COMPRESS_STREAM_LEVELS = {'br': 5, 'gzip': 6}
+COMPRESSED_CACHE_MAX_ENTRIES = 256
+# The stylesheet is compressed once at startup, so at the smallest (slowest) levels
+STATIC_COMPRESS_LEVELS = {'br': 11, 'gzip': 9}
+# The stylesheet's URL holds its hash, so clients may keep it for a year without checking back
+STATIC_MAX_AGE = 365 * 24 * 60 * 60
+
+# Opt-in timing of requests and their stages (load, search, render...), served from /metrics.
+# Enable with SERVICE_DIRECTORY_METRICS=1; when off, the timers are no-ops.
+METRICS_ENABLED = os.environ.get('SERVICE_DIRECTORY_METRICS') == '1'
+# Upper bounds (seconds) of the timing histogram buckets
+TIMING_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                  10.0, 30.0)
+# Estimated from the buckets and exported next to them
+TIMING_QUANTILES = (0.5, 0.95, 0.99)
+# With metrics enabled, a request sent with this header is answered with a sampled profile
+# (folded stacks, as read by flamegraph.pl or speedscope) instead of its page
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SAMPLE_INTERVAL = 0.001
+
+# Search analytics: every /results search (query, search type, filters, near, hits, latency) is
+# appended to this JSON lines file, '' turns it off. Requests only add it to an in-memory ring buffer,
+# written out in batches by a background thread; when that can't keep up the oldest entries are dropped.
+SEARCH_LOG_FILE = os.environ.get('SERVICE_DIRECTORY_SEARCH_LOG', os.path.normpath(CSV_FILE_NAME) + '.searches.jsonl')
+SEARCH_LOG_BUFFER_SIZE = 10000
+# Buffered entries that wake the writer early, and the longest (seconds) it waits otherwise
+SEARCH_LOG_BATCH_SIZE = 1000
+SEARCH_LOG_FLUSH_INTERVAL = 1.0
+# Queries listed per section by the search-report command
+SEARCH_REPORT_TOP = 20
 
 # Column indices
 CATEGORY_COL_INDEX = 3  # Column D
 NAME_COL_INDEX = 0  # Column A
 
-# common keywords in column 1
-COMMON_KEYWORDS = [
-    'church', 'center', 'blue', 'mountain', 'services', 'umatilla', 'children',
-    'club', 'society', 'child', 'ywca', 'counseling', 'hotline', 'catholic',
-    'community', 'program', 'college', 'freewater', 'health', 'milton',
-    'youth', 'care', 'charities', 'columbia', 'department', 'family',
-    'home', 'national', 'wwcc', 'ymca'
-]
+# The common keywords suggested on the home page are the words found in the most resource
+# names (column 1), recomputed on every load: how many to show and their shortest length
+COMMON_KEYWORD_COUNT = 30
+COMMON_KEYWORD_MIN_LENGTH = 3
 
 # words to ignore
 STOP_WORDS = {'a', 'an', 'the', 'is', 'are', 'was', 'were', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'of', 'for',
@@ -36,6 +238,65 @@ STOP_WORDS = {'a', 'an', 'the', 'is', 'are', 'was', 'were', 'and', 'or', 'but',
               'com', 'org', 'www', 'https', 'wa', 'st', 'ave', 'rd', 'dr', 'p', 's', 'n', 'w', 'e', 'rd', 'dr', 'blvd',
               "those", "through", "washington", "walla", "county", "oregon", "provides", "providing", "place",
               "provide", "main", "valley"}
+# Words left out of the BM25 index and keyword queries: only function words. Place and service
+# words common in the directory ("walla", "county", "provides") stay searchable, BM25 weights them
+# down by how many resources contain them.
+RANK_STOP_WORDS = {'a', 'an', 'the', 'is', 'are', 'was', 'were', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'of',
+                   'for', 'with', 'by', 'as', 'from', 'it', 'its', 'that', 'this', 'we', 'i', 'you', 'he', 'she',
+                   'they', 'our', 'your', 'their', 'us', 'my', 'his', 'her', 'do', 'don', 'not', 'can', 'will',
+                   'would', 'be', 'been', 'have', 'has', 'had', 'so', 'just', 'such', 'what', 'when', 'where', 'who',
+                   'whom', 'which', 'how', 'those', 'through'}
+
+# Whole-word tokens, using the same word characters as the \b boundaries in keyword_search
+WORD_PATTERN = re.compile(r'\w+')
+# Words kept in resource ID slugs
+SLUG_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+# Address parts: line breaks of multi-line addresses (and the commas around them), the last ZIP
+# code with some text before it (a leading number is the street number; ZIP+4 and 'WA99362' allowed),
+# a state code or name, right before the ZIP code or after the town, and the words of town names
+ADDRESS_BREAK_PATTERN = re.compile(r'[\s,]*\n[\s,]*')
+LAST_ZIP_CODE_PATTERN = re.compile(r'[^\W\d_].*(?<!\d)(\d{5})(?:-\d{4})?(?!\d)', re.DOTALL)
+STATE_BEFORE_ZIP_PATTERN = re.compile(r'\b(%s|[A-Z]{2})(?![A-Z])\.?[\s,-]*$' % '|'.join(GEO_STATE_NAMES), re.IGNORECASE)
+STATE_AFTER_TOWN_PATTERN = re.compile(r'[\s,]*\b(%s|[A-Z]{2})\b\.?' % '|'.join(GEO_STATE_NAMES), re.IGNORECASE)
+PLACE_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+# Data checks: a phone number (7 digits, or 10 with the area code), a link (bare domains allowed),
+# an email address, and 'closed' as a word of its own
+PHONE_PATTERN = re.compile(r'(?<!\d)(?:\(?\d{3}\)?[\s.-]*)?\d{3}[\s.-]?\d{4}(?!\d)')
+WEBSITE_PATTERN = re.compile(r'(?:https?://|www\.)\S+|[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}(?:/\S*)?', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'[^@\s]+@[\w-]+(?:\.[\w-]+)+')
+CLOSED_WORD_PATTERN = re.compile(r'\bCLOSED\b', re.IGNORECASE)
+
+
+def get_category_name(row):
+    """Returns the upper-cased category name if the row is a category label row, otherwise ''."""
+    if len(row) > CATEGORY_COL_INDEX and len(row) > NAME_COL_INDEX:
+        col_d_value = row[CATEGORY_COL_INDEX].strip()
+        col_a_value = row[NAME_COL_INDEX].strip()
+
+        is_category_label_row = (col_d_value.startswith('Community Services- ') or col_d_value.startswith(
+            'OTHER- ')) and \
+                                (col_a_value == '')
+
+        if is_category_label_row:
+            if col_d_value.startswith('Community Services- '):
+                category_name = col_d_value[len('Community Services- '):].strip()
+            else:
+                category_name = col_d_value[len('OTHER- '):].strip()
+
+            return category_name.upper()
+    return ''
+
+
+def get_block_label(row):
+    """Returns the upper-cased column D text if the row starts a category block, otherwise ''."""
+    col_d_value = row[CATEGORY_COL_INDEX].upper().strip() if len(row) > CATEGORY_COL_INDEX else ''
+    col_a_value = row[NAME_COL_INDEX].upper().strip() if len(row) > NAME_COL_INDEX else ''
+
+    # Detect a Category Label Row
+    is_category_label_row = (col_d_value.startswith('COMMUNITY SERVICES-') or col_d_value.startswith(
+        'OTHER-')) and col_a_value == ''
+
+    return col_d_value if is_category_label_row else ''
 
 
 def get_unique_categories(data):
@@ -43,60 +304,1641 @@ def get_unique_categories(data):
     categories = set()
 
     for row in data:
-        if len(row) > CATEGORY_COL_INDEX and len(row) > NAME_COL_INDEX:
-            col_d_value = row[CATEGORY_COL_INDEX].strip()
-            col_a_value = row[NAME_COL_INDEX].strip()
-
-            is_category_label_row = (col_d_value.startswith('Community Services- ') or col_d_value.startswith(
-                'OTHER- ')) and \
-                                    (col_a_value == '')
-
-            if is_category_label_row:
-                if col_d_value.startswith('Community Services- '):
-                    category_name = col_d_value[len('Community Services- '):].strip()
-                elif col_d_value.startswith('OTHER- '):
-                    category_name = col_d_value[len('OTHER- '):].strip()
-                else:
-                    continue
-
-                if category_name:
-                    categories.add(category_name.upper())
+        category_name = get_category_name(row)
+        if category_name:
+            categories.add(category_name)
 
     return sorted(list(categories))
 
 
-def load_data():
-    """Loads and preprocesses the CSV data, extracting headers and categories."""
-    global ALL_DATA
-    global HEADERS
-    global CATEGORIES
+class Resource:
+    """
+    One CSV row, normalized once at load time so the routes never re-strip or re-upper it.
+    Every row gets a record (label and header rows included) so row indices keep lining up.
+    """
+    __slots__ = ('row_index', 'resource_id', 'name', 'category', 'closed', 'valid', 'details', 'detail_url')
+
+    def __init__(self, row_index, row, category, detail_columns, resource_id, detail_url):
+        self.row_index = row_index
+        # Stays the same when rows are added or removed around it, see make_resource_id()
+        self.resource_id = resource_id
+        self.name = row[NAME_COL_INDEX].strip() if len(row) > NAME_COL_INDEX else ''
+        # Label of the category block the row sits in ('' before the first block)
+        self.category = category
+        self.closed = "closed" in self.name.lower()
+        self.valid = is_valid_resource(row)
+        # (clean_header, value) pairs for the detail page, omitting empty values. The headers are the
+        # strings of detail_columns, shared by every row of the sheet.
+        self.details = tuple(
+            (header, row[i].strip()) for i, header in detail_columns if i < len(row) and row[i].strip()
+        )
+        # Link to the detail page, built once instead of a url_for() per row on every results page
+        self.detail_url = detail_url
+
+    @classmethod
+    def restore(cls, row_index, resource_id, name, category, closed, valid, details, detail_url):
+        """Recreates a record from the already normalized fields kept in a snapshot file."""
+        resource = cls.__new__(cls)
+        resource.row_index = row_index
+        resource.resource_id = resource_id
+        resource.name = name
+        resource.category = category
+        resource.closed = closed
+        resource.valid = valid
+        resource.details = details
+        resource.detail_url = detail_url
+        return resource
+
+    def snapshot_fields(self):
+        """Returns the fields restore() takes after the row index."""
+        return (self.resource_id, self.name, self.category, self.closed, self.valid, self.details, self.detail_url)
+
+    @property
+    def search_text(self):
+        """
+        The upper-cased detail values, which the whole-word keyword search matches against. Not
+        kept, as only phrase checks and scans for stop words need it; the word index covers the rest.
+        """
+        return " ".join([value for _, value in self.details]).upper()
+
+
+def make_resource_id(name, category, occurrence):
+    """
+    Derives a resource's ID from its name and category block, so links to it survive rows being
+    added, removed or reordered. occurrence (1, 2, ...) tells apart a name listed twice in a block.
+    """
+    key = f'{name.upper()}\0{category}\0{occurrence}'.encode('utf-8')
+    digest = hashlib.sha1(key).hexdigest()[:RESOURCE_ID_HASH_LENGTH]
+    slug = '-'.join(SLUG_WORD_PATTERN.findall(name.lower()))[:RESOURCE_ID_SLUG_LENGTH].strip('-')
+    return f'{slug or RESOURCE_ID_EMPTY_SLUG}-{digest}'
 
-    if not os.path.exists(CSV_FILE_NAME):
-        print(f"Error: CSV file not found at {CSV_FILE_NAME}")
-        return
 
+def allocate_resource_id(name, category, resource_ids, occurrences):
+    """
+    Returns the ID of the next resource with this name in the block and adds it to resource_ids.
+    occurrences counts the names seen per block, so repeated names don't retry every earlier ID.
+    """
+    key = (name.upper(), category)
+    while True:
+        occurrences[key] += 1
+        resource_id = make_resource_id(name, category, occurrences[key])
+        if resource_id not in resource_ids:
+            resource_ids.add(resource_id)
+            return resource_id
+
+
+def build_resources(data, headers):
+    """
+    Walks the raw rows once, returning a Resource for every row together with the
+    unique category names used for the buttons. Rows naming a resource (closed ones
+    included) get an ID and a detail page URL, label and header rows get ''.
+    """
+    # Remove any trailing colons from the CSV headers once, instead of on every detail view
+    detail_columns = tuple((i, header.strip().rstrip(':')) for i, header in enumerate(headers) if header.strip())
+    # Builds URLs from the route table without needing a request
+    url_adapter = app.url_map.bind('')
+    categories = set()
+    resources = []
+    block_label = ''
+    resource_ids = set()
+    occurrences = Counter()
+
+    for i, row in enumerate(data):
+        category_name = get_category_name(row)
+        if category_name:
+            categories.add(category_name)
+
+        block_label = get_block_label(row) or block_label
+
+        name = row[NAME_COL_INDEX].strip() if len(row) > NAME_COL_INDEX else ''
+        resource_id = detail_url = ''
+        if name and name.upper() != 'NAME':
+            resource_id = allocate_resource_id(name, block_label, resource_ids, occurrences)
+            detail_url = url_adapter.build('resource_detail', {'resource_id': resource_id})
+
+        resources.append(Resource(i, row, block_label, detail_columns, resource_id, detail_url))
+
+    return resources, sorted(list(categories))
+
+
+def count_name_terms(data):
+    """
+    Counts the words of the valid resources' names, returning (term_frequency, document_frequency)
+    Counters keyed by upper-cased word. STOP_WORDS and numbers are left out.
+    """
+    names = [resource.name.upper() for resource in data if resource.valid]
+    # Counter and findall do the per-word work in C; only the distinct words are filtered here
+    term_frequency = Counter(WORD_PATTERN.findall('\n'.join(names)))
+    document_frequency = Counter(chain.from_iterable(map(set, map(WORD_PATTERN.findall, names))))
+    for word in list(term_frequency):
+        if word.isdigit() or word.lower() in STOP_WORDS:
+            del term_frequency[word]
+            del document_frequency[word]
+    return term_frequency, document_frequency
+
+
+def get_common_keywords(data, count=COMMON_KEYWORD_COUNT):
+    """
+    Returns the lower-cased words found in the most resource names, ties broken by how often
+    they occur and then alphabetically.
+    """
+    term_frequency, document_frequency = count_name_terms(data)
+    words = [word for word in document_frequency if len(word) >= COMMON_KEYWORD_MIN_LENGTH]
+    words.sort(key=lambda word: (-document_frequency[word], -term_frequency[word], word))
+    return [word.lower() for word in words[:count]]
+
+
+def build_category_blocks(data):
+    """
+    Groups the valid resources into category blocks as
+    (block_label, [(original_row_index, resource), ...]) in file order.
+    Rows before the first category label don't belong to any block.
+    """
+    blocks = []
+    current_label = None
+
+    for resource in data:
+        if not resource.category:
+            continue
+        if resource.category != current_label:
+            current_label = resource.category
+            blocks.append((current_label, []))
+        if resource.valid:
+            blocks[-1][1].append((resource.row_index, resource))
+
+    return blocks
+
+
+def match_category_blocks(user_query, blocks):
+    """Joins the rows of every block whose label contains the (upper-cased) query, in file order."""
+    matching_rows_with_index = []
+    for block_label, block_rows in blocks:
+        if user_query in block_label:
+            matching_rows_with_index.extend(block_rows)
+    return matching_rows_with_index
+
+
+def make_bitset(indices):
+    """Returns an int with the bits of the given row indices set."""
+    indices = list(indices)
+    bits = bytearray((max(indices) >> 3) + 1 if indices else 0)
+    for index in indices:
+        bits[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def bitset_indices(bitset):
+    """Returns the row indices set in the bitset, ascending."""
+    # Lowest bit first; the string search runs in C
+    digits = bin(bitset)[:1:-1]
+    return [match.start() for match in re.finditer('1', digits)]
+
+
+def filter_indices(indices, bitset):
+    """Keeps the row indices set in the bitset, in their given order."""
+    bits = bitset.to_bytes((bitset.bit_length() + 7) // 8, 'little')
+    return [index for index in indices if index >> 3 < len(bits) and bits[index >> 3] >> (index & 7) & 1]
+
+
+def build_facets(resources, categories):
+    """
+    Builds the facet bitsets over the resources with an ID (closed ones included), as
+    {group: {value: bitset}} for the FACET_GROUPS. A category facet holds the same blocks as
+    its button, see match_category_blocks().
+    """
+    named = [resource for resource in resources if resource.resource_id]
+    # Only a few distinct block labels, so each is matched against the categories once
+    label_categories = {}
+    for resource in named:
+        if resource.category not in label_categories:
+            label_categories[resource.category] = [category for category in categories
+                                                   if resource.category and category in resource.category]
+
+    category_rows = {category: [] for category in categories}
+    field_rows = {value: [] for value in FACET_FIELDS}
+    status_rows = {status: [] for status in FACET_STATUSES}
+    for resource in named:
+        for category in label_categories[resource.category]:
+            category_rows[category].append(resource.row_index)
+        details = dict(resource.details)
+        for value, header in FACET_FIELDS.items():
+            # Empty fields were left out of the details at load time, 'N/A' and the like were not
+            if details.get(header, 'N/A').upper() not in FACET_MISSING_VALUES:
+                field_rows[value].append(resource.row_index)
+        status_rows['open' if resource.valid else 'closed'].append(resource.row_index)
+
+    return {
+        group: {value: make_bitset(rows) for value, rows in group_rows.items()}
+        for group, group_rows in (('category', category_rows), ('has', field_rows), ('status', status_rows))
+    }
+
+
+def facet_mask(snapshot, filters, skip_group=None):
+    """
+    Returns the bitset of the resources in the selected facets: filters holds (group, values)
+    pairs, any of a group's values may match and every group must. -1 (all bits set) selects
+    everything. skip_group leaves that group out, for counting its values.
+    """
+    selected = dict(filters)
+    selected.setdefault('status', FACET_DEFAULT_STATUS)
+    mask = -1
+    for group, values in selected.items():
+        if group == skip_group:
+            continue
+        group_bits = 0
+        for value in values:
+            group_bits |= snapshot.facets[group][value]
+        mask &= group_bits
+    return mask
+
+
+def count_facets(snapshot, matches, filters):
+    """
+    Counts, for every facet value, the matches (a bitset) that selecting it would leave: those in
+    the value and in the other groups' selected values. Only bitwise ANDs, no rows are rescanned.
+    """
+    counts = {}
+    for group, facet_values in snapshot.facets.items():
+        in_other_groups = matches & facet_mask(snapshot, filters, skip_group=group)
+        counts[group] = {value: (in_other_groups & bits).bit_count() for value, bits in facet_values.items()}
+    return counts
+
+
+class Gazetteer:
+    """The ZIP code centroids, and the towns they name for addresses without a ZIP code."""
+    __slots__ = ('zip_codes', 'places', 'place_words', 'version')
+
+    def __init__(self, rows=(), version=''):
+        # Content hash of the table, so locations saved in a snapshot file from another table are redone
+        self.version = version
+        # ZIP code -> (town, state, latitude, longitude)
+        self.zip_codes = {}
+        # The letters of a town's name, upper-cased ('MILTONFREEWATER') -> state -> (town, latitude,
+        # longitude), the mean of the town's ZIP codes
+        self.places = {}
+        place_points = defaultdict(list)
+        for zip_code, place, state, latitude, longitude in rows:
+            self.zip_codes[zip_code] = (place, state, latitude, longitude)
+            place_points[(self.place_key(place), state)].append((place, latitude, longitude))
+        for (key, state), points in place_points.items():
+            self.places.setdefault(key, {})[state] = (points[0][0], sum(point[1] for point in points) / len(points),
+                                                      sum(point[2] for point in points) / len(points))
+        # Most words in a town's name
+        self.place_words = max((len(PLACE_WORD_PATTERN.findall(place)) for place, _, _, _ in self.zip_codes.values()),
+                               default=0)
+
+    @staticmethod
+    def place_key(place):
+        return ''.join(PLACE_WORD_PATTERN.findall(place)).upper()
+
+    def find_place(self, text, start, end):
+        """
+        Finds the last town name in text[start:end], the longest one when several end on the same
+        word, as (start, end, {state: (town, latitude, longitude)}), or returns None.
+        """
+        # Whole words only
+        while start > 0 and text[start - 1].isalpha():
+            start -= 1
+        words = list(PLACE_WORD_PATTERN.finditer(text, start, end))
+        keys = [word.group().upper() for word in words]
+        # A dictionary lookup per run of words, however many towns the table has
+        for last in range(len(keys) - 1, -1, -1):
+            key = ''
+            found = None
+            for first in range(last, max(-1, last - self.place_words), -1):
+                key = keys[first] + key
+                if key in self.places:
+                    found = first, key
+            if found:
+                return words[found[0]].start(), words[last].end(), self.places[found[1]]
+        return None
+
+
+def read_gazetteer(path):
+    """Reads the ZIP code centroids table, or returns an empty Gazetteer (no near search) if it can't be read."""
     try:
-        df = pd.read_csv(CSV_FILE_NAME, header=None, keep_default_na=False)
-        ALL_DATA = df.astype(str).values.tolist()
-
-        # Determine the header row by looking for the row starting with 'NAME'
-        header_row_index = -1
-        for i, row in enumerate(ALL_DATA):
-            if len(row) > NAME_COL_INDEX and row[NAME_COL_INDEX].strip().upper() == 'NAME':
-                header_row_index = i
-                break
+        with open(path, 'rb') as f:
+            raw_csv = f.read()
+        return Gazetteer([
+            (row['zip'].strip(), row['place'].strip(), row['state'].strip().upper(), float(row['latitude']),
+             float(row['longitude']))
+            for row in csv.DictReader(io.StringIO(raw_csv.decode('utf-8-sig'), newline=''))
+        ], hashlib.sha1(raw_csv).hexdigest())
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Could not read the ZIP code centroids {path}, addresses won't be located: {e}")
+        return Gazetteer()
+
+
+GAZETTEER = read_gazetteer(GEO_CENTROIDS_FILE)
 
-        if header_row_index != -1:
-            HEADERS = [h.strip() for h in ALL_DATA[header_row_index]]
+
+class Location:
+    """
+    A resource's ADDRESS split into street, town, state and ZIP code ('' when missing), with the
+    coordinates of its ZIP code, or else of its town (None when neither is in the GAZETTEER).
+    """
+    __slots__ = ('street', 'city', 'state', 'zip_code', 'latitude', 'longitude')
+
+    def __init__(self, street, city, state, zip_code, latitude, longitude):
+        self.street = street
+        self.city = city
+        self.state = state
+        self.zip_code = zip_code
+        self.latitude = latitude
+        self.longitude = longitude
+
+    def snapshot_fields(self):
+        """Returns the fields the constructor takes, for the snapshot file."""
+        return self.street, self.city, self.state, self.zip_code, self.latitude, self.longitude
+
+
+def parse_address(address, gazetteer):
+    """
+    Splits a free-form address ('408 W Poplar St, Walla Walla, WA 99362', spread over several lines,
+    missing its state or ZIP code...) into a Location, or returns None for an empty or 'N/A' address.
+    """
+    if '\n' in address:
+        address = ADDRESS_BREAK_PATTERN.sub(', ', address)
+    text = ' '.join(address.replace('\u200b', '').split()).strip(' ,')
+    if not text or text.upper() in FACET_MISSING_VALUES:
+        return None
+
+    zip_match = LAST_ZIP_CODE_PATTERN.search(text)
+    end = zip_match.start(1) if zip_match else len(text)
+    # The town is usually just before the ZIP code, so that end of the address is searched first
+    place = gazetteer.find_place(text, max(0, end - GEO_PLACE_WINDOW), end) or \
+        (end > GEO_PLACE_WINDOW and gazetteer.find_place(text, 0, end)) or None
+    if place:
+        start, place_end, towns = place
+        state_match = STATE_AFTER_TOWN_PATTERN.match(text, place_end, end)
+    else:
+        start = end
+        state_match = STATE_BEFORE_ZIP_PATTERN.search(text, 0, end) if zip_match else None
+    state = ''
+    if state_match:
+        state = GEO_STATE_NAMES.get(state_match.group(1).upper(), state_match.group(1).upper())
+        start = min(start, state_match.start(1))
+    street = text[:start].strip(' ,-')
+
+    zip_code = zip_match.group(1) if zip_match else ''
+    city, latitude, longitude = '', None, None
+    if zip_code in gazetteer.zip_codes:
+        city, zip_state, latitude, longitude = gazetteer.zip_codes[zip_code]
+        state = state or zip_state
+    if place:
+        point = towns.get(state) if state else next(iter(towns.values()))
+        if point:
+            city = point[0]
+            if latitude is None:
+                _, latitude, longitude = point
         else:
-            print("Error: Could not find the header row starting with 'NAME'.")
-            HEADERS = []
+            city = text[start:place_end]
+    return Location(street, city, state, zip_code, latitude, longitude)
+
+
+def locate_resources(resources, gazetteer):
+    """
+    Parses the address of every resource with an ID, returning {row_index: Location}. Many
+    resources share an address, so each distinct one is parsed once.
+    """
+    parsed = {}
+    locations = {}
+    for resource in resources:
+        if not resource.resource_id:
+            continue
+        address = next((value for header, value in resource.details if header == GEO_ADDRESS_FIELD), '')
+        if address not in parsed:
+            parsed[address] = parse_address(address, gazetteer)
+        if parsed[address] is not None:
+            locations[resource.row_index] = parsed[address]
+    return locations
+
+
+class SpatialGrid:
+    """
+    The located resources bucketed into square cells of GEO_CELL_MILES, so a nearest-first search
+    only looks at the cells around its origin. Coordinates are projected to miles around the
+    resources' mean latitude, which is accurate to well under 1% across a region.
+    """
+    __slots__ = ('longitude_miles', 'cells', 'bounds', 'located')
+
+    def __init__(self, locations=None):
+        located = {index: location for index, location in (locations or {}).items() if location.latitude is not None}
+        mean_latitude = sum(location.latitude for location in located.values()) / len(located) if located else 0.0
+        self.longitude_miles = MILES_PER_DEGREE * math.cos(math.radians(mean_latitude))
+
+        # Resources at the same point (most share their ZIP code's centroid) are stored together
+        points = defaultdict(list)
+        for index in sorted(located):
+            points[(located[index].latitude, located[index].longitude)].append(index)
+        cells = defaultdict(list)
+        for (latitude, longitude), indices in points.items():
+            x, y = self.project(latitude, longitude)
+            cells[(math.floor(x / GEO_CELL_MILES), math.floor(y / GEO_CELL_MILES))].append((x, y, array('I', indices)))
+        self.cells = dict(cells)
+        # (min cell x, max cell x, min cell y, max cell y)
+        self.bounds = (min(x for x, _ in cells), max(x for x, _ in cells), min(y for _, y in cells),
+                       max(y for _, y in cells)) if cells else None
+        # Bitset of the located resources
+        self.located = make_bitset(located)
+
+    def project(self, latitude, longitude):
+        return longitude * self.longitude_miles, latitude * MILES_PER_DEGREE
+
+    def miles(self, location, latitude, longitude):
+        """Distance in miles between a Location and a point."""
+        x, y = self.project(location.latitude, location.longitude)
+        origin_x, origin_y = self.project(latitude, longitude)
+        return math.hypot(x - origin_x, y - origin_y)
+
+    def nearest(self, latitude, longitude, mask=-1, limit=None, max_miles=None, rank=None):
+        """
+        Returns (miles, row_index) for the located resources in the mask bitset, nearest first and
+        equally distant ones in rank(row_index) order (file order by default): at most limit of them,
+        and none further than max_miles. The cells are visited in rings around the origin, stopping
+        as soon as the next ring can't hold anything nearer than what was found.
+        """
+        if self.bounds is None:
+            return []
+        x, y = self.project(latitude, longitude)
+        cell_x, cell_y = math.floor(x / GEO_CELL_MILES), math.floor(y / GEO_CELL_MILES)
+        min_x, max_x, min_y, max_y = self.bounds
+        bits = None if mask < 0 else mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        # Bounded by limit: the kept matches as (-miles, -rank, row_index), the furthest on top
+        found = []
+
+        # Rings before the first one reaching a cell of the grid are empty
+        ring = max(0, min_x - cell_x, cell_x - max_x, min_y - cell_y, cell_y - max_y)
+        last_ring = max(cell_x - min_x, max_x - cell_x, cell_y - min_y, max_y - cell_y)
+        while ring <= last_ring:
+            # Anything in this ring or beyond is at least this far, outside the square of the rings before it
+            reach = min(x - (cell_x - ring + 1) * GEO_CELL_MILES, (cell_x + ring) * GEO_CELL_MILES - x,
+                        y - (cell_y - ring + 1) * GEO_CELL_MILES, (cell_y + ring) * GEO_CELL_MILES - y) if ring else 0.0
+            if max_miles is not None and reach > max_miles:
+                break
+            if limit is not None and len(found) >= limit and -found[0][0] < reach:
+                break
+
+            for key in self.ring_cells(cell_x, cell_y, ring):
+                for point_x, point_y, indices in self.cells.get(key, ()):
+                    miles = math.hypot(point_x - x, point_y - y)
+                    if max_miles is not None and miles > max_miles:
+                        continue
+                    if limit is not None and len(found) >= limit and miles > -found[0][0]:
+                        continue
+                    if bits is not None:
+                        indices = (index for index in indices
+                                   if index >> 3 < len(bits) and bits[index >> 3] >> (index & 7) & 1)
+                    if rank is None:
+                        # Already in file order
+                        indices = list(indices if limit is None else islice(indices, limit))
+                    else:
+                        indices = sorted(indices, key=rank) if limit is None else heapq.nsmallest(limit, indices, key=rank)
+                    for index in indices:
+                        item = (-miles, -(index if rank is None else rank(index)), index)
+                        if limit is None:
+                            found.append(item)
+                        elif len(found) < limit:
+                            heapq.heappush(found, item)
+                        elif item > found[0]:
+                            heapq.heapreplace(found, item)
+                        else:
+                            # The rest of the point's matches rank lower still
+                            break
+            ring += 1
+
+        found.sort(reverse=True)
+        return [(-miles, index) for miles, _, index in found]
+
+    def ring_cells(self, cell_x, cell_y, ring):
+        """The keys of the cells in the square ring around a cell, clipped to the grid."""
+        min_x, max_x, min_y, max_y = self.bounds
+        if ring == 0:
+            return [(cell_x, cell_y)]
+        keys = []
+        for y in (cell_y - ring, cell_y + ring):
+            if min_y <= y <= max_y:
+                keys.extend((x, y) for x in range(max(cell_x - ring, min_x), min(cell_x + ring, max_x) + 1))
+        for x in (cell_x - ring, cell_x + ring):
+            if min_x <= x <= max_x:
+                keys.extend((x, y) for y in range(max(cell_y - ring + 1, min_y), min(cell_y + ring - 1, max_y) + 1))
+        return keys
+
+
+class LRUCache:
+    """
+    A small thread-safe mapping that evicts the least recently used entry once full and, when
+    given a ttl, entries stored more than ttl seconds ago. Counts hits for every cached key.
+    """
+
+    def __init__(self, max_entries, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (value, expiry time or None)
+        self.entries = OrderedDict()
+        self.key_hits = Counter()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Returns the cached value for the key, or None on a miss."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self.entries[key]
+                del self.key_hits[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.key_hits[key] += 1
+            return entry[0]
+
+    def put(self, key, value):
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                evicted_key, _ = self.entries.popitem(last=False)
+                del self.key_hits[evicted_key]
+                self.evictions += 1
+
+    def get_or_create(self, key, create):
+        """Returns the cached value for the key, calling create() and storing its result on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = create()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.key_hits.clear()
+
+    def stats(self):
+        """Returns the hit/miss/eviction/expiration counters and the current size."""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations, 'entries': len(self.entries), 'max_entries': self.max_entries,
+                    'ttl': self.ttl}
+
+    def top_keys(self, count):
+        """Returns the (key, hits) of the cached keys hit most often since they were stored."""
+        with self.lock:
+            return self.key_hits.most_common(count)
+
+
+# Rendered pages keyed by (route, query..., data version)
+RENDER_CACHE = LRUCache(RENDER_CACHE_MAX_ENTRIES)
+# /api/suggest answers keyed by (query, limit, data version)
+SUGGEST_CACHE = LRUCache(SUGGEST_CACHE_MAX_ENTRIES)
+# Row indices of search results keyed by (upper-cased query, search type, facet filters, data version)
+RESULT_CACHE = LRUCache(RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL)
+# Facet counts of search results, with the same keys
+FACET_CACHE = LRUCache(RESULT_CACHE_MAX_ENTRIES, ttl=RESULT_CACHE_TTL)
+# Compressed response bodies and their headers keyed by ETag, which names the page and its encoding
+COMPRESSED_CACHE = LRUCache(COMPRESSED_CACHE_MAX_ENTRIES)
+
+
+class Histogram:
+    """Counts observed durations into the TIMING_BUCKETS, like a Prometheus histogram."""
+
+    def __init__(self, bounds=TIMING_BUCKETS):
+        self.bounds = bounds
+        # One count per bucket, the last one for everything above the largest bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        bucket = bisect.bisect_left(self.bounds, seconds)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.total += seconds
+
+    def read(self):
+        """Returns a consistent copy of (per-bucket counts, sum of the observed durations)."""
+        with self.lock:
+            return list(self.counts), self.total
+
+    def quantile(self, q, counts=None):
+        """Estimates the q-quantile by interpolating inside the bucket it falls in, as histogram_quantile() does."""
+        counts = counts or self.read()[0]
+        rank = q * sum(counts)
+        seen = 0
+        for bucket, count in enumerate(counts):
+            if count and seen + count >= rank:
+                if bucket == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[bucket - 1] if bucket else 0.0
+                return lower + (self.bounds[bucket] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+
+# (metric, label value) -> Histogram, e.g. ('stage', 'search_keyword') or ('request', 'results')
+TIMINGS = {}
+TIMINGS_LOCK = threading.Lock()
+
+
+def record_timing(metric, label, seconds):
+    histogram = TIMINGS.get((metric, label))
+    if histogram is None:
+        with TIMINGS_LOCK:
+            histogram = TIMINGS.setdefault((metric, label), Histogram())
+    histogram.observe(seconds)
+
+
+class StageTimer:
+    """Context manager recording the time spent in its block as a stage timing."""
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record_timing('stage', self.stage, time.perf_counter() - self.start)
+
+
+# Shared by every timed block while metrics are disabled
+NO_TIMER = nullcontext()
+
+
+def time_stage(stage):
+    """Times a block as the named stage: `with time_stage('parse'): ...`. Does nothing with metrics disabled."""
+    return StageTimer(stage) if METRICS_ENABLED else NO_TIMER
+
+
+def timed(stage):
+    """Decorator timing every call as the named stage; leaves the function untouched with metrics disabled."""
+    def decorate(function):
+        if not METRICS_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with StageTimer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of one thread every PROFILE_SAMPLE_INTERVAL seconds from a background
+    thread, so the profiled code runs unmodified (unlike cProfile, which hooks every call).
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name='profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        """Stops sampling and returns the folded stacks, one 'outer;...;inner count' line each."""
+        self.stopped.set()
+        self.thread.join()
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+class SearchLog:
+    """
+    Appends searches to the search log without making requests wait on the disk: record() only
+    adds a tuple to a ring buffer, and a background thread (started by the first record() of each
+    process, so forked workers get their own) formats and appends them in batches. Each batch is
+    one O_APPEND write, so the workers of a server can share the file.
+    """
+
+    def __init__(self, path, size=SEARCH_LOG_BUFFER_SIZE):
+        self.path = path
+        # (time, query, search type, filters, near, hits or None, seconds, status)
+        self.buffer = deque(maxlen=size)
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        # Process the writer thread was started in
+        self.pid = None
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, entry):
+        if self.pid != os.getpid():
+            self.start()
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(entry)
+        if len(self.buffer) >= SEARCH_LOG_BATCH_SIZE:
+            self.wakeup.set()
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self.run, name='search-log', daemon=True).start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(SEARCH_LOG_FLUSH_INTERVAL)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes out the buffered entries."""
+        entries = []
+        try:
+            while True:
+                entries.append(self.buffer.popleft())
+        except IndexError:
+            pass
+        if not entries:
+            return
+        lines = ''.join(json.dumps(format_search_entry(*entry), separators=(',', ':')) + '\n' for entry in entries)
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines.encode('utf-8'))
+            finally:
+                os.close(fd)
+            self.written += len(entries)
+        except OSError as e:
+            self.dropped += len(entries)
+            print(f"Could not write to the search log {self.path}: {e}")
+
+
+def format_search_entry(timestamp, query, search_type, filters, near, hits, seconds, status):
+    """Returns a buffered search as the JSON object written to the search log."""
+    return {
+        'time': round(timestamp, 3),
+        'query': query,
+        'search_type': get_search(search_type)[1],
+        'filters': dict(filters) if filters else None,
+        'near': get_near_args(near) if near else None,
+        'hits': hits,
+        'ms': round(seconds * 1000, 3),
+        'status': status,
+    }
+
+
+# None when SEARCH_LOG_FILE is ''. Whatever is still buffered is written when the process exits.
+SEARCH_LOG = SearchLog(SEARCH_LOG_FILE) if SEARCH_LOG_FILE else None
+if SEARCH_LOG is not None:
+    atexit.register(SEARCH_LOG.flush)
+
+
+class DataSnapshot:
+    """
+    Everything derived from one load of the CSV. A snapshot is never modified after it is
+    built; a reload builds a new one and publishes it by replacing the SNAPSHOT reference.
+    """
+    __slots__ = ('resources', 'headers', 'categories', 'common_keywords', 'category_blocks', 'category_results',
+                 'resources_by_id', 'facets', 'locations', 'spatial_grid', 'word_index', 'rank_index', 'rank_dense',
+                 'trigram_index', 'terms', 'resource_names', 'version', 'source_signature')
+
+    def __init__(self, resources=(), headers=(), categories=(), common_keywords=(), category_blocks=(),
+                 category_results=None, resources_by_id=None, facets=None, locations=None, spatial_grid=None,
+                 word_index=None, rank_index=None, rank_dense=None, trigram_index=None, terms=(), resource_names=(), version='',
+                 source_signature=None):
+        self.resources = resources
+        self.headers = headers
+        self.categories = categories
+        # Lower-cased words for the home page hints, see get_common_keywords()
+        self.common_keywords = common_keywords
+        self.category_blocks = category_blocks
+        self.category_results = category_results or {}
+        # resource_id -> Resource, so a detail page is one dict lookup
+        self.resources_by_id = resources_by_id or {}
+        # Facet group -> value -> bitset of row indices, see build_facets()
+        self.facets = facets or {}
+        # row_index -> Location of the resources with an address, and the grid of those with coordinates
+        self.locations = locations or {}
+        self.spatial_grid = spatial_grid or SpatialGrid()
+        self.word_index = word_index or {}
+        self.rank_index = rank_index or {}
+        # Term -> score in every row, for the most common terms, see build_rank_dense()
+        self.rank_dense = rank_dense or {}
+        # Trigram -> positions in terms, the sorted rank_index terms, for typo-tolerant matching
+        self.trigram_index = trigram_index or {}
+        self.terms = terms
+        # Sorted (upper-cased name, row_index) of the valid resources, for name completion
+        self.resource_names = resource_names
+        # Content hash of the loaded CSV ('' when nothing is loaded), so cached pages and
+        # ETags from other data never match
+        self.version = version
+        # (mtime, inode, size) of the CSV when it was read, or of each sheet of a data directory,
+        # for the data watcher, see get_source_signature()
+        self.source_signature = source_signature
+
+
+# The live data. Requests read it once and keep using that snapshot until they finish.
+SNAPSHOT = DataSnapshot()
+# Serializes reloads, so two of them never race to publish
+RELOAD_LOCK = threading.Lock()
+# Parsed sheets of a data directory by path, reused by reloads while their file is unchanged
+SHEETS = {}
+# Checks of the live data, and of the last reload rejected since it was published (DataHealthReport or None)
+DATA_HEALTH = None
+REJECTED_DATA_HEALTH = None
+# Row index -> resource ID, for the /resource/<row_index> links made before resources had IDs.
+# Replaced as a whole (never modified) when a reload adds rows, see update_row_id_map().
+ROW_ID_MAP = {}
+
+
+def get_file_signature(path):
+    """Returns (mtime_ns, inode, size) for the file, or None if it can't be read."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+
+def list_sheets(directory):
+    """Returns the paths of the sheets in a data directory, sorted by name."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.lower().endswith(SHEET_FILE_EXTENSION) and not name.startswith('.'))
+
+
+def get_source_signature(path):
+    """Like get_file_signature(), for the CSV or, for a data directory, each of its sheets by name."""
+    if os.path.isdir(path):
+        return tuple((os.path.basename(sheet_path), get_file_signature(sheet_path)) for sheet_path in list_sheets(path))
+    return get_file_signature(path)
+
+
+def build_indexes(resources):
+    """Builds the search indexes saved in the snapshot file, see SNAPSHOT_INDEXES."""
+    rank_index = build_rank_index(resources)
+    return {
+        'word_index': build_word_index(resources),
+        'rank_index': rank_index,
+        'rank_dense': build_rank_dense(rank_index, len(resources)),
+        'trigram_index': build_trigram_index(sorted(rank_index)),
+    }
+
+
+def make_snapshot(resources, headers, categories, common_keywords, indexes, locations, version, source_signature):
+    """Builds the category structures and spatial grid for the resources and wraps everything in a DataSnapshot."""
+    category_blocks = build_category_blocks(resources)
+
+    return DataSnapshot(
+        resources=resources,
+        headers=headers,
+        categories=categories,
+        common_keywords=common_keywords,
+        category_blocks=category_blocks,
+        # Every category button resolves to a precomputed result list
+        category_results={category: match_category_blocks(category, category_blocks) for category in categories},
+        resources_by_id={resource.resource_id: resource for resource in resources if resource.resource_id},
+        facets=build_facets(resources, categories),
+        locations=locations,
+        spatial_grid=SpatialGrid(locations),
+        # Same order build_trigram_index numbered the terms in
+        terms=sorted(indexes['rank_index']),
+        resource_names=sorted((resource.name.upper(), resource.row_index) for resource in resources if resource.valid),
+        version=version,
+        source_signature=source_signature,
+        **indexes
+    )
+
+
+def read_csv_rows(raw_csv):
+    """
+    Streams the CSV bytes through the stdlib csv reader, giving the same rows as
+    pd.read_csv(header=None, keep_default_na=False).astype(str): blank lines are skipped
+    and short rows are padded with '' to the width of the widest row.
+    Quoted cells may span several lines, like the addresses in the sheet.
+    """
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(raw_csv), encoding='utf-8-sig', newline=''))
+    rows = [row for row in reader if row]
+
+    width = max(map(len, rows), default=0)
+    for row in rows:
+        if len(row) < width:
+            row.extend([''] * (width - len(row)))
+    return rows
 
-        CATEGORIES = get_unique_categories(ALL_DATA)
 
+def find_headers(rows):
+    """Returns the stripped cells of the header row, the first one starting with 'NAME', or []."""
+    for row in rows:
+        if len(row) > NAME_COL_INDEX and row[NAME_COL_INDEX].strip().upper() == 'NAME':
+            return [h.strip() for h in row]
+
+    print("Error: Could not find the header row starting with 'NAME'.")
+    return []
+
+
+def parse_csv_snapshot(raw_csv, version, source_signature):
+    """Parses the raw CSV bytes and builds all derived structures into a new DataSnapshot."""
+    with time_stage('parse'):
+        rows = read_csv_rows(raw_csv)
+    headers = find_headers(rows)
+
+    with time_stage('build_resources'):
+        resources, categories = build_resources(rows, headers)
+    with time_stage('build_indexes'):
+        indexes = build_indexes(resources)
+    with time_stage('locate_resources'):
+        locations = locate_resources(resources, GAZETTEER)
+    return make_snapshot(resources, headers, categories, get_common_keywords(resources), indexes, locations, version,
+                         source_signature)
+
+
+def write_snapshot_file(path, snapshot):
+    """
+    Saves the snapshot as a header, the marshalled resources and index keys, and the index
+    values as flat arrays. The file is written aside and renamed, so readers never see half of it.
+    """
+    index_meta = []
+    columns = []
+    for name, typecodes in SNAPSHOT_INDEXES.items():
+        index = getattr(snapshot, name)
+        keys = list(index)
+        index_columns = [array(typecode) for typecode in typecodes]
+        bounds = [0]
+        for key in keys:
+            values = index[key] if len(typecodes) > 1 else (index[key],)
+            for column, value in zip(index_columns, values):
+                column.extend(value)
+            bounds.append(len(index_columns[0]))
+        index_meta.append((name, keys, bounds, [len(column) for column in index_columns]))
+        columns.extend(index_columns)
+
+    meta = marshal.dumps((
+        snapshot.headers,
+        snapshot.categories,
+        snapshot.common_keywords,
+        [resource.snapshot_fields() for resource in snapshot.resources],
+        index_meta,
+        GAZETTEER.version,
+        [(row_index, *location.snapshot_fields()) for row_index, location in snapshot.locations.items()],
+    ))
+    header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, sys.byteorder == 'little',
+                                  bytes.fromhex(snapshot.version), len(meta))
+
+    fd, temp_path = tempfile.mkstemp(prefix='.snapshot-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(meta)
+            offset = len(header) + len(meta)
+            for column in columns:
+                # Align every array so it can be viewed in place once the file is mapped
+                padding = -offset % column.itemsize
+                f.write(b'\0' * padding)
+                column.tofile(f)
+                offset += padding + len(column) * column.itemsize
+        # mkstemp creates the file private to this user; other workers need to read it too
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_snapshot_file(path, version, source_signature):
+    """
+    Maps the snapshot file and rebuilds the DataSnapshot from it. Returns None if there is
+    no file, or it was written for another CSV version, format or byte order.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    try:
+        magic, format_version, little_endian, digest, meta_length = SNAPSHOT_HEADER.unpack_from(mapped)
+        if (magic, format_version, little_endian, digest.hex()) != \
+                (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, sys.byteorder == 'little', version):
+            return None
+
+        offset = SNAPSHOT_HEADER.size + meta_length
+        headers, categories, common_keywords, fields, index_meta, gazetteer_version, location_fields = \
+            marshal.loads(mapped[SNAPSHOT_HEADER.size:offset])
+        if gazetteer_version != GAZETTEER.version:
+            # Located with another ZIP code table
+            return None
+
+        # The index values stay in the mapped file; each key gets read-only views of its slices
+        view = memoryview(mapped)
+        indexes = {}
+        for (name, keys, bounds, counts), typecodes in zip(index_meta, SNAPSHOT_INDEXES.values()):
+            columns = []
+            for typecode, count in zip(typecodes, counts):
+                itemsize = array(typecode).itemsize
+                offset += -offset % itemsize
+                columns.append(view[offset:offset + count * itemsize].cast(typecode))
+                offset += count * itemsize
+            if len(columns) == 1:
+                indexes[name] = {key: columns[0][bounds[i]:bounds[i + 1]] for i, key in enumerate(keys)}
+            else:
+                indexes[name] = {key: tuple(column[bounds[i]:bounds[i + 1]] for column in columns)
+                                 for i, key in enumerate(keys)}
+
+        resources = [Resource.restore(i, *resource_fields) for i, resource_fields in enumerate(fields)]
+        locations = {row_index: Location(*parts) for row_index, *parts in location_fields}
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot file {path}: {e}")
+        return None
+
+    return make_snapshot(resources, headers, categories, common_keywords, indexes, locations, version,
+                         source_signature)
+
+
+def build_snapshot(csv_file_name):
+    """
+    Returns the DataSnapshot for the CSV, read from its snapshot file when that was saved for
+    the same CSV contents, otherwise parsed from the CSV and saved for the next start.
+    """
+    source_signature = get_file_signature(csv_file_name)
+    with open(csv_file_name, 'rb') as f:
+        raw_csv = f.read()
+    version = hashlib.sha1(raw_csv).hexdigest()
+
+    snapshot_path = csv_file_name + SNAPSHOT_FILE_SUFFIX
+    with time_stage('read_snapshot_file'):
+        snapshot = read_snapshot_file(snapshot_path, version, source_signature)
+    if snapshot is None:
+        snapshot = parse_csv_snapshot(raw_csv, version, source_signature)
+        try:
+            write_snapshot_file(snapshot_path, snapshot)
+        except OSError as e:
+            print(f"Could not save the snapshot file {snapshot_path}: {e}")
+
+    return snapshot
+
+
+class Sheet:
+    """
+    One CSV of a data directory, parsed and tokenized on its own so that a reload only reparses
+    the sheets that changed, see merge_sheets(). Row indices are local to the sheet.
+    """
+    __slots__ = ('path', 'version', 'source_signature', 'headers', 'categories', 'resources', 'word_index',
+                 'rank_terms', 'rank_lengths', 'locations', 'placed')
+
+    def __init__(self, path, version, source_signature, headers, categories, resources, word_index, rank_terms,
+                 rank_lengths, locations):
+        self.path = path
+        self.version = version
+        self.source_signature = source_signature
+        self.headers = headers
+        self.categories = categories
+        self.resources = resources
+        self.word_index = word_index
+        # count_rank_terms() output: the BM25 scores depend on every sheet, so they are computed on merging
+        self.rank_terms = rank_terms
+        self.rank_lengths = rank_lengths
+        self.locations = locations
+        # The postings and locations as last merged, renumbered to the sheet's place, see place_sheet()
+        self.placed = None
+
+
+def parse_sheet(path):
+    """
+    Reads and tokenizes one sheet. Runs in worker processes for large directories, so it only
+    does the work that doesn't depend on the other sheets, see merge_sheets().
+    """
+    source_signature = get_file_signature(path)
+    with open(path, 'rb') as f:
+        raw_csv = f.read()
+    rows = read_csv_rows(raw_csv)
+    headers = find_headers(rows)
+    resources, categories = build_resources(rows, headers)
+    terms, lengths = count_rank_terms(resources)
+    rank_terms = {term: (array('I', indices), array('d', weights)) for term, (indices, weights) in terms.items()}
+    return Sheet(path, hashlib.sha1(raw_csv).hexdigest(), source_signature, headers, categories, resources,
+                 build_word_index(resources), rank_terms, lengths, locate_resources(resources, GAZETTEER))
+
+
+def write_sheet_file(path, sheet):
+    """Saves the parsed sheet, marshalled with its arrays as bytes, written aside and renamed like the snapshot file."""
+    data = marshal.dumps((
+        SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, sys.byteorder == 'little', GAZETTEER.version, sheet.version,
+        sheet.headers,
+        sheet.categories,
+        [resource.snapshot_fields() for resource in sheet.resources],
+        {word: postings.tobytes() for word, postings in sheet.word_index.items()},
+        {term: (indices.tobytes(), weights.tobytes()) for term, (indices, weights) in sheet.rank_terms.items()},
+        sheet.rank_lengths,
+        [(row_index, *location.snapshot_fields()) for row_index, location in sheet.locations.items()],
+    ))
+    fd, temp_path = tempfile.mkstemp(prefix='.sheet-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_sheet_file(path, sheet_path, version, source_signature):
+    """
+    Returns the Sheet saved by write_sheet_file(), or None if there is no file, or it was saved
+    for other contents of the sheet, another format, byte order or ZIP code table.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    try:
+        (magic, format_version, little_endian, gazetteer_version, sheet_version, headers, categories, fields,
+         word_index, rank_terms, rank_lengths, location_fields) = marshal.loads(data)
+        if (magic, format_version, little_endian, gazetteer_version, sheet_version) != \
+                (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT_VERSION, sys.byteorder == 'little', GAZETTEER.version, version):
+            return None
+        resources = [Resource.restore(i, *resource_fields) for i, resource_fields in enumerate(fields)]
+        word_index = {word: array('I', postings) for word, postings in word_index.items()}
+        rank_terms = {term: (array('I', indices), array('d', weights)) for term, (indices, weights) in rank_terms.items()}
+        locations = {row_index: Location(*parts) for row_index, *parts in location_fields}
     except Exception as e:
-        print(f"An error occurred while loading the CSV: {e}")
-        ALL_DATA = []
+        print(f"Ignoring unreadable sheet file {path}: {e}")
+        return None
+
+    return Sheet(sheet_path, version, source_signature, headers, categories, resources, word_index, rank_terms,
+                 rank_lengths, locations)
+
+
+def parse_sheets(paths):
+    """Parses the sheets, in a process pool when there are several large ones and more than one CPU."""
+    workers = min(len(paths), os.cpu_count() or 1)
+    if workers > 1 and sum(os.path.getsize(path) for path in paths) >= SHEET_POOL_MIN_BYTES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(paths, pool.map(parse_sheet, paths)))
+    return {path: parse_sheet(path) for path in paths}
+
+
+def get_provider_key(resource):
+    """Identifies a provider across sheets by its category block, the words of its name and its phone digits."""
+    phone = dict(resource.details).get(FACET_FIELDS['phone'], '')
+    return resource.category, ' '.join(WORD_PATTERN.findall(resource.name.upper())), re.sub(r'\D', '', phone)
+
+
+def place_sheet(sheet, offset, duplicates):
+    """
+    Returns the sheet's word postings, BM25 term counts, document lengths and locations with its
+    rows numbered from offset and the duplicates rows left out. Kept on the sheet, so a later
+    merge that puts the sheet at the same place reuses them instead of renumbering every posting.
+    """
+    placed = sheet.placed
+    if placed is not None and placed[0] == offset and placed[1] == duplicates:
+        return placed[2:]
+
+    # Postings are renumbered with map() unless rows have to be left out, the usual case for
+    # sheets of different counties
+    shift = offset.__add__
+    word_index = {}
+    for word, postings in sheet.word_index.items():
+        if duplicates:
+            postings = [index for index in postings if index not in duplicates]
+        if postings:
+            word_index[word] = array('I', map(shift, postings))
+    rank_terms = {}
+    for term, (indices, weights) in sheet.rank_terms.items():
+        if duplicates:
+            kept = [i for i, index in enumerate(indices) if index not in duplicates]
+            indices, weights = [indices[i] for i in kept], array('d', [weights[i] for i in kept])
+        if indices:
+            rank_terms[term] = (array('I', map(shift, indices)), weights)
+    rank_lengths = {offset + index: length for index, length in sheet.rank_lengths.items() if index not in duplicates}
+    locations = {offset + index: location for index, location in sheet.locations.items() if index not in duplicates}
+
+    sheet.placed = (offset, duplicates, word_index, rank_terms, rank_lengths, locations)
+    return sheet.placed[2:]
+
+
+def join_postings(parts):
+    """Concatenates the per-sheet arrays of one word or term, in sheet order."""
+    return parts[0] if len(parts) == 1 else array(parts[0].typecode, b''.join(parts))
+
+
+def merge_sheets(sheets, version, source_signature):
+    """
+    Joins the sheets into one DataSnapshot, their rows numbered one after the other. An open
+    resource already listed in an earlier sheet (see get_provider_key()) is kept as a row but left
+    out of everything else, like a label row; repeats within one sheet are kept, as in a single CSV.
+    Only the cross-sheet work is done here: IDs, BM25 scores and the structures built by make_snapshot().
+    The IDs and duplicates of a sheet depend on the sheets before it, so they are checked row by
+    row on each load, but the postings and locations of a sheet that kept its place are reused
+    from the last merge and spliced in whole, see place_sheet(). The BM25 scores are recomputed,
+    as the idf and average length depend on every sheet.
+    """
+    url_adapter = app.url_map.bind('')
+    resources = []
+    resource_ids = set()
+    occurrences = Counter()
+    providers = set()
+    categories = set()
+    word_parts = defaultdict(list)
+    rank_parts = defaultdict(lambda: ([], []))
+    rank_lengths = {}
+    locations = {}
+
+    for sheet in sheets:
+        offset = len(resources)
+        duplicates = set()
+        sheet_providers = set()
+        for resource in sheet.resources:
+            valid = resource.valid
+            resource_id = detail_url = ''
+            if valid:
+                provider = get_provider_key(resource)
+                if provider in providers:
+                    duplicates.add(resource.row_index)
+                    valid = False
+                sheet_providers.add(provider)
+            if resource.resource_id and resource.row_index not in duplicates:
+                resource_id = allocate_resource_id(resource.name, resource.category, resource_ids, occurrences)
+                # Usually the ID the sheet gave it on its own, unless an earlier sheet has the same name
+                if resource_id == resource.resource_id:
+                    detail_url = resource.detail_url
+                else:
+                    detail_url = url_adapter.build('resource_detail', {'resource_id': resource_id})
+            resources.append(Resource.restore(offset + resource.row_index, resource_id, resource.name,
+                                              resource.category, resource.closed, valid, resource.details,
+                                              detail_url))
+        providers |= sheet_providers
+        categories.update(sheet.categories)
+
+        sheet_words, sheet_terms, sheet_lengths, sheet_locations = place_sheet(sheet, offset, duplicates)
+        for word, postings in sheet_words.items():
+            word_parts[word].append(postings)
+        for term, (indices, weights) in sheet_terms.items():
+            index_parts, weight_parts = rank_parts[term]
+            index_parts.append(indices)
+            weight_parts.append(weights)
+        rank_lengths.update(sheet_lengths)
+        locations.update(sheet_locations)
+
+    with time_stage('build_indexes'):
+        rank_index = score_rank_index({term: (join_postings(index_parts), join_postings(weight_parts))
+                                       for term, (index_parts, weight_parts) in rank_parts.items()}, rank_lengths)
+        indexes = {
+            'word_index': {word: join_postings(parts) for word, parts in word_parts.items()},
+            'rank_index': rank_index,
+            'rank_dense': build_rank_dense(rank_index, len(resources)),
+            'trigram_index': build_trigram_index(sorted(rank_index)),
+        }
+    headers = next((sheet.headers for sheet in sheets if sheet.headers), [])
+    return make_snapshot(resources, headers, sorted(categories), get_common_keywords(resources), indexes, locations,
+                         version, source_signature)
+
+
+def build_directory_snapshot(directory):
+    """
+    Returns the DataSnapshot for a directory of sheets, read from its snapshot file when that was
+    saved for the same sheets, otherwise merged from the sheets. Only the sheets that changed
+    since they were last parsed, in this process or before a restart (see SHEET_FILE_SUFFIX),
+    are parsed again, then all of them are merged, see merge_sheets().
+    """
+    paths = list_sheets(directory)
+    if not paths:
+        raise ValueError(f"no {SHEET_FILE_EXTENSION} files in {directory}")
+    source_signature = tuple((os.path.basename(path), get_file_signature(path)) for path in paths)
+
+    versions = []
+    changed = []
+    for path, (_, signature) in zip(paths, source_signature):
+        sheet = SHEETS.get(path)
+        if sheet is not None and sheet.source_signature == signature:
+            versions.append(sheet.version)
+            continue
+        with open(path, 'rb') as f:
+            sheet_version = hashlib.sha1(f.read()).hexdigest()
+        versions.append(sheet_version)
+        if sheet is not None and sheet.version == sheet_version:
+            # Touched but not changed
+            sheet.source_signature = signature
+        else:
+            changed.append(path)
+    version = hashlib.sha1(''.join(
+        f'{os.path.basename(path)}\0{sheet_version}\n' for path, sheet_version in zip(paths, versions)
+    ).encode('utf-8')).hexdigest()
+
+    snapshot_path = os.path.normpath(directory) + SNAPSHOT_FILE_SUFFIX
+    with time_stage('read_snapshot_file'):
+        snapshot = read_snapshot_file(snapshot_path, version, source_signature)
+    if snapshot is not None:
+        return snapshot
+
+    signatures = dict(zip(paths, (signature for _, signature in source_signature)))
+    sheet_versions = dict(zip(paths, versions))
+    with time_stage('read_sheet_files'):
+        saved = {path: read_sheet_file(path + SHEET_FILE_SUFFIX, path, sheet_versions[path], signatures[path])
+                 for path in changed}
+    SHEETS.update((path, sheet) for path, sheet in saved.items() if sheet is not None)
+    with time_stage('parse_sheets'):
+        parsed = parse_sheets([path for path, sheet in saved.items() if sheet is None])
+    SHEETS.update(parsed)
+    for path, sheet in parsed.items():
+        try:
+            write_sheet_file(path + SHEET_FILE_SUFFIX, sheet)
+        except OSError as e:
+            print(f"Could not save the sheet file {path + SHEET_FILE_SUFFIX}: {e}")
+    for path in set(SHEETS) - set(paths):
+        del SHEETS[path]
+    with time_stage('merge_sheets'):
+        snapshot = merge_sheets([SHEETS[path] for path in paths], version, source_signature)
+    try:
+        write_snapshot_file(snapshot_path, snapshot)
+    except OSError as e:
+        print(f"Could not save the snapshot file {snapshot_path}: {e}")
+    return snapshot
+
+
+def read_row_id_map(path):
+    """
+    Reads a saved row index -> resource ID map, or returns {} if there is none. IDs saved
+    without a slug (just the hash) get RESOURCE_ID_EMPTY_SLUG, like make_resource_id() gives them now.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return {int(row_index): resource_id if '-' in resource_id else f'{RESOURCE_ID_EMPTY_SLUG}-{resource_id}'
+                    for row_index, resource_id in json.load(f).items()}
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"Ignoring unreadable row ID map {path}: {e}")
+        return {}
+
+
+def update_row_id_map(row_id_map, snapshot):
+    """
+    Returns the map extended with the row indices it doesn't cover yet. Entries are never changed,
+    so a row index keeps meaning the resource it held when the map first saw it.
+    """
+    new_rows = {resource.row_index: resource.resource_id for resource in snapshot.resources
+                if resource.resource_id and resource.row_index not in row_id_map}
+    if not new_rows:
+        return row_id_map
+    return {**row_id_map, **new_rows}
+
+
+def write_row_id_map(path, row_id_map):
+    """Saves the map as JSON, written aside and renamed like the snapshot file."""
+    fd, temp_path = tempfile.mkstemp(prefix='.row-ids-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({str(row_index): resource_id for row_index, resource_id in sorted(row_id_map.items())}, f)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class DataHealthReport:
+    """
+    What the DATA_HEALTH_CHECKS found in one load of the data: how many rows failed each check,
+    with the first DATA_HEALTH_MAX_EXAMPLES of them.
+    """
+    __slots__ = ('source', 'version', 'rows', 'resources', 'counts', 'examples', 'checked_at', 'seconds')
+
+    def __init__(self, source, version, rows, resources):
+        self.source = source
+        self.version = version
+        self.rows = rows
+        # Open resources
+        self.resources = resources
+        self.counts = Counter()
+        # Check -> [{'row', 'id', 'name', 'value'}, ...]
+        self.examples = defaultdict(list)
+        self.checked_at = time.time()
+        self.seconds = 0.0
+
+    def add(self, check, resource=None, value=''):
+        """Counts a failed check, for a resource or the data as a whole."""
+        self.counts[check] += 1
+        if len(self.examples[check]) < DATA_HEALTH_MAX_EXAMPLES:
+            self.examples[check].append({
+                'row': resource.row_index if resource else None,
+                'id': resource.resource_id if resource else None,
+                'name': resource.name if resource else None,
+                'value': value,
+            })
+
+    @property
+    def errors(self):
+        """The failed checks that reject the load."""
+        return [check for check in self.counts if DATA_HEALTH_CHECKS[check][0] == 'error']
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def to_json(self):
+        return {
+            'ok': self.ok,
+            'source': self.source,
+            'version': self.version,
+            'rows': self.rows,
+            'resources': self.resources,
+            'checked_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.checked_at)),
+            'milliseconds': round(self.seconds * 1000, 1),
+            'checks': [
+                {'check': check, 'severity': severity, 'description': description, 'count': self.counts[check],
+                 'examples': self.examples.get(check, [])}
+                for check, (severity, description) in DATA_HEALTH_CHECKS.items()
+            ],
+        }
+
+
+def validate_snapshot(snapshot, live=None, source=None):
+    """
+    Runs the DATA_HEALTH_CHECKS on a snapshot before it is published, in one pass over its
+    resources. live is the snapshot it would replace, if any, to catch a reload that lost most of them.
+    """
+    start = time.perf_counter()
+    report = DataHealthReport(source or CSV_FILE_NAME, snapshot.version, len(snapshot.resources),
+                              len(snapshot.resource_names))
+
+    if not snapshot.headers:
+        report.add('missing_headers')
+    else:
+        columns = {header.rstrip(':') for header in snapshot.headers}
+        for column in DATA_HEALTH_COLUMNS:
+            if column not in columns:
+                report.add('missing_column', value=column)
+    if not snapshot.resource_names:
+        report.add('no_resources')
+    elif live is not None and len(snapshot.resource_names) < DATA_HEALTH_MIN_KEPT_FRACTION * len(live.resource_names):
+        report.add('resources_dropped', value=f'{len(live.resource_names)} before, {len(snapshot.resource_names)} now')
+    for category in snapshot.categories:
+        if not snapshot.category_results.get(category):
+            report.add('empty_category', value=category)
+
+    field_checks = {
+        FACET_FIELDS['phone']: ('malformed_phone', PHONE_PATTERN.search),
+        FACET_FIELDS['website']: ('malformed_website', WEBSITE_PATTERN.fullmatch),
+        FACET_FIELDS['email']: ('malformed_email', EMAIL_PATTERN.search),
+    }
+    # Without the table every address would be reported
+    check_locations = bool(GAZETTEER.zip_codes)
+    names = set()
+    for resource in snapshot.resources:
+        # Label and header rows, and providers already listed in an earlier sheet
+        if not resource.resource_id:
+            continue
+
+        if not resource.category:
+            report.add('no_category', resource)
+        name = (resource.name.upper(), resource.category)
+        if name in names:
+            report.add('duplicate_name', resource, resource.category)
+        names.add(name)
+
+        details = dict(resource.details)
+        for header, (check, matches) in field_checks.items():
+            value = details.get(header)
+            if value and not matches(value) and value.upper() not in FACET_MISSING_VALUES:
+                report.add(check, resource, value)
+
+        if resource.closed:
+            if not CLOSED_WORD_PATTERN.search(resource.name):
+                report.add('closed_inside_word', resource, resource.name)
+        elif CLOSED_WORD_PATTERN.search(resource.search_text):
+            report.add('closed_outside_name', resource, next(
+                (f'{header}: {value}' for header, value in resource.details if CLOSED_WORD_PATTERN.search(value)), ''))
+
+        if check_locations:
+            location = snapshot.locations.get(resource.row_index)
+            if location is not None and location.latitude is None:
+                report.add('unlocated_address', resource, details.get(GEO_ADDRESS_FIELD, ''))
+
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def read_data(path):
+    """Returns the DataSnapshot for the CSV, or the directory of sheets, at path."""
+    if os.path.isdir(path):
+        return build_directory_snapshot(path)
+    return build_snapshot(path)
+
+
+def load_data():
+    """
+    Loads and preprocesses the CSV data (or the sheets of a data directory), extracting headers and
+    categories, checks it and publishes it as the new SNAPSHOT. If the file is missing, can't be
+    parsed or fails an error check of DATA_HEALTH_CHECKS, the current snapshot is kept.
+    """
+    global SNAPSHOT, ROW_ID_MAP, DATA_HEALTH, REJECTED_DATA_HEALTH
+
+    if not os.path.exists(CSV_FILE_NAME):
+        print(f"Error: CSV file not found at {CSV_FILE_NAME}")
+        return
+
+    with RELOAD_LOCK:
+        try:
+            with time_stage('load_data'):
+                snapshot = read_data(CSV_FILE_NAME)
+            with time_stage('validate_data'):
+                report = validate_snapshot(snapshot, SNAPSHOT)
+            if not report.ok:
+                REJECTED_DATA_HEALTH = report
+                print(f"Rejected the data in {CSV_FILE_NAME}, see /admin/data-health: "
+                      f"{'; '.join(DATA_HEALTH_CHECKS[check][1] for check in report.errors)}")
+                return
+            # Before publishing, so the backend never serves a request older data than its snapshot
+            with time_stage('compile_backend'):
+                BACKEND.compile(snapshot, CSV_FILE_NAME)
+        except Exception as e:
+            print(f"An error occurred while loading the CSV: {e}")
+            return
+
+        SNAPSHOT = snapshot
+        DATA_HEALTH = report
+        REJECTED_DATA_HEALTH = None
+
+        # Old positional links keep resolving across reloads and restarts
+        row_id_map_path = CSV_FILE_NAME + ROW_ID_MAP_SUFFIX
+        known_rows = ROW_ID_MAP or read_row_id_map(row_id_map_path)
+        ROW_ID_MAP = update_row_id_map(known_rows, snapshot)
+        if ROW_ID_MAP is not known_rows:
+            try:
+                write_row_id_map(row_id_map_path, ROW_ID_MAP)
+            except OSError as e:
+                print(f"Could not save the row ID map {row_id_map_path}: {e}")
+
+    # Anything rendered from the previous data is stale now
+    RENDER_CACHE.clear()
+    SUGGEST_CACHE.clear()
+    RESULT_CACHE.clear()
+    FACET_CACHE.clear()
+    COMPRESSED_CACHE.clear()
+    warm_result_cache(snapshot)
+
+
+def watch_data_file(interval, reload=None):
+    """
+    Polls the CSV's (or the sheets') mtime/inode/size and, when it changes, calls reload (by
+    default load_data(), so the data is reloaded off the request path).
+    """
+    reload = reload or load_data
+    loaded = SNAPSHOT.source_signature
+    previous = loaded
+    while True:
+        time.sleep(interval)
+        current = get_source_signature(CSV_FILE_NAME)
+        # Only reload once the file has stayed the same for a full interval, so a save
+        # that is still being written isn't picked up half-way
+        if current is not None and current != loaded and current == previous:
+            reload()
+            loaded = current
+        previous = current
+
+
+def start_data_watcher(interval=DATA_WATCH_INTERVAL, reload=None):
+    """Starts the background thread that picks up edits to the CSV without a restart, see watch_data_file()."""
+    watcher = threading.Thread(target=watch_data_file, args=(interval, reload), name='data-watcher', daemon=True)
+    watcher.start()
+    return watcher
+
+
+def resources_dataframe(snapshot=None):
+    """
+    Returns the valid resources of the snapshot (the live one by default) as a pandas DataFrame,
+    one column per detail header, for ad-hoc analysis. pandas is only imported here.
+    """
+    import pandas as pd
+
+    snapshot = snapshot or SNAPSHOT
+    records = []
+    for _, resource in get_resource_rows_with_index(snapshot.resources):
+        record = dict(resource.details)
+        record.update(resource_id=resource.resource_id, row_index=resource.row_index, category=resource.category)
+        records.append(record)
+    return pd.DataFrame.from_records(records)
 
 
 # --- Helper function for filtering out "closed" resources ---
@@ -114,128 +1956,914 @@ def is_valid_resource(row):
 # --- Map Resource Rows to their Original Index ---
 def get_resource_rows_with_index(data):
     """
-    Returns a list of tuples: (original_row_index, row_data)
+    Returns a list of tuples: (original_row_index, resource)
     Includes only rows that are actual resources, excluding those marked 'closed'.
     """
-    resource_map = []
-    for i, row in enumerate(data):
-        if is_valid_resource(row):
-            resource_map.append((i, row))
-    return resource_map
+    return [(resource.row_index, resource) for resource in data if resource.valid]
 
 
 # ----------------------------------------------------------------
 
-def category_block_search(query, data):
+def category_block_search(query, snapshot):
     """
-    Filters by the category block structure, returning (original_row_index, row_data),
+    Filters the snapshot by the category block structure, returning (original_row_index, resource),
     and excludes resources containing 'closed'.
+    The returned list may be shared between requests and must not be modified.
     """
-    if not query or not data:
+    if not query or not snapshot.resources:
         return []
 
     user_query = query.upper().strip()
-    filtered_rows_with_index = []
-    in_matching_block = False
 
-    for i, row in enumerate(data):
-        col_d_value = row[CATEGORY_COL_INDEX].upper().strip() if len(row) > CATEGORY_COL_INDEX else ''
-        col_a_value = row[NAME_COL_INDEX].upper().strip() if len(row) > NAME_COL_INDEX else ''
+    # Category buttons hit the precomputed results, anything else only checks the block labels
+    if user_query in snapshot.category_results:
+        return snapshot.category_results[user_query]
+    return match_category_blocks(user_query, snapshot.category_blocks)
 
-        # Detect a Category Label Row
-        is_category_label_row = (col_d_value.startswith('COMMUNITY SERVICES-') or col_d_value.startswith(
-            'OTHER-')) and col_a_value == ''
 
-        if is_category_label_row:
-            # New category block found. Check if it matches the query.
-            if user_query in col_d_value:
-                in_matching_block = True
-            else:
-                in_matching_block = False
+def build_word_index(data):
+    """
+    Builds an inverted index mapping each upper-cased word to the ascending row indices
+    of the valid resources containing it. Words in STOP_WORDS are left out of the index.
+    """
+    word_index = {}
+    for index, resource in get_resource_rows_with_index(data):
+        for word in set(WORD_PATTERN.findall(resource.search_text)):
+            if word.lower() not in STOP_WORDS:
+                word_index.setdefault(word, []).append(index)
+    # Compact unsigned int arrays, the same type the snapshot file maps its postings to
+    return {word: array('I', postings) for word, postings in word_index.items()}
 
-        elif in_matching_block:
-            # We are inside the matching category block AND it must be a valid resource
-            if is_valid_resource(row):
-                # Return the index of the row and the row data
-                filtered_rows_with_index.append((i, row))
 
-    return filtered_rows_with_index
+def scan_keyword_rows(search_term, rows_with_index):
+    """Matches the search term as a whole word against each (original_row_index, resource) pair."""
+    pattern = re.compile(r'\b' + re.escape(search_term) + r'\b')
+    return [(index, resource) for index, resource in rows_with_index if pattern.search(resource.search_text)]
 
 
-def keyword_search(query, data):
+def keyword_search(query, snapshot):
     """
-    Performs a full-text search, returning (original_row_index, row_data),
+    Performs a full-text search over the snapshot, returning (original_row_index, resource),
     and excludes resources containing 'closed'.
     """
-    if not query or not data:
+    if not query or not snapshot.resources:
         return []
 
-    # Get only the valid resource rows for search with their index
-    resource_rows_map = get_resource_rows_with_index(data)
+    data = snapshot.resources
 
     # Normalize search query
     search_term = query.upper().strip()
 
-    matching_rows_with_index = []
+    # Every word of a whole-word match is also a whole word of the row, so the index
+    # narrows the candidates. Stop words are not indexed and can't narrow anything.
+    words = {word for word in WORD_PATTERN.findall(search_term) if word.lower() not in STOP_WORDS}
 
-    for index, row in resource_rows_map:
-        row_text = " ".join(row).upper()
+    if not words:
+        # No usable index for this query, fall back to scanning the valid resource rows
+        return scan_keyword_rows(search_term, get_resource_rows_with_index(data))
 
-        # Check for the search term as a whole word (using word boundaries \b)
-        if re.search(r'\b' + re.escape(search_term) + r'\b', row_text):
-            # is_valid_resource check is already done in get_resource_rows_with_index
-            matching_rows_with_index.append((index, row))
+    postings = sorted((snapshot.word_index.get(word, []) for word in words), key=len)
+    if not postings[0]:
+        return []
+
+    if len(postings) == 1 and search_term in words:
+        # A single bare word: the posting list is exactly the set of whole-word matches
+        return [(index, data[index]) for index in postings[0]]
+
+    candidates = set(postings[0])
+    for posting in postings[1:]:
+        candidates.intersection_update(posting)
+
+    # Phrases and punctuation still need the whole-word check, but only on the candidates
+    return scan_keyword_rows(search_term, ((index, data[index]) for index in sorted(candidates)))
 
-    return matching_rows_with_index
+
+def build_rank_index(data):
+    """
+    Builds the BM25 index over the valid resources. For each upper-cased term (RANK_STOP_WORDS left
+    out) it keeps the row indices containing it and the term's precomputed score in each of
+    them, highest first. Terms count RANK_FIELD_WEIGHTS times over depending on the field.
+    """
+    return score_rank_index(*count_rank_terms(data))
+
+
+def count_rank_terms(data):
+    """
+    Tokenizes the valid resources for the BM25 index, returning {term: ([row indices], [weights])}
+    in ascending row order and {row index: document length}. Kept per sheet when loading a data
+    directory, so only changed sheets are tokenized again, see merge_sheets().
+    """
+    terms = defaultdict(lambda: ([], []))
+    lengths = {}
+
+    for index, resource in get_resource_rows_with_index(data):
+        term_weights = defaultdict(float)
+        length = 0.0
+        for header, value in resource.details:
+            weight = RANK_FIELD_WEIGHTS.get(header, RANK_OTHER_FIELD_WEIGHT)
+            for term in WORD_PATTERN.findall(value.upper()):
+                if term.lower() not in RANK_STOP_WORDS:
+                    term_weights[term] += weight
+                    length += weight
+        lengths[index] = length
+        for term, term_weight in term_weights.items():
+            indices, weights = terms[term]
+            indices.append(index)
+            weights.append(term_weight)
+
+    return terms, lengths
+
+
+def score_rank_index(terms, lengths):
+    """
+    Scores the count_rank_terms() postings with BM25 and orders each term's postings best first.
+    All the postings are scored and sorted at once, as numpy arrays, then cut back into terms.
+    """
+    if not lengths:
+        return {}
+
+    average_length = sum(lengths.values()) / len(lengths) or 1.0
+    length_rows = np.fromiter(lengths.keys(), dtype=np.int64, count=len(lengths))
+    length_norms = np.zeros(int(length_rows.max()) + 1)
+    length_norms[length_rows] = RANK_K1 * (1 - RANK_B + RANK_B * np.fromiter(lengths.values(), dtype=np.float64,
+                                                                             count=len(lengths)) / average_length)
+
+    term_list = list(terms)
+    counts = np.fromiter((len(terms[term][0]) for term in term_list), dtype=np.int64, count=len(term_list))
+    total = int(counts.sum())
+    indices = np.fromiter(chain.from_iterable(terms[term][0] for term in term_list), dtype=np.int64, count=total)
+    weights = np.fromiter(chain.from_iterable(terms[term][1] for term in term_list), dtype=np.float64, count=total)
+    idfs = [math.log(1 + (len(lengths) - df + 0.5) / (df + 0.5)) for df in counts.tolist()]
+    term_scores = weights * (RANK_K1 + 1) / (weights + length_norms[indices])
+    scores = np.repeat(idfs, counts) * term_scores
+
+    # Grouped by term, then best scores first; ties keep file order
+    order = np.lexsort((indices, -term_scores, np.repeat(np.arange(len(term_list)), counts)))
+    sorted_indices = indices[order].astype(np.uint32).tobytes()
+    sorted_scores = scores[order].astype(np.float32).tobytes()
+    rank_index = {}
+    start = 0
+    for term, count in zip(term_list, counts.tolist()):
+        end = start + count
+        rank_index[term] = (array('I', sorted_indices[4 * start:4 * end]), array('f', sorted_scores[4 * start:4 * end]))
+        start = end
+    return rank_index
+
+
+def build_rank_dense(rank_index, row_count):
+    """Spreads the postings of the terms in at least 1/RANK_DENSE_FRACTION of the rows over one score per row."""
+    rank_dense = {}
+    for term, (indices, scores) in rank_index.items():
+        if len(indices) * RANK_DENSE_FRACTION >= row_count:
+            row_scores = np.zeros(row_count, dtype=np.float32)
+            row_scores[np.frombuffer(indices, dtype=np.uint32)] = np.frombuffer(scores, dtype=np.float32)
+            rank_dense[term] = array('f', row_scores.tobytes())
+    return rank_dense
+
+
+def get_query_terms(query, snapshot):
+    """
+    Returns the set of indexed terms a keyword query searches for: its words without RANK_STOP_WORDS,
+    unknown ones replaced by their closest spelling, see correct_term().
+    """
+    terms = set()
+    for term in WORD_PATTERN.findall(query.upper()):
+        if term.lower() in RANK_STOP_WORDS:
+            continue
+        if term not in snapshot.rank_index:
+            # Misspelled or unknown words fall back to the closest indexed term, if any
+            term = correct_term(term, snapshot)
+        if term:
+            terms.add(term)
+    return terms
+
+
+def ranked_search(query, snapshot, limit=RANKED_SEARCH_LIMIT):
+    """
+    Ranks the resources containing any of the query's terms by BM25 score, returning up to
+    limit (original_row_index, resource) pairs, best first, or all of them if limit is None.
+    Equal scores keep file order, so a limit only ever cuts the full ranking short.
+    Terms that are not indexed are replaced by their closest spelling, see correct_term().
+    Queries with no indexed terms (only function words) fall back to keyword_search().
+    """
+    if not query or not snapshot.resources:
+        return []
+
+    terms = get_query_terms(query, snapshot)
+    if not terms:
+        matches = keyword_search(query, snapshot)
+        return matches if limit is None else matches[:limit]
+
+    data = snapshot.resources
+    if len(terms) == 1:
+        # A single term's postings are already in score order
+        indices = snapshot.rank_index[terms.pop()][0]
+        return [(index, data[index]) for index in (indices if limit is None else indices[:limit])]
+
+    # Every row gets its full score, so a limit never changes which resources rank first. The
+    # scores are added up a whole column at a time (common terms) or a term's postings at a time.
+    terms = sorted(terms)
+    scores = np.zeros(len(data))
+    for term in terms:
+        row_scores = snapshot.rank_dense.get(term)
+        if row_scores is not None:
+            scores += np.frombuffer(row_scores, dtype=np.float32)
+        else:
+            indices, term_scores = snapshot.rank_index[term]
+            scores[np.frombuffer(indices, dtype=np.uint32)] += np.frombuffer(term_scores, dtype=np.float32)
+
+    if limit is None:
+        ranked = np.flatnonzero(scores)
+    else:
+        # The limit-th best score among each term's leading postings is a floor for the
+        # limit-th best overall, and only the few rows reaching it need sorting
+        leading = np.unique(np.concatenate([np.frombuffer(snapshot.rank_index[term][0], dtype=np.uint32)[:limit]
+                                            for term in terms]))
+        leading_scores = scores[leading]
+        floor = np.partition(leading_scores, -limit)[-limit] if len(leading) > limit else leading_scores.min()
+        ranked = np.flatnonzero(scores >= floor)
+    ranked_scores = scores[ranked]
+    if limit is not None and len(ranked) > limit:
+        keep = ranked_scores >= np.partition(ranked_scores, -limit)[-limit]
+        ranked, ranked_scores = ranked[keep], ranked_scores[keep]
+    # Equal scores keep file order
+    ranked = ranked[np.lexsort((ranked, -ranked_scores))][:limit]
+    return [(index, data[index]) for index in ranked.tolist()]
+
+
+def get_trigrams(term):
+    """Returns the character trigrams of the term, padded so its first and last letters get their own."""
+    padded = f'${term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_trigram_index(terms):
+    """Maps each trigram to the ascending positions (in the sorted terms list) of the terms containing it."""
+    trigram_index = defaultdict(list)
+    for position, term in enumerate(terms):
+        for trigram in get_trigrams(term):
+            trigram_index[trigram].append(position)
+    return {trigram: array('I', positions) for trigram, positions in trigram_index.items()}
+
+
+def edit_distance(a, b, max_edits):
+    """
+    Edit distance between a and b counting insertions, deletions, substitutions and swaps of
+    two neighbouring letters, or max_edits + 1 as soon as it is known to be larger.
+    """
+    if abs(len(a) - len(b)) > max_edits:
+        return max_edits + 1
+
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before_previous and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before_previous[j - 2] + 1)
+            current.append(distance)
+        if min(current) > max_edits:
+            return max_edits + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_edits + 1)
+
+
+def fuzzy_terms(term, snapshot):
+    """
+    Returns the indexed terms closest to the upper-cased term, one edit away or, for long terms,
+    two if nothing is closer, as (distance, term) pairs, most common first.
+    Only terms sharing enough trigrams with it are compared.
+    """
+    # Numbers (phone numbers, ZIP codes) are looked up exactly
+    if len(term) < FUZZY_MIN_TERM_LENGTH or term.isdigit() or not snapshot.terms:
+        return []
+
+    trigrams = get_trigrams(term)
+    shared = Counter()
+    for trigram in trigrams:
+        shared.update(snapshot.trigram_index.get(trigram, ()))
+
+    # Try a single edit first: it filters on more shared trigrams, so far fewer terms are compared
+    for max_edits in ((1,) if len(term) < FUZZY_TWO_EDITS_MIN_LENGTH else (1, 2)):
+        # One edit changes at most four trigrams (swapping two letters), so closer terms share at least this many
+        min_shared = max(1, len(trigrams) - 4 * max_edits)
+        # Terms whose length is already too different are never compared
+        candidates = [position for position, count in shared.items()
+                      if count >= min_shared and abs(len(snapshot.terms[position]) - len(term)) <= max_edits]
+
+        matches = []
+        for position in heapq.nlargest(FUZZY_MAX_CANDIDATES, candidates, key=shared.__getitem__):
+            candidate = snapshot.terms[position]
+            distance = edit_distance(term, candidate, max_edits)
+            if distance <= max_edits:
+                matches.append((distance, -len(snapshot.rank_index[candidate][0]), candidate))
+        if matches:
+            matches.sort()
+            return [(distance, candidate) for distance, _, candidate in matches]
+
+    return []
+
+
+def correct_term(term, snapshot):
+    """Returns the closest indexed spelling of the upper-cased term, or None if nothing is close."""
+    matches = fuzzy_terms(term, snapshot)
+    return matches[0][1] if matches else None
+
+
+def complete_prefix(prefix, snapshot, limit):
+    """Returns up to limit indexed terms starting with the upper-cased prefix, most common first."""
+    terms = snapshot.terms
+    # The terms are sorted, so the completions are one contiguous range
+    start = bisect.bisect_left(terms, prefix)
+    end = bisect.bisect_right(terms, prefix + '\U0010ffff', start)
+    return heapq.nlargest(limit, terms[start:end], key=lambda term: len(snapshot.rank_index[term][0]))
+
+
+def suggest(query, snapshot, limit=SUGGEST_DEFAULT_LIMIT):
+    """
+    As-you-type suggestions for a partly typed query. Returns up to limit lower-cased queries,
+    completing the last word (or correcting its spelling when few words start with it), and up to
+    limit (original_row_index, resource) pairs whose name starts with the query.
+    """
+    words = WORD_PATTERN.findall(query.upper())
+    if not words or not snapshot.resources:
+        return [], []
+
+    last_word = words[-1]
+    completions = complete_prefix(last_word, snapshot, limit)
+    if len(completions) < limit:
+        for _, term in fuzzy_terms(last_word, snapshot):
+            if term not in completions:
+                completions.append(term)
+                if len(completions) == limit:
+                    break
+    suggestions = [' '.join(words[:-1] + [term]).lower() for term in completions]
+
+    name_prefix = query.upper().strip()
+    resources = []
+    position = bisect.bisect_left(snapshot.resource_names, (name_prefix,))
+    for name, index in snapshot.resource_names[position:position + limit]:
+        if not name.startswith(name_prefix):
+            break
+        resources.append((index, snapshot.resources[index]))
+
+    return suggestions, resources
+
+
+class MemoryBackend:
+    """Searches and detail lookups on the in-memory indexes of the DataSnapshot."""
+
+    def compile(self, snapshot, data_path):
+        """Nothing to prepare: the snapshot is the storage."""
+
+    def keyword_search(self, query, snapshot):
+        return keyword_search(query, snapshot)
+
+    def ranked_search(self, query, snapshot, limit=RANKED_SEARCH_LIMIT):
+        return ranked_search(query, snapshot, limit)
+
+    def category_search(self, query, snapshot):
+        return category_block_search(query, snapshot)
+
+    def get_resource(self, resource_id, snapshot):
+        return snapshot.resources_by_id.get(resource_id)
+
+
+# Full-text columns of the SQLite backend, each with its BM25 weight: the whole row for phrase
+# searches (weight 0, so it doesn't count twice), then the ranked fields as in build_rank_index().
+# Tokens are WORD_PATTERN's \w+ words: case-insensitive, accents kept, '_' part of a word.
+SQLITE_FTS_COLUMNS = {'search_text': 0.0, **{header.lower(): weight for header, weight in RANK_FIELD_WEIGHTS.items()},
+                      'other': RANK_OTHER_FIELD_WEIGHT}
+SQLITE_SCHEMA = f"""
+CREATE TABLE meta (version TEXT NOT NULL, schema TEXT NOT NULL);
+CREATE TABLE resources (
+    row_index INTEGER PRIMARY KEY,
+    resource_id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    search_text TEXT NOT NULL,
+    category TEXT NOT NULL,
+    closed INTEGER NOT NULL,
+    valid INTEGER NOT NULL,
+    details TEXT NOT NULL,
+    detail_url TEXT NOT NULL
+);
+CREATE TABLE category_resources (
+    category TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    PRIMARY KEY (category, row_index)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE resources_fts USING fts5({', '.join(SQLITE_FTS_COLUMNS)}, content='',
+                                             tokenize="unicode61 remove_diacritics 0 tokenchars '_'");
+"""
+# Stored in the database, so a file compiled with another schema is rebuilt
+SQLITE_SCHEMA_VERSION = hashlib.sha1(SQLITE_SCHEMA.encode('utf-8')).hexdigest()
+
+
+class SQLiteBackend:
+    """
+    Searches and detail lookups as indexed queries on a SQLite database compiled from the
+    snapshot: a resources table (one row per resource with an ID, category block resolved and
+    closed flag set), the category button memberships and an FTS5 index of the open resources.
+    Each thread keeps its own read-only connection. The database can also be queried ad hoc.
+    """
+
+    def __init__(self):
+        # Set by compile(), next to the CSV (or data directory)
+        self.path = None
+        self.local = threading.local()
+
+    def read_version(self):
+        """Returns the data version the database was compiled from, or None if there is none or its schema changed."""
+        try:
+            connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+            try:
+                version, schema = connection.execute('SELECT version, schema FROM meta').fetchone()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return None
+        return version if schema == SQLITE_SCHEMA_VERSION else None
+
+    def compile(self, snapshot, data_path):
+        """
+        Writes the database for the snapshot, unless the one on disk already holds its data.
+        Written aside and renamed like the snapshot file, so readers never see half of it.
+        """
+        self.path = os.path.normpath(data_path) + SQLITE_FILE_SUFFIX
+        if not snapshot.version or self.read_version() == snapshot.version:
+            return
+
+        fd, temp_path = tempfile.mkstemp(prefix='.sqlite-', dir=os.path.dirname(os.path.abspath(self.path)))
+        os.close(fd)
+        try:
+            connection = sqlite3.connect(temp_path)
+            try:
+                # A new file that is renamed into place once complete needs no journal
+                connection.execute('PRAGMA journal_mode = OFF')
+                connection.execute('PRAGMA synchronous = OFF')
+                connection.executescript(SQLITE_SCHEMA)
+                connection.execute('INSERT INTO meta VALUES (?, ?)', (snapshot.version, SQLITE_SCHEMA_VERSION))
+                named = [resource for resource in snapshot.resources if resource.resource_id]
+                connection.executemany('INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                    (resource.row_index, resource.resource_id, resource.name, resource.search_text, resource.category,
+                     resource.closed, resource.valid, json.dumps(resource.details), resource.detail_url)
+                    for resource in named
+                ))
+                connection.executemany('INSERT INTO category_resources VALUES (?, ?)', (
+                    (category, index) for category, rows in snapshot.category_results.items() for index, _ in rows
+                ))
+                connection.executemany(
+                    f'INSERT INTO resources_fts (rowid, {", ".join(SQLITE_FTS_COLUMNS)}) '
+                    f'VALUES (?{", ?" * len(SQLITE_FTS_COLUMNS)})',
+                    ((resource.row_index, resource.search_text) + self.ranked_fields(resource)
+                     for resource in named if resource.valid)
+                )
+                connection.commit()
+            finally:
+                connection.close()
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @staticmethod
+    def ranked_fields(resource):
+        """The resource's detail values grouped into the ranked full-text columns."""
+        fields = {header: [] for header in RANK_FIELD_WEIGHTS}
+        other = []
+        for header, value in resource.details:
+            fields.get(header, other).append(value)
+        return tuple(' '.join(values) for values in fields.values()) + (' '.join(other),)
+
+    def connection(self, snapshot):
+        """
+        The thread's connection to the database compiled from the snapshot, or None if the file on
+        disk already holds newer data (a request still using the previous snapshot during a reload).
+        """
+        local = self.local
+        if getattr(local, 'version', None) != snapshot.version:
+            if getattr(local, 'connection', None) is not None:
+                local.connection.close()
+            local.connection = local.version = None
+            try:
+                connection = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True)
+                local.version = connection.execute('SELECT version FROM meta').fetchone()[0]
+            except sqlite3.Error:
+                # Not compiled (yet); the memory backend answers meanwhile
+                return None
+            local.connection = connection
+        return local.connection if local.version == snapshot.version else None
+
+    def keyword_search(self, query, snapshot):
+        """Like keyword_search(): FTS5 finds the rows with the query's words in a row, then the whole-word check runs."""
+        connection = self.connection(snapshot)
+        if not query or not snapshot.resources or connection is None:
+            return MEMORY_BACKEND.keyword_search(query, snapshot)
+
+        search_term = query.upper().strip()
+        words = WORD_PATTERN.findall(search_term)
+        if words:
+            phrase = '"' + ' '.join(words) + '"'
+            candidates = connection.execute(
+                'SELECT row_index, search_text FROM resources WHERE row_index IN '
+                '(SELECT rowid FROM resources_fts WHERE resources_fts MATCH ?) ORDER BY row_index',
+                (f'{{search_text}} : {phrase}',)
+            )
+        else:
+            candidates = connection.execute(
+                'SELECT row_index, search_text FROM resources WHERE valid AND instr(search_text, ?) ORDER BY row_index',
+                (search_term,)
+            )
+        pattern = re.compile(r'\b' + re.escape(search_term) + r'\b')
+        data = snapshot.resources
+        return [(index, data[index]) for index, search_text in candidates if pattern.search(search_text)]
+
+    def ranked_search(self, query, snapshot, limit=RANKED_SEARCH_LIMIT):
+        """Like ranked_search(), ranked by FTS5's BM25 with the same field weights (and its own term statistics)."""
+        connection = self.connection(snapshot)
+        if not query or not snapshot.resources or connection is None:
+            return MEMORY_BACKEND.ranked_search(query, snapshot, limit)
+
+        terms = get_query_terms(query, snapshot)
+        if not terms:
+            matches = self.keyword_search(query, snapshot)
+            return matches if limit is None else matches[:limit]
+        ranked_columns = ' '.join(list(SQLITE_FTS_COLUMNS)[1:])
+        weights = ', '.join(str(weight) for weight in SQLITE_FTS_COLUMNS.values())
+        rows = connection.execute(
+            f'SELECT rowid FROM resources_fts WHERE resources_fts MATCH ? '
+            f'ORDER BY bm25(resources_fts, {weights}), rowid LIMIT ?',
+            (f'{{{ranked_columns}}} : (' + ' OR '.join(f'"{term}"' for term in sorted(terms)) + ')',
+             -1 if limit is None else limit)
+        )
+        data = snapshot.resources
+        return [(index, data[index]) for index, in rows]
+
+    def category_search(self, query, snapshot):
+        """Like category_block_search(): button categories by their index, other queries by the block labels."""
+        connection = self.connection(snapshot)
+        if not query or not snapshot.resources or connection is None:
+            return MEMORY_BACKEND.category_search(query, snapshot)
+
+        user_query = query.upper().strip()
+        if user_query in snapshot.category_results:
+            rows = connection.execute('SELECT row_index FROM category_resources WHERE category = ? ORDER BY row_index',
+                                      (user_query,))
+        else:
+            rows = connection.execute(
+                "SELECT row_index FROM resources WHERE valid AND category != '' AND instr(category, ?) "
+                "ORDER BY row_index", (user_query,))
+        data = snapshot.resources
+        return [(index, data[index]) for index, in rows]
+
+    def get_resource(self, resource_id, snapshot):
+        """Looks the resource up by its ID, rebuilding the record from its row."""
+        connection = self.connection(snapshot)
+        if connection is None:
+            return MEMORY_BACKEND.get_resource(resource_id, snapshot)
+
+        row = connection.execute('SELECT * FROM resources WHERE resource_id = ?', (resource_id,)).fetchone()
+        if row is None:
+            return None
+        row_index, resource_id, name, _, category, closed, valid, details, detail_url = row
+        return Resource.restore(row_index, resource_id, name, category, bool(closed), bool(valid),
+                                tuple(map(tuple, json.loads(details))), detail_url)
+
+
+# Answers for the SQLite backend while its database doesn't hold the request's data
+MEMORY_BACKEND = MemoryBackend()
+BACKENDS = {'memory': MemoryBackend, 'sqlite': SQLiteBackend}
+if STORAGE_BACKEND not in BACKENDS:
+    raise ValueError(f"SERVICE_DIRECTORY_BACKEND must be one of: {', '.join(BACKENDS)}")
+BACKEND = BACKENDS[STORAGE_BACKEND]()
 
 
 # --- Function: Generates buttons instead of a table ---
-def build_buttons_html(values_with_index):
-    """Generates the HTML string for a uniform grid of clickable service buttons."""
+def build_buttons_html(values_with_index, distance=None):
+    """
+    Generates the HTML for a uniform grid of clickable service buttons, in chunks of
+    RESULTS_CHUNK_SIZE buttons so a long results page can be streamed. distance(resource), when
+    given, returns the miles to show on a button (None for resources that weren't located).
+    """
 
     if not values_with_index:
-        return '<div class="loading-message">No matching resources found.</div>'
-
-    html = '<div class="service-buttons-container">'
+        yield '<div class="loading-message">No matching resources found.</div>'
+        return
 
-    for row_index, row in values_with_index:
-        # Get the service name from the NAME_COL_INDEX
-        service_name = row[NAME_COL_INDEX].strip() if len(row) > NAME_COL_INDEX else 'Untitled Service'
+    yield '<div class="service-buttons-container">'
 
+    for start in range(0, len(values_with_index), RESULTS_CHUNK_SIZE):
+        # Names were stripped and detail URLs built at load time.
         # is_valid_resource check is already done in the search functions
-        if service_name:
-            detail_url = url_for('resource_detail', row_index=row_index)
-            # Use the service-button class for uniform styling
-            html += f'<a href="{detail_url}" class="service-button">{service_name}</a>'
-
-    html += '</div>'
-    return html
+        chunk = values_with_index[start:start + RESULTS_CHUNK_SIZE]
+        if distance is None:
+            yield ''.join(
+                f'<a href="{resource.detail_url}" class="service-button">{escape(resource.name)}</a>'
+                for _, resource in chunk if resource.name
+            )
+            continue
+        buttons = []
+        for _, resource in chunk:
+            if resource.name:
+                miles = distance(resource)
+                miles_html = '' if miles is None else f' <span class="distance">{miles:.1f} mi</span>'
+                buttons.append(f'<a href="{resource.detail_url}" class="service-button">{escape(resource.name)}'
+                               f'{miles_html}</a>')
+        yield ''.join(buttons)
+
+    yield '</div>'
 
 
 # -------------------------------------------------------------
 
+def build_facets_html(query, search_type, filters, counts, near=()):
+    """
+    Generates the results page sidebar: every facet value with matches, and its count, linking to
+    the results with that value added to the filters (or removed, when it is already selected).
+    A resource has one status, so a status link replaces the selected one. The links keep the near search.
+    """
+    near_args = get_near_args(near)
+    selected = dict(filters)
+    selected.setdefault('status', FACET_DEFAULT_STATUS)
+    sections = []
+    for group in FACET_GROUPS:
+        links = []
+        for value, count in counts[group].items():
+            is_selected = value in selected.get(group, ())
+            if not count and not is_selected:
+                continue
+            if group == 'status':
+                values = [value]
+            else:
+                values = sorted(set(selected.get(group, ())) ^ {value})
+            link_filters = {**selected, group: values}
+            if tuple(link_filters['status']) == FACET_DEFAULT_STATUS:
+                del link_filters['status']
+            url = url_for('results', query=query, search_type=search_type, **link_filters, **near_args)
+            css_class = 'facet selected' if is_selected else 'facet'
+            links.append(f'<li><a href="{escape(url)}" class="{css_class}">{escape(value.capitalize())} '
+                         f'<span class="facet-count">{count}</span></a></li>')
+        if links:
+            sections.append(f'<h3>{FACET_TITLES[group]}</h3><ul>{"".join(links)}</ul>')
+    return '<aside class="facets">' + ''.join(sections) + '</aside>'
+
+
 def generate_category_buttons_html(categories):
     """Generates the HTML string for the category buttons."""
-    html = ""
-    for category in categories:
-        category_url = url_for('results', query=category, search_type='category')
-        html += f'<a href="{category_url}" class="category-button">{category}</a>'
-    return html
+    return ''.join(
+        f'<a href="{escape(url_for("results", query=category, search_type="category"))}" '
+        f'class="category-button">{escape(category)}</a>'
+        for category in categories
+    )
 
 
 def generate_keyword_list_html(keywords):
     """Generates the HTML string for the keyword list."""
-    html = "<ul>"
-    for keyword in keywords:
-        html += f'<li>{keyword.capitalize()}</li>'
-    html += "</ul>"
-    return html
-
-
-# Load data on startup
-load_data()
+    return '<ul>' + ''.join(f'<li>{escape(keyword.capitalize())}</li>' for keyword in keywords) + '</ul>'
+
+
+# Styles of all the pages, served as one file the browser downloads once (see stylesheet())
+page_stylesheet = """
+body { font-family: 'Inter', sans-serif; padding: 20px; background-color: #f8f9fa; }
+.back-link { margin-bottom: 20px; text-decoration: none; font-weight: 500; }
+.back-link:hover { text-decoration: underline; }
+.error-message {
+    background-color:#f8d7da; 
+    color:#721c24; 
+    border-color:#f5c6cb;
+    padding: 15px;
+    border: 1px solid;
+    border-radius: 8px;
+}
+
+/* Search page */
+body.search-page { display: flex; justify-content: center; align-items: center; min-height: 100vh; margin: 0; }
+.card {
+    background: white;
+    padding: 40px;
+    border-radius: 12px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+    max-width: 600px; 
+    width: 100%;
+}
+.search-page h2 { color: #343a40; text-align: center; margin-bottom: 25px; }
+#search-form { display: flex; gap: 10px; margin-bottom: 20px; }
+#category-search { 
+    padding: 12px; 
+    border: 1px solid #ced4da; 
+    border-radius: 8px; 
+    flex-grow: 1;
+    box-shadow: inset 0 1px 3px rgba(0,0,0,0.05);
+}
+#near-search {
+    padding: 12px;
+    border: 1px solid #ced4da;
+    border-radius: 8px;
+    width: 8em;
+    box-shadow: inset 0 1px 3px rgba(0,0,0,0.05);
+}
+#filter-button {
+    background-color: #007bff; 
+    color: white; 
+    padding: 12px 20px; 
+    border: none; 
+    border-radius: 8px; 
+    cursor: pointer; 
+    transition: background-color 0.3s, transform 0.1s;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+    font-weight: 600;
+}
+#filter-button:hover { background-color: #0056b3; transform: translateY(-1px); }
+
+.section-title {
+    text-align: center;
+    color: #6c757d;
+    margin: 20px 0 10px;
+    font-size: 0.9em;
+    border-top: 1px solid #e9ecef;
+    padding-top: 20px;
+}
+.category-buttons {
+    display: flex;
+    flex-wrap: wrap;
+    gap: 10px;
+    justify-content: center;
+    max-height: 200px; 
+    overflow-y: auto; 
+    padding: 5px;
+}
+.category-button {
+    background-color: #f0f0f0;
+    color: #343a40;
+    padding: 8px 15px;
+    border: 1px solid #ced4da;
+    border-radius: 6px;
+    cursor: pointer;
+    transition: background-color 0.2s;
+    font-weight: 500;
+    text-decoration: none;
+    display: inline-block;
+    text-transform: uppercase;
+    font-size: 0.85em;
+}
+.category-button:hover {
+    background-color: #e2e6ea;
+    border-color: #dae0e5;
+}
+.keyword-list-container {
+    padding: 10px 0;
+    text-align: center;
+    font-size: 0.9em;
+}
+.keyword-list-container strong {
+    display: block;
+    margin-bottom: 5px;
+}
+.keyword-list-container ul {
+    list-style: none;
+    padding: 0;
+    margin: 10px 0 0;
+    display: flex;
+    flex-wrap: wrap;
+    justify-content: center;
+    gap: 8px;
+    font-size: 0.9em;
+}
+.keyword-list-container li {
+    background-color: #f8f9fa;
+    color: #495057;
+    padding: 4px 8px;
+    border: 1px solid #e9ecef;
+    border-radius: 4px;
+}
+
+/* Results page */
+.results-page h2 { color: #343a40; border-bottom: 2px solid #e9ecef; padding-bottom: 10px; }
+.results-page .back-link { display: block; color: #007bff; }
+.loading-message {
+    padding: 15px; 
+    background-color: #fff3cd; 
+    border: 1px solid #ffeeba; 
+    color: #856404;
+    border-radius: 8px;
+}
+
+/* Styling for the new button layout */
+.service-buttons-container {
+    display: grid;
+    /* Creates 3 columns of equal size, adjusts for smaller screens */
+    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); 
+    gap: 15px;
+    padding: 30px;
+    background: white;
+    border-radius: 8px;
+    box-shadow: 0 0 15px rgba(0,0,0,0.05);
+}
+.service-button {
+    /* These properties enforce uniform size */
+    display: flex;
+    justify-content: center;
+    align-items: center;
+    height: 80px; /* Fixed height */
+    text-align: center;
+
+    /* Styling */
+    background-color: #007bff;
+    color: white;
+    padding: 15px 20px;
+    border: none;
+    border-radius: 8px;
+    cursor: pointer;
+    transition: background-color 0.3s, transform 0.1s, box-shadow 0.3s;
+    font-weight: 600;
+    text-decoration: none;
+    box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+
+    /* Text wrapping for long names */
+    word-break: break-word;
+}
+.service-button:hover {
+    background-color: #0056b3;
+    transform: translateY(-2px);
+    box-shadow: 0 6px 10px rgba(0,0,0,0.15);
+}
+.distance { display: block; font-size: 0.8em; font-weight: 400; opacity: 0.8; margin-top: 4px; }
+
+/* Facet sidebar */
+.results-layout { display: flex; gap: 20px; align-items: flex-start; }
+#data-container { flex-grow: 1; }
+.facets {
+    flex: 0 0 220px;
+    background: white;
+    padding: 15px 20px;
+    border-radius: 8px;
+    box-shadow: 0 0 15px rgba(0,0,0,0.05);
+    font-size: 0.9em;
+}
+.facets h3 { color: #6c757d; font-size: 0.9em; text-transform: uppercase; margin: 15px 0 8px; }
+.facets ul { list-style: none; padding: 0; margin: 0; }
+.facet { display: flex; justify-content: space-between; padding: 4px 6px; color: #343a40; text-decoration: none; border-radius: 4px; }
+.facet:hover { background-color: #e9ecef; }
+.facet.selected { background-color: #007bff; color: white; }
+.facet-count { color: inherit; opacity: 0.7; }
+@media (max-width: 700px) { .results-layout { flex-direction: column; } .facets { flex-basis: auto; width: 100%; } }
+
+/* Detail page */
+.detail-card {
+    background: white;
+    padding: 40px;
+    border-radius: 12px;
+    box-shadow: 0 10px 25px rgba(0,0,0,0.1);
+    max-width: 800px;
+    margin: 0 auto;
+}
+.detail-page h2 { color: #007bff; text-align: center; margin-bottom: 30px; border-bottom: 2px solid #e9ecef; padding-bottom: 10px; }
+.detail-page .back-link { display: inline-block; color: #6c757d; }
+.detail-item {
+    display: flex;
+    margin-bottom: 15px;
+    padding: 10px 0;
+    border-bottom: 1px dotted #e9ecef;
+}
+.detail-item:last-child {
+    border-bottom: none;
+}
+.detail-header {
+    font-weight: 600;
+    color: #343a40;
+    flex: 0 0 180px; /* Fixed width for the label */
+    text-transform: uppercase;
+    font-size: 0.9em;
+}
+.detail-value {
+    color: #495057;
+    flex-grow: 1;
+}
+
+/* Data health page */
+.health-page h2 { color: #343a40; border-bottom: 2px solid #e9ecef; padding-bottom: 10px; }
+.health-page .back-link { display: block; color: #007bff; }
+.health-report {
+    background: white;
+    padding: 20px 30px;
+    margin-bottom: 20px;
+    border-radius: 8px;
+    box-shadow: 0 0 15px rgba(0,0,0,0.05);
+}
+.health-report h3 { color: #343a40; margin-top: 0; }
+.health-summary { color: #6c757d; font-size: 0.9em; }
+.health-check { padding: 6px 0; border-bottom: 1px dotted #e9ecef; }
+.health-check summary { cursor: pointer; }
+.health-check table { border-collapse: collapse; margin: 10px 0; font-size: 0.85em; }
+.health-check th, .health-check td { padding: 4px 10px; text-align: left; vertical-align: top; border-bottom: 1px solid #e9ecef; }
+.severity { display: inline-block; width: 5em; font-weight: 600; text-transform: uppercase; font-size: 0.8em; }
+.severity-error { color: #721c24; }
+.severity-warning { color: #856404; }
+"""
 
-# HTML for the main search page (unchanged)
+# HTML for the main search page
 search_page_template = """
 <!DOCTYPE html>
 <html lang="en">
@@ -243,107 +2871,16 @@ search_page_template = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Resource Search</title>
-    <style>
-        body { font-family: 'Inter', sans-serif; padding: 20px; background-color: #f8f9fa; display: flex; justify-content: center; align-items: center; min-height: 100vh; margin: 0; }
-        .card {
-            background: white;
-            padding: 40px;
-            border-radius: 12px;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-            max-width: 600px; 
-            width: 100%;
-        }
-        h2 { color: #343a40; text-align: center; margin-bottom: 25px; }
-        #search-form { display: flex; gap: 10px; margin-bottom: 20px; }
-        #category-search { 
-            padding: 12px; 
-            border: 1px solid #ced4da; 
-            border-radius: 8px; 
-            flex-grow: 1;
-            box-shadow: inset 0 1px 3px rgba(0,0,0,0.05);
-        }
-        #filter-button {
-            background-color: #007bff; 
-            color: white; 
-            padding: 12px 20px; 
-            border: none; 
-            border-radius: 8px; 
-            cursor: pointer; 
-            transition: background-color 0.3s, transform 0.1s;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-            font-weight: 600;
-        }
-        #filter-button:hover { background-color: #0056b3; transform: translateY(-1px); }
-
-        .section-title {
-            text-align: center;
-            color: #6c757d;
-            margin: 20px 0 10px;
-            font-size: 0.9em;
-            border-top: 1px solid #e9ecef;
-            padding-top: 20px;
-        }
-        .category-buttons {
-            display: flex;
-            flex-wrap: wrap;
-            gap: 10px;
-            justify-content: center;
-            max-height: 200px; 
-            overflow-y: auto; 
-            padding: 5px;
-        }
-        .category-button {
-            background-color: #f0f0f0;
-            color: #343a40;
-            padding: 8px 15px;
-            border: 1px solid #ced4da;
-            border-radius: 6px;
-            cursor: pointer;
-            transition: background-color 0.2s;
-            font-weight: 500;
-            text-decoration: none;
-            display: inline-block;
-            text-transform: uppercase;
-            font-size: 0.85em;
-        }
-        .category-button:hover {
-            background-color: #e2e6ea;
-            border-color: #dae0e5;
-        }
-        .keyword-list-container {
-            padding: 10px 0;
-            text-align: center;
-            font-size: 0.9em;
-        }
-        .keyword-list-container strong {
-            display: block;
-            margin-bottom: 5px;
-        }
-        .keyword-list-container ul {
-            list-style: none;
-            padding: 0;
-            margin: 10px 0 0;
-            display: flex;
-            flex-wrap: wrap;
-            justify-content: center;
-            gap: 8px;
-            font-size: 0.9em;
-        }
-        .keyword-list-container li {
-            background-color: #f8f9fa;
-            color: #495057;
-            padding: 4px 8px;
-            border: 1px solid #e9ecef;
-            border-radius: 4px;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('stylesheet', version=stylesheet_version) }}">
 </head>
-<body>
+<body class="search-page">
     <div class="card">
         <h2>Resource Search</h2>
 
         <form id="search-form" action="{{ url_for('results') }}" method="get">
-            <input type="text" id="category-search" name="query" placeholder="Search by Keyword (e.g., CHURCH, COUNSELING, YWCA)" required>
+            <input type="text" id="category-search" name="query" placeholder="Search by Keyword (e.g., CHURCH, COUNSELING, YWCA)" list="keyword-suggestions" autocomplete="off" required>
+            <datalist id="keyword-suggestions"></datalist>
+            <input type="text" id="near-search" name="near" placeholder="ZIP (optional)" inputmode="numeric" pattern="[0-9]{5}" title="A 5-digit ZIP code, to list the nearest resources first" autocomplete="postal-code">
             <input type="hidden" name="search_type" value="keyword">
             <button type="submit" id="filter-button">Search</button> 
         </form>
@@ -360,11 +2897,31 @@ search_page_template = """
         </div>
 
     </div>
+    <script>
+        // Offers completions from the data as the user types, once they pause for a moment
+        const searchInput = document.getElementById('category-search');
+        const suggestionList = document.getElementById('keyword-suggestions');
+        let pendingSuggest = null;
+        searchInput.addEventListener('input', () => {
+            clearTimeout(pendingSuggest);
+            const query = searchInput.value.trim();
+            if (!query) {
+                return;
+            }
+            pendingSuggest = setTimeout(async () => {
+                const response = await fetch("{{ url_for('api_suggest') }}?query=" + encodeURIComponent(query));
+                if (response.ok) {
+                    const data = await response.json();
+                    suggestionList.replaceChildren(...data.suggestions.map(text => new Option(text)));
+                }
+            }, 150);
+        });
+    </script>
 </body>
 </html>
 """
 
-# HTML for results page (unchanged)
+# HTML for results page
 results_page_template = """
 <!DOCTYPE html>
 <html lang="en">
@@ -372,82 +2929,25 @@ results_page_template = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Search Results</title>
-    <style>
-        body { font-family: 'Inter', sans-serif; padding: 20px; background-color: #f8f9fa; }
-        h2 { color: #343a40; border-bottom: 2px solid #e9ecef; padding-bottom: 10px; }
-        .back-link { display: block; margin-bottom: 20px; color: #007bff; text-decoration: none; font-weight: 500; }
-        .back-link:hover { text-decoration: underline; }
-        .loading-message {
-            padding: 15px; 
-            background-color: #fff3cd; 
-            border: 1px solid #ffeeba; 
-            color: #856404;
-            border-radius: 8px;
-        }
-        .error-message {
-            background-color:#f8d7da; 
-            color:#721c24; 
-            border-color:#f5c6cb;
-            padding: 15px;
-            border: 1px solid;
-            border-radius: 8px;
-        }
-
-        /* Styling for the new button layout */
-        .service-buttons-container {
-            display: grid;
-            /* Creates 3 columns of equal size, adjusts for smaller screens */
-            grid-template-columns: repeat(auto-fit, minmax(280px, 1fr)); 
-            gap: 15px;
-            padding: 30px;
-            background: white;
-            border-radius: 8px;
-            box-shadow: 0 0 15px rgba(0,0,0,0.05);
-        }
-        .service-button {
-            /* These properties enforce uniform size */
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            height: 80px; /* Fixed height */
-            text-align: center;
-
-            /* Styling */
-            background-color: #007bff;
-            color: white;
-            padding: 15px 20px;
-            border: none;
-            border-radius: 8px;
-            cursor: pointer;
-            transition: background-color 0.3s, transform 0.1s, box-shadow 0.3s;
-            font-weight: 600;
-            text-decoration: none;
-            box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-
-            /* Text wrapping for long names */
-            word-break: break-word;
-        }
-        .service-button:hover {
-            background-color: #0056b3;
-            transform: translateY(-2px);
-            box-shadow: 0 6px 10px rgba(0,0,0,0.15);
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('stylesheet', version=stylesheet_version) }}">
 </head>
-<body>
+<body class="results-page">
 
     <a href="/" class="back-link">&larr; Back to Search</a>
     <h2 id="results-title">{{ title }}</h2>
 
-    <div id="data-container">
-        {{ buttons_html | safe }} 
+    <div class="results-layout">
+        {{ facets_html | safe }}
+        <div id="data-container">
+            {% for chunk in buttons_html %}{{ chunk | safe }}{% endfor %}
+        </div>
     </div>
 
 </body>
 </html>
 """
 
-# HTML for resource detail page (unchanged)
+# HTML for resource detail page
 detail_page_template = """
 <!DOCTYPE html>
 <html lang="en">
@@ -455,50 +2955,9 @@ detail_page_template = """
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>{{ resource_name }} Details</title>
-    <style>
-        body { font-family: 'Inter', sans-serif; padding: 20px; background-color: #f8f9fa; }
-        .detail-card {
-            background: white;
-            padding: 40px;
-            border-radius: 12px;
-            box-shadow: 0 10px 25px rgba(0,0,0,0.1);
-            max-width: 800px;
-            margin: 0 auto;
-        }
-        h2 { color: #007bff; text-align: center; margin-bottom: 30px; border-bottom: 2px solid #e9ecef; padding-bottom: 10px; }
-        .back-link { display: inline-block; margin-bottom: 20px; color: #6c757d; text-decoration: none; font-weight: 500; }
-        .back-link:hover { text-decoration: underline; }
-        .detail-item {
-            display: flex;
-            margin-bottom: 15px;
-            padding: 10px 0;
-            border-bottom: 1px dotted #e9ecef;
-        }
-        .detail-item:last-child {
-            border-bottom: none;
-        }
-        .detail-header {
-            font-weight: 600;
-            color: #343a40;
-            flex: 0 0 180px; /* Fixed width for the label */
-            text-transform: uppercase;
-            font-size: 0.9em;
-        }
-        .detail-value {
-            color: #495057;
-            flex-grow: 1;
-        }
-        .error-message {
-            background-color:#f8d7da; 
-            color:#721c24; 
-            border-color:#f5c6cb;
-            padding: 15px;
-            border: 1px solid;
-            border-radius: 8px;
-        }
-    </style>
+    <link rel="stylesheet" href="{{ url_for('stylesheet', version=stylesheet_version) }}">
 </head>
-<body>
+<body class="detail-page">
 
     <a href="/" class="back-link">&larr; Back to Search</a>
 
@@ -520,19 +2979,248 @@ detail_page_template = """
 </html>
 """
 
+# HTML for the data health page, listing the failed checks of each report
+health_page_template = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Data Health</title>
+    <link rel="stylesheet" href="{{ url_for('stylesheet', version=stylesheet_version) }}">
+</head>
+<body class="health-page">
+
+    <a href="/" class="back-link">&larr; Back to Search</a>
+    <h2>Data Health</h2>
+
+    {% if rejected %}
+        <div class="error-message">The last reload was rejected; the data loaded before it is still being served.</div>
+    {% endif %}
+    {% for title, report in [('Rejected reload', rejected), ('Live data', live)] if report %}
+        <div class="health-report">
+            <h3>{{ title }}</h3>
+            <p class="health-summary">
+                {{ report.source }} (version {{ report.version[:12] }}): {{ report.rows }} rows,
+                {{ report.resources }} open resources. Checked {{ report.checked_at }} in {{ report.milliseconds }} ms.
+            </p>
+            {% for check in report.checks if check.count %}
+                <details class="health-check">
+                    <summary>
+                        <span class="severity severity-{{ check.severity }}">{{ check.severity }}</span>
+                        {{ check.description }}: {{ check.count }}
+                    </summary>
+                    <table>
+                        <tr><th>Row</th><th>Resource</th><th>Value</th></tr>
+                        {% for example in check.examples %}
+                            <tr><td>{{ example.row if example.row is not none }}</td><td>{{ example.name or '' }}</td><td>{{ example.value }}</td></tr>
+                        {% endfor %}
+                    </table>
+                </details>
+            {% else %}
+                <p>All checks passed.</p>
+            {% endfor %}
+        </div>
+    {% else %}
+        <div class="loading-message">No data has been loaded yet.</div>
+    {% endfor %}
+
+</body>
+</html>
+"""
+
+
+# The stylesheet's URL changes with its content (see stylesheet()), so the templates link the current one
+STYLESHEET_VERSION = hashlib.sha1(page_stylesheet.encode('utf-8')).hexdigest()[:12]
+app.jinja_env.globals['stylesheet_version'] = STYLESHEET_VERSION
+
+# Compile the templates once instead of re-parsing them on every request
+SEARCH_PAGE = app.jinja_env.from_string(search_page_template)
+RESULTS_PAGE = app.jinja_env.from_string(results_page_template)
+DETAIL_PAGE = app.jinja_env.from_string(detail_page_template)
+HEALTH_PAGE = app.jinja_env.from_string(health_page_template)
+
+# Part of every ETag, so changed markup isn't mistaken for a page the client already has
+TEMPLATE_VERSION = hashlib.sha1(
+    (search_page_template + results_page_template + detail_page_template + STYLESHEET_VERSION).encode('utf-8')
+).hexdigest()
+
+
+def make_etag(snapshot, *params):
+    """Builds a strong ETag from the snapshot's version, the templates and the request parameters."""
+    return hashlib.sha1(repr((snapshot.version, TEMPLATE_VERSION) + params).encode('utf-8')).hexdigest()
+
+
+def accepted_encoding():
+    """The content coding to answer the request with: 'br' or 'gzip' when the client accepts it, else None."""
+    return request.accept_encodings.best_match(('br', 'gzip') if brotli is not None else ('gzip',))
+
+
+def compress(body, encoding, levels=COMPRESS_LEVELS):
+    """Compresses the bytes with the content coding."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=levels['br'])
+    # No timestamp in the header, so the same page always compresses to the same bytes
+    return gzip.compress(body, compresslevel=levels['gzip'], mtime=0)
+
+
+def compress_stream(chunks, encoding, on_finish):
+    """
+    Compresses a streamed body as it is sent, flushing after every chunk so the browser can show
+    the first results straight away. Once all of it was sent, on_finish() gets the whole compressed body.
+    """
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=COMPRESS_STREAM_LEVELS['br'])
+    else:
+        # wbits 31: deflate in a gzip container
+        compressor = zlib.compressobj(COMPRESS_STREAM_LEVELS['gzip'], zlib.DEFLATED, 31)
+
+    sent = []
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if encoding == 'br':
+            data = compressor.process(chunk) + compressor.flush()
+        else:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            sent.append(data)
+            yield data
+    sent.append(compressor.finish() if encoding == 'br' else compressor.flush())
+    yield sent[-1]
+    on_finish(b''.join(sent))
+
+
+def compress_response(response, encoding, etag):
+    """
+    Compresses the response with the content coding if it is text large enough to be worth it,
+    and keeps the compressed body with its headers in COMPRESSED_CACHE under the ETag.
+    """
+    if response.status_code != 200 or response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+
+    if response.is_streamed:
+        chunks = response.response
+        response.content_encoding = encoding
+        headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+        response.response = compress_stream(chunks, encoding, lambda body: COMPRESSED_CACHE.put(etag, (body, headers)))
+        if hasattr(chunks, 'close'):
+            response.call_on_close(chunks.close)
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(compress(body, encoding))
+    response.content_encoding = encoding
+    COMPRESSED_CACHE.put(etag, (response.get_data(), [(name, value) for name, value in response.headers
+                                                      if name != 'Content-Length']))
+    return response
+
+
+def conditional_response(etag, render):
+    """
+    Answers with 304 Not Modified when the client already holds the ETag,
+    otherwise calls render() and tags the page. Clients accepting brotli or gzip get
+    the page compressed, under an ETag of its own; its compressed body is kept, so the
+    next request for it skips both render() and the compression.
+    """
+    encoding = accepted_encoding()
+    if encoding is not None:
+        etag = f'{etag}-{encoding}'
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        compressed = COMPRESSED_CACHE.get(etag) if encoding is not None else None
+        if compressed is not None:
+            body, headers = compressed
+            response = app.response_class(body, headers=headers)
+        else:
+            response = app.make_response(render())
+            if encoding is not None:
+                compress_response(response, encoding, etag)
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # Clients may keep the page but must check back with the ETag before reusing it
+    response.cache_control.no_cache = True
+    return response
+
+
+# The stylesheet and its compressed variants, built once
+STYLESHEET_BODIES = {None: page_stylesheet.encode('utf-8')}
+STYLESHEET_BODIES.update(
+    (encoding, compress(STYLESHEET_BODIES[None], encoding, STATIC_COMPRESS_LEVELS))
+    for encoding in (('br', 'gzip') if brotli is not None else ('gzip',))
+)
+
+
+@app.route('/assets/style.<version>.css')
+def stylesheet(version):
+    """
+    Serves the pages' stylesheet, precompressed. Its URL names its version, so clients may cache it for
+    good; pages still naming an older version are sent to the current one.
+    """
+    if version != STYLESHEET_VERSION:
+        return redirect(url_for('stylesheet', version=STYLESHEET_VERSION))
+    encoding = accepted_encoding()
+    response = app.response_class(STYLESHEET_BODIES[encoding], mimetype='text/css')
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = STATIC_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
 
 # -------------------------------------------------------------
 
 
+def start_request_timing():
+    """Notes when the request started and, if it asked for one, starts profiling it."""
+    g.request_start = time.perf_counter()
+    if PROFILE_HEADER in request.headers:
+        g.profiler = SamplingProfiler(threading.get_ident())
+        g.profiler.start()
+
+
+def finish_request_timing(response):
+    """Records the request's duration by endpoint, and swaps in the profile when one was taken."""
+    record_timing('request', request.endpoint or 'not_found', time.perf_counter() - g.request_start)
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        response = app.response_class(profiler.stop(), mimetype='text/plain')
+        # A request shorter than the sampling interval (or the interpreter's switch interval) has no samples
+        response.headers['X-Profile-Samples'] = str(sum(profiler.samples.values()))
+        response.cache_control.no_store = True
+    return response
+
+
+# Only hooked in when enabled, so requests without metrics don't pay for them
+if METRICS_ENABLED:
+    app.before_request(start_request_timing)
+    app.after_request(finish_request_timing)
+
+
 # Flask Routes (pages)
 @app.route('/')
 def home():
     """Renders the search form with dynamic category buttons and keyword list."""
-    button_html = generate_category_buttons_html(CATEGORIES)
-    keyword_html = generate_keyword_list_html(COMMON_KEYWORDS)
+    snapshot = SNAPSHOT
+    return conditional_response(
+        make_etag(snapshot, 'home'),
+        lambda: RENDER_CACHE.get_or_create(('home', snapshot.version), lambda: render_home(snapshot))
+    )
 
-    return render_template_string(
-        search_page_template,
+
+@timed('render_home')
+def render_home(snapshot):
+    """Renders the home page from scratch, see home()."""
+    button_html = generate_category_buttons_html(snapshot.categories)
+    keyword_html = generate_keyword_list_html(snapshot.common_keywords)
+
+    return render_template(
+        SEARCH_PAGE,
         category_buttons_html=button_html,
         common_keywords_html=keyword_html
     )
@@ -540,97 +3228,685 @@ def home():
 
 @app.route('/results')
 def results():
-    """Handles both keyword and category searches."""
+    """Handles both keyword and category searches, narrowed by any facet filters and ordered by distance with ?near=."""
+    start = time.perf_counter()
     query = request.args.get('query', '').upper().strip()
     search_type = request.args.get('search_type', '').lower()
-
-    if not ALL_DATA or not HEADERS:
+    snapshot = SNAPSHOT
+    filters = get_facet_filters(snapshot)
+    near = get_near()
+
+    response = conditional_response(make_etag(snapshot, 'results', query, search_type, filters, near),
+                                    lambda: render_search(snapshot, query, search_type, filters, near))
+    # Pages for unknown filters or locations and the prompt for a search term aren't searches
+    if SEARCH_LOG is not None and filters is not None and near is not None and (query or filters or near):
+        # Logged once the page was sent, a streamed one included. The hits are only known when the search
+        # ran; not for a 304 or a page from a cache, whose hits are those of earlier log entries.
+        entry = (time.time(), query, search_type, filters, near, g.get('search_hits'))
+        status = response.status_code
+        response.call_on_close(lambda: SEARCH_LOG.record((*entry, time.perf_counter() - start, status)))
+    return response
+
+
+def get_facet_filters(snapshot):
+    """
+    Reads the ?category=, ?has= and ?status= facet values (each may be repeated) as a tuple of
+    (group, sorted values) pairs, or None if one of them is not a facet of the data.
+    """
+    filters = []
+    for group in FACET_GROUPS:
+        values = request.args.getlist(group)
+        values = {value.strip().upper() if group == 'category' else value.strip().lower() for value in values}
+        values.discard('')
+        if not values:
+            continue
+        if not values <= snapshot.facets.get(group, {}).keys():
+            return None
+        filters.append((group, tuple(sorted(values))))
+    return tuple(filters)
+
+
+def get_near():
+    """
+    Reads the ?near= origin, a ZIP code of the GAZETTEER or 'latitude,longitude', and the optional
+    ?within= radius in miles as (near, latitude, longitude, max_miles); () when there is no origin,
+    or None when either can't be used.
+    """
+    near = request.args.get('near', '').strip()
+    if not near:
+        return ()
+    if near in GAZETTEER.zip_codes:
+        _, _, latitude, longitude = GAZETTEER.zip_codes[near]
+    else:
+        try:
+            latitude, longitude = (float(part) for part in near.split(','))
+        except ValueError:
+            return None
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return None
+
+    max_miles = None
+    within = request.args.get('within', '').strip()
+    if within:
+        try:
+            max_miles = float(within)
+        except ValueError:
+            return None
+        if not 0 < max_miles <= GEO_MAX_RADIUS_MILES:
+            return None
+    return near, latitude, longitude, max_miles
+
+
+def get_near_args(near):
+    """The query parameters of a near search, for links that keep it."""
+    if not near:
+        return {}
+    if near[3] is None:
+        return {'near': near[0]}
+    return {'near': near[0], 'within': f'{near[3]:g}'}
+
+
+def render_search(snapshot, query, search_type, filters=(), near=()):
+    """Renders the results page, or the message page for a missing query, unknown filter or location, or data error."""
+    if not snapshot.resources or not snapshot.headers:
         title = "Data Error"
-        buttons_html = f'<div class="error-message">Error: Could not load data from {CSV_FILE_NAME}. Please ensure the file is present.</div>'
-        return render_template_string(results_page_template, title=title, buttons_html=buttons_html)
-
-    if not query:
+        buttons_html = [f'<div class="error-message">Error: Could not load data from {CSV_FILE_NAME}. Please ensure the file is present.</div>']
+        return render_template(RESULTS_PAGE, title=title, buttons_html=buttons_html)
+
+    if filters is None:
+        title = "Unknown Filter"
+        buttons_html = ["""<div class="error-message">
+                            This filter doesn't match the current data. Please search again.
+                        </div>"""]
+        return render_template(RESULTS_PAGE, title=title, buttons_html=buttons_html)
+
+    if near is None:
+        title = "Unknown Location"
+        buttons_html = [f"""<div class="error-message">
+                            Please give a ZIP code of the area or a latitude,longitude, and a distance
+                            of at most {GEO_MAX_RADIUS_MILES:g} miles.
+                        </div>"""]
+        return render_template(RESULTS_PAGE, title=title, buttons_html=buttons_html)
+
+    if not query and not filters and not near:
         title = "Please Enter a Search Term"
-        buttons_html = """<div class="loading-message">
+        buttons_html = ["""<div class="loading-message">
                             Please use the search bar for a keyword or a button to select a category.
-                        </div>"""
-        return render_template_string(results_page_template, title=title, buttons_html=buttons_html)
+                        </div>"""]
+        return render_template(RESULTS_PAGE, title=title, buttons_html=buttons_html)
 
-    # Determine search method
+    # Category pages only depend on the query, filters and the loaded data, so they are rendered once
     if search_type == 'category':
-        filtered_data = category_block_search(query, ALL_DATA)
-        search_description = "Category Block Search"
-    else:
-        filtered_data = keyword_search(query, ALL_DATA)
-        search_description = "Keyword Search"
+        return RENDER_CACHE.get_or_create(('results', query, search_type, filters, near, snapshot.version),
+                                          lambda: render_results(snapshot, query, search_type, filters, near))
+
+    # Keyword pages are streamed, so the first buttons go out before the last ones are built
+    return render_results(snapshot, query, search_type, filters, near, stream=True)
+
+
+def get_search(search_type):
+    """Returns the search function, normalized search type and description for a ?search_type= value."""
+    if search_type == 'category':
+        return BACKEND.category_search, 'category', "Category Block Search"
+    if search_type == 'phrase':
+        return BACKEND.keyword_search, 'phrase', "Phrase Search"
+    return BACKEND.ranked_search, 'keyword', "Keyword Search"
+
+
+def search_resources(snapshot, query, search_type, filters=(), near=()):
+    """
+    Runs the category, phrase or keyword search, returning the matches and a description
+    of the method. Keyword searches return the best RANKED_SEARCH_LIMIT matches, best first.
+    With facet filters only the matches in the selected facets are kept (see facet_mask()),
+    and an empty query lists all the resources in them in file order. A near origin orders
+    the matches by distance instead, see search_near().
+    The matching row indices are kept in RESULT_CACHE.
+    """
+    # Determine search method
+    search, search_type, search_description = get_search(search_type)
+    query = query.upper().strip()
+
+    def run_search():
+        with time_stage('search_' + search_type):
+            if near:
+                return array('I', search_near(snapshot, query, search, search_type, filters, near))
+            if not filters:
+                return array('I', [index for index, _ in search(query, snapshot)])
+            mask = facet_mask(snapshot, filters)
+            if not query:
+                return array('I', bitset_indices(mask))
+            if search_type == 'keyword':
+                # Filters may drop any of the best matches, so all of them are ranked
+                indices = filter_indices([index for index, _ in search(query, snapshot, limit=None)], mask)
+                return array('I', indices[:RANKED_SEARCH_LIMIT])
+            return array('I', filter_indices([index for index, _ in search(query, snapshot)], mask))
+
+    indices = RESULT_CACHE.get_or_create((query, search_type, filters, near, snapshot.version), run_search)
+    data = snapshot.resources
+    return [(index, data[index]) for index in indices], search_description
+
+
+def search_near(snapshot, query, search, search_type, filters, near):
+    """
+    Returns the row indices of the search's matches in the selected facets by distance from the
+    near origin, equally distant ones in the search's order. Matches without a known location
+    come last, unless a radius leaves them out. Keyword searches keep the nearest RANKED_SEARCH_LIMIT.
+    """
+    _, latitude, longitude, max_miles = near
+    mask = facet_mask(snapshot, filters)
+    limit = rank = matches = None
+    if query:
+        matches = [index for index, _ in (search(query, snapshot, limit=None) if search_type == 'keyword'
+                                          else search(query, snapshot))]
+        mask &= make_bitset(matches)
+        rank = {index: position for position, index in enumerate(matches)}.__getitem__
+        if search_type == 'keyword':
+            limit = RANKED_SEARCH_LIMIT
+
+    with time_stage('nearest'):
+        indices = [index for _, index in snapshot.spatial_grid.nearest(latitude, longitude, mask, limit, max_miles, rank)]
+    if max_miles is None and (limit is None or len(indices) < limit):
+        unlocated = mask & ~snapshot.spatial_grid.located
+        indices.extend(bitset_indices(unlocated) if matches is None else filter_indices(matches, unlocated))
+    return indices if limit is None else indices[:limit]
+
+
+def search_facets(snapshot, query, search_type, filters=(), near=()):
+    """
+    Returns the facet counts of a search, see count_facets(). Keyword searches count all their
+    matches, not only the best RANKED_SEARCH_LIMIT, and a near search with a radius only those
+    within it. The counts are kept in FACET_CACHE.
+    """
+    search, search_type, _ = get_search(search_type)
+    query = query.upper().strip()
+
+    def run_count():
+        with time_stage('facets'):
+            if not query:
+                # Browsing: every resource is a candidate (the facets only hold resources with an ID)
+                matches = -1
+            elif search_type == 'keyword':
+                # Any resource with one of the terms matches, whatever its rank
+                terms = get_query_terms(query, snapshot)
+                if terms:
+                    matches = make_bitset(chain.from_iterable(snapshot.rank_index[term][0] for term in terms))
+                else:
+                    matches = make_bitset(index for index, _ in search(query, snapshot))
+            else:
+                matches = make_bitset(index for index, _ in search(query, snapshot))
+            if max_miles is not None:
+                matches &= make_bitset(index for _, index in snapshot.spatial_grid.nearest(
+                    latitude, longitude, max_miles=max_miles))
+            return count_facets(snapshot, matches, filters)
+
+    # Ordering by distance doesn't change the counts, only a radius does
+    _, latitude, longitude, max_miles = near or (None, None, None, None)
+    return FACET_CACHE.get_or_create((query, search_type, filters, near if max_miles is not None else (),
+                                      snapshot.version), run_count)
+
+
+def warm_result_cache(snapshot):
+    """Runs the searches behind the home page's category buttons and keywords, so they start out cached."""
+    for category in snapshot.categories:
+        search_resources(snapshot, category, 'category')
+    for keyword in snapshot.common_keywords:
+        search_resources(snapshot, keyword, 'keyword')
+
+
+def resource_distance(snapshot, latitude, longitude, resource):
+    """Miles from the point to the resource, or None if its address wasn't located."""
+    location = snapshot.locations.get(resource.row_index)
+    if location is None or location.latitude is None:
+        return None
+    return snapshot.spatial_grid.miles(location, latitude, longitude)
+
+
+@timed('render_results')
+def render_results(snapshot, query, search_type, filters=(), near=(), stream=False):
+    """
+    Runs the search and renders the results page with its facet sidebar, for an upper-cased
+    query (empty only when browsing by facets or distance), as a string or, with stream=True, as
+    a streamed response (whose body is only built, and timed, as it is sent).
+    """
+    filtered_data, search_description = search_resources(snapshot, query, search_type, filters, near)
+    # For the search log, see results()
+    g.search_hits = len(filtered_data)
+    # The sidebar's links are the same for every request of the search, so they are built once
+    facets_html = RENDER_CACHE.get_or_create(
+        ('facets', query, search_type, filters, near, snapshot.version),
+        lambda: build_facets_html(query, search_type, filters,
+                                  search_facets(snapshot, query, search_type, filters, near), near)
+    )
 
     # Generate results
-    title = f'Results for {search_description}: "{query}"'
+    if query:
+        title = f'Results for {search_description}: "{query}"'
+    else:
+        title = "Resources Matching the Filters" if filters else "Resources"
+    distance = None
+    if near:
+        origin, latitude, longitude, max_miles = near
+        title += f' within {max_miles:g} miles of {origin}' if max_miles is not None else f' near {origin}'
+        distance = functools.partial(resource_distance, snapshot, latitude, longitude)
 
     if not filtered_data:
-        buttons_html = f"""<div class="error-message">
-                           No resources found matching "{query}" or all matching resources are marked 'closed'.
-                        </div>"""
+        buttons_html = [f"""<div class="error-message">
+                           No resources found matching "{escape(query)}" or all matching resources are marked 'closed'.
+                        </div>""" if query else """<div class="error-message">
+                           No resources match all the selected filters and distance.
+                        </div>"""]
     else:
         # Use the function to generate buttons
-        buttons_html = build_buttons_html(filtered_data)
+        buttons_html = build_buttons_html(filtered_data, distance)
 
     # Render the results page
-    return render_template_string(results_page_template, title=title, buttons_html=buttons_html)
+    if stream:
+        return stream_template(RESULTS_PAGE, title=title, buttons_html=buttons_html, facets_html=facets_html)
+    return render_template(RESULTS_PAGE, title=title, buttons_html=buttons_html, facets_html=facets_html)
 
 
-@app.route('/resource/<int:row_index>')
-def resource_detail(row_index):
+@app.route('/resource/<resource_id>')
+def resource_detail(resource_id):
     """
     Renders a page with all details for a specific resource, omitting empty fields
     and cleaning up header colons.
     """
-    if not ALL_DATA or not HEADERS:
-        return render_template_string(
-            detail_page_template,
+    snapshot = SNAPSHOT
+    return conditional_response(make_etag(snapshot, 'resource', resource_id),
+                                lambda: render_resource_detail(snapshot, resource_id))
+
+
+@app.route('/resource/<int:row_index>')
+def legacy_resource_detail(row_index):
+    """Old links by row index: redirects to the resource the row held when the link was made."""
+    resource_id = ROW_ID_MAP.get(row_index)
+    if resource_id is None:
+        # No resource ever sat in that row; resource_detail() renders the not-found page
+        return resource_detail(str(row_index))
+    return redirect(url_for('resource_detail', resource_id=resource_id), 301)
+
+
+@timed('render_detail')
+def render_resource_detail(snapshot, resource_id):
+    """Renders the detail page for the resource, see resource_detail()."""
+    if not snapshot.resources or not snapshot.headers:
+        return render_template(
+            DETAIL_PAGE,
             resource_name="Data Error",
             details=[],
             table_html=f'<div class="error-message">Error: Could not load data from {CSV_FILE_NAME}.</div>'
         )
 
-    try:
-        resource_row = ALL_DATA[row_index]
-        details = []
+    resource = BACKEND.get_resource(resource_id, snapshot)
+    if resource is None:
+        return render_template(
+            DETAIL_PAGE,
+            resource_name="Error",
+            details=[("Status", "Resource not found.")]
+        )
 
-        # Iterate through headers and corresponding row values
-        for i, header in enumerate(HEADERS):
-            # 1. Check if the header exists and isn't empty
-            if i < len(resource_row) and header.strip():
+    # Header cleanup and empty-value filtering were done once at load time
+    return render_template(
+        DETAIL_PAGE,
+        resource_name=resource.name,
+        details=resource.details
+    )
 
-                # --- SOLUTION: Clean the header string ---
-                # Remove any trailing colons from the CSV header before passing it to the template.
-                clean_header = header.strip().rstrip(':')
 
-                value = resource_row[i].strip()
+# JSON API (used by the Vue frontend)
+def api_error(message, status=400):
+    return jsonify(error=message), status
 
-                # 2. Check if the value is NOT empty/whitespace
-                if value:
-                    details.append((clean_header, value))
 
-        # The resource name is in the NAME_COL_INDEX
-        resource_name = resource_row[NAME_COL_INDEX].strip() if len(
-            resource_row) > NAME_COL_INDEX else "Unknown Resource"
+def resource_to_json(resource, fields):
+    """Projects a Resource onto the requested API fields."""
+    return {field: getattr(resource, API_FIELDS[field]) for field in fields}
 
-        return render_template_string(
-            detail_page_template,
-            resource_name=resource_name,
-            details=details
-        )
 
-    except IndexError:
-        return render_template_string(
-            detail_page_template,
-            resource_name="Error",
-            details=[("Status", "Resource not found (invalid index).")]
+def get_api_fields(default_fields):
+    """Reads the comma-separated ?fields= projection, or None if it names an unknown field."""
+    fields_param = request.args.get('fields', '')
+    if not fields_param:
+        return default_fields
+    fields = tuple(field.strip() for field in fields_param.split(',') if field.strip())
+    if not fields or any(field not in API_FIELDS for field in fields):
+        return None
+    return fields
+
+
+def wants_ndjson():
+    """True when the client asked for newline-delimited JSON instead of one JSON document."""
+    return request.args.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+
+
+def stream_ndjson(rows_with_index, fields):
+    """Yields one JSON line per resource, so clients can show the first ones while the rest is sent."""
+    for _, resource in rows_with_index:
+        yield json.dumps(resource_to_json(resource, fields), separators=(',', ':')) + '\n'
+
+
+@app.route('/api/search')
+def api_search():
+    """
+    Keyword, phrase or category search as JSON, paged with ?limit= and ?offset= and projected with ?fields=,
+    narrowed by the ?category=, ?has= and ?status= facets and ordered by distance from ?near= (the
+    query may then be left out); the JSON document includes the facet counts. With ?format=ndjson (or Accept: application/x-ndjson) the matches are streamed one per line,
+    all of them unless a limit is given; the total is in the X-Total-Count header.
+    """
+    query = request.args.get('query', '').upper().strip()
+    search_type = request.args.get('search_type', '').lower()
+    ndjson = wants_ndjson()
+    offset = request.args.get('offset', 0, type=int)
+    limit = request.args.get('limit', None if ndjson else API_DEFAULT_PAGE_SIZE, type=int)
+    fields = get_api_fields(API_DEFAULT_SEARCH_FIELDS)
+    snapshot = SNAPSHOT
+    filters = get_facet_filters(snapshot)
+    near = get_near()
+
+    if filters is None:
+        return api_error(f"category, has and status must name facets of the data: "
+                         f"see /api/categories, {', '.join(FACET_FIELDS)} and {', '.join(FACET_STATUSES)}.")
+    if near is None:
+        return api_error(f"near must be a ZIP code of the area or latitude,longitude, "
+                         f"and within a distance of at most {GEO_MAX_RADIUS_MILES:g} miles.")
+    if not query and not filters and not near:
+        return api_error("Missing query parameter.")
+    # Streamed responses have no page size cap, they are meant for large result sets
+    if offset < 0 or (limit is not None and (limit < 1 or (limit > API_MAX_PAGE_SIZE and not ndjson))):
+        return api_error(f"offset must be >= 0 and limit between 1 and {API_MAX_PAGE_SIZE}.")
+    if fields is None:
+        return api_error(f"fields must be a comma-separated list of: {', '.join(API_FIELDS)}.")
+
+    def render():
+        filtered_data, _ = search_resources(snapshot, query, search_type, filters, near)
+        page = filtered_data[offset:] if limit is None else filtered_data[offset:offset + limit]
+
+        if ndjson:
+            response = app.response_class(stream_ndjson(page, fields), mimetype='application/x-ndjson')
+            response.headers['X-Total-Count'] = str(len(filtered_data))
+            return response
+
+        next_offset = offset + len(page)
+        return jsonify(
+            query=query,
+            search_type=search_type if search_type in ('category', 'phrase') else 'keyword',
+            filters=dict(filters),
+            near=get_near_args(near) or None,
+            total=len(filtered_data),
+            offset=offset,
+            limit=limit,
+            next_offset=next_offset if next_offset < len(filtered_data) else None,
+            results=[resource_to_json(resource, fields) for _, resource in page],
+            facets=search_facets(snapshot, query, search_type, filters, near),
         )
 
+    return conditional_response(
+        make_etag(snapshot, 'api-search', query, search_type, filters, near, offset, limit, fields, ndjson), render)
 
-if __name__ == '__main__':
-    # Ensure all data is reloaded before running the app
+
+@app.route('/api/suggest')
+def api_suggest():
+    """As-you-type query completions and matching resource names as JSON, see suggest()."""
+    query = request.args.get('query', '').strip()
+    limit = request.args.get('limit', SUGGEST_DEFAULT_LIMIT, type=int)
+
+    if not query:
+        return api_error("Missing query parameter.")
+    if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+        return api_error(f"limit must be between 1 and {SUGGEST_MAX_LIMIT}.")
+
+    snapshot = SNAPSHOT
+
+    def build_payload():
+        suggestions, resources = suggest(query, snapshot, limit)
+        return {
+            'query': query,
+            'suggestions': suggestions,
+            'resources': [resource_to_json(resource, API_DEFAULT_SEARCH_FIELDS) for _, resource in resources],
+        }
+
+    return conditional_response(
+        make_etag(snapshot, 'api-suggest', query, limit),
+        lambda: jsonify(SUGGEST_CACHE.get_or_create((query, limit, snapshot.version), build_payload))
+    )
+
+
+@app.route('/api/categories')
+def api_categories():
+    """The category buttons as JSON, with the number of open resources behind each one."""
+    snapshot = SNAPSHOT
+    return conditional_response(
+        make_etag(snapshot, 'api-categories'),
+        lambda: jsonify(categories=[
+            {'name': category, 'count': len(snapshot.category_results[category])}
+            for category in snapshot.categories
+        ])
+    )
+
+
+@app.route('/api/resource/<resource_id>')
+def api_resource(resource_id):
+    """All fields of one resource as JSON, or only those named in ?fields=."""
+    fields = get_api_fields(tuple(API_FIELDS))
+    if fields is None:
+        return api_error(f"fields must be a comma-separated list of: {', '.join(API_FIELDS)}.")
+
+    snapshot = SNAPSHOT
+    resource = BACKEND.get_resource(resource_id, snapshot)
+    if resource is None:
+        return api_error("Resource not found.", 404)
+
+    return conditional_response(make_etag(snapshot, 'api-resource', resource_id, fields),
+                                lambda: jsonify(resource_to_json(resource, fields)))
+
+
+@app.route('/api/resource/<int:row_index>')
+def legacy_api_resource(row_index):
+    """Old row index URLs: redirects to the resource's ID URL, like legacy_resource_detail()."""
+    resource_id = ROW_ID_MAP.get(row_index)
+    if resource_id is None:
+        return api_error("Resource not found.", 404)
+    return redirect(url_for('api_resource', resource_id=resource_id, **request.args), 301)
+
+
+@app.route('/api/cache-stats')
+def api_cache_stats():
+    """Counters of the in-memory caches, and the cached searches asked most often, as JSON."""
+    return jsonify(
+        results=RESULT_CACHE.stats(),
+        facets=FACET_CACHE.stats(),
+        pages=RENDER_CACHE.stats(),
+        compressed=COMPRESSED_CACHE.stats(),
+        suggest=SUGGEST_CACHE.stats(),
+        top_queries=[
+            {'query': query, 'search_type': search_type, 'filters': dict(filters), 'near': get_near_args(near) or None,
+             'hits': hits}
+            for (query, search_type, filters, near, _), hits in RESULT_CACHE.top_keys(CACHE_STATS_TOP_QUERIES)
+        ],
+    )
+
+
+@app.route('/api/data-health')
+def api_data_health():
+    """The data checks of the live data, and of the last reload rejected since, as JSON."""
+    return jsonify(
+        live=DATA_HEALTH.to_json() if DATA_HEALTH else None,
+        rejected=REJECTED_DATA_HEALTH.to_json() if REJECTED_DATA_HEALTH else None,
+    )
+
+
+@app.route('/admin/data-health')
+def data_health():
+    """The data checks as a page, see api_data_health()."""
+    return render_template(
+        HEALTH_PAGE,
+        live=DATA_HEALTH.to_json() if DATA_HEALTH else None,
+        rejected=REJECTED_DATA_HEALTH.to_json() if REJECTED_DATA_HEALTH else None,
+    )
+
+
+@app.cli.command('check-data')
+@click.argument('path', default=CSV_FILE_NAME)
+def check_data_command(path):
+    """Runs the data checks on a CSV or directory of sheets and prints the report as JSON."""
+    report = validate_snapshot(read_data(path), source=path)
+    click.echo(json.dumps(report.to_json(), indent=2))
+    if not report.ok:
+        sys.exit(1)
+
+
+def read_search_log(path, since=None):
+    """Yields the entries of the search log logged at or after the since timestamp, skipping unreadable lines."""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Cut short by a crash or a full disk
+                continue
+            if since is None or entry['time'] >= since:
+                yield entry
+
+
+def aggregate_search_log(path, since=None, top=SEARCH_REPORT_TOP):
+    """
+    Summarizes the search log: the queries searched most often, those ending in no results and those
+    slowest to answer (their mean time over the requests that ran the search, not 304s or cached pages),
+    with their search type. A search's hits are those of the last entry for the same query, type,
+    filters and near that ran it.
+    """
+    searches = Counter()
+    hits = {}
+    timings = {}
+    first = last = None
+    for entry in read_search_log(path, since):
+        query = (entry['query'], entry['search_type'])
+        search = (query, json.dumps(entry['filters'], sort_keys=True), json.dumps(entry['near'], sort_keys=True))
+        searches[search] += 1
+        if entry['hits'] is not None:
+            hits[search] = entry['hits']
+            count, total, slowest = timings.get(query, (0, 0.0, 0.0))
+            timings[query] = (count + 1, total + entry['ms'], max(slowest, entry['ms']))
+        first = entry['time'] if first is None else first
+        last = entry['time']
+
+    queries = Counter()
+    zero_results = Counter()
+    for search, count in searches.items():
+        queries[search[0]] += count
+        if hits.get(search) == 0:
+            zero_results[search[0]] += count
+    slowest = sorted(timings.items(), key=lambda item: item[1][1] / item[1][0], reverse=True)[:top]
+    return {
+        'searches': sum(searches.values()),
+        'queries': len(queries),
+        'first': first,
+        'last': last,
+        'top_queries': [{'query': query, 'search_type': search_type, 'searches': count}
+                        for (query, search_type), count in queries.most_common(top)],
+        'zero_result_queries': [{'query': query, 'search_type': search_type, 'searches': count}
+                                for (query, search_type), count in zero_results.most_common(top)],
+        'slowest_queries': [{'query': query, 'search_type': search_type, 'searches': count,
+                             'mean_ms': round(total / count, 3), 'max_ms': slowest_ms}
+                            for (query, search_type), (count, total, slowest_ms) in slowest],
+    }
+
+
+def format_search_report(report):
+    """Formats aggregate_search_log() output as text tables."""
+    def when(timestamp):
+        return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp is not None else '-'
+
+    lines = [f"{report['searches']} searches of {report['queries']} distinct queries, "
+             f"{when(report['first'])} to {when(report['last'])}"]
+    for title, rows, columns in (
+        ('Top queries', report['top_queries'], ('searches',)),
+        ('Zero-result queries', report['zero_result_queries'], ('searches',)),
+        ('Slowest queries (searches run, not cached)', report['slowest_queries'], ('searches', 'mean_ms', 'max_ms')),
+    ):
+        lines += ['', title, ''.join(f'{column:>10}' for column in columns) + f"  {'type':<10}query"]
+        lines += [''.join(f'{row[column]:>10}' for column in columns) +
+                  f"  {row['search_type']:<10}{row['query'] or '(none)'}" for row in rows]
+        if not rows:
+            lines.append('  none')
+    return '\n'.join(lines)
+
+
+@app.cli.command('search-report')
+@click.option('--days', type=float, help='Only the searches of the last DAYS days.')
+@click.option('--top', type=int, default=SEARCH_REPORT_TOP, show_default=True, help='Queries listed per section.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON.')
+@click.argument('path', required=False, default=SEARCH_LOG_FILE)
+def search_report_command(days, top, as_json, path):
+    """Reports the top, zero-result and slowest queries of the search log, to curate the keywords and warm caches."""
+    if SEARCH_LOG is not None:
+        SEARCH_LOG.flush()
+    if not path or not os.path.exists(path):
+        sys.exit(f"No search log at {path}, see SEARCH_LOG_FILE.")
+    report = aggregate_search_log(path, time.time() - days * 86400 if days else None, top)
+    click.echo(json.dumps(report, indent=2) if as_json else format_search_report(report))
+
+
+def format_metrics():
+    """Renders the timing histograms and the cache counters in the Prometheus text format."""
+    lines = []
+    with TIMINGS_LOCK:
+        timings = sorted(TIMINGS.items())
+
+    for metric, label_name, description in (('stage', 'stage', 'Time spent in each stage of loading and serving'),
+                                            ('request', 'endpoint', 'Time spent handling requests, by endpoint')):
+        name = f'spd_{metric}_duration_seconds'
+        lines += [f'# HELP {name} {description}.', f'# TYPE {name} histogram']
+        quantile_lines = []
+        for (timing_metric, label), histogram in timings:
+            if timing_metric != metric:
+                continue
+            counts, total = histogram.read()
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {total}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {cumulative}')
+            quantile_lines += [
+                f'{name}_quantile{{{label_name}="{label}",quantile="{q}"}} {histogram.quantile(q, counts)}'
+                for q in TIMING_QUANTILES
+            ]
+        lines += [f'# HELP {name}_quantile Quantiles estimated from the {name} buckets.',
+                  f'# TYPE {name}_quantile gauge'] + quantile_lines
+
+    caches = {'results': RESULT_CACHE.stats(), 'facets': FACET_CACHE.stats(), 'pages': RENDER_CACHE.stats(),
+              'compressed': COMPRESSED_CACHE.stats(), 'suggest': SUGGEST_CACHE.stats()}
+    for counter in ('hits', 'misses', 'evictions', 'expirations'):
+        lines += [f'# HELP spd_cache_{counter}_total Cache {counter} since the process started.',
+                  f'# TYPE spd_cache_{counter}_total counter']
+        lines += [f'spd_cache_{counter}_total{{cache="{cache}"}} {stats[counter]}' for cache, stats in caches.items()]
+    lines += ['# HELP spd_cache_entries Entries currently cached.', '# TYPE spd_cache_entries gauge']
+    lines += [f'spd_cache_entries{{cache="{cache}"}} {stats["entries"]}' for cache, stats in caches.items()]
+
+    if SEARCH_LOG is not None:
+        lines += ['# HELP spd_search_log_entries_total Searches written to or dropped from the search log.',
+                  '# TYPE spd_search_log_entries_total counter',
+                  f'spd_search_log_entries_total{{outcome="written"}} {SEARCH_LOG.written}',
+                  f'spd_search_log_entries_total{{outcome="dropped"}} {SEARCH_LOG.dropped}']
+
+    return '\n'.join(lines) + '\n'
+
+
+@app.route('/metrics')
+def metrics():
+    """Timings (when METRICS_ENABLED) and cache counters for Prometheus to scrape."""
+    return app.response_class(format_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+# Load data on startup, once the routes exist to build the detail URLs. Not in the worker
+# processes that parse sheets (which import this module when they aren't forked).
+if multiprocessing.parent_process() is None:
     load_data()
+
+if __name__ == '__main__':
+    # Development server only; production runs under gunicorn, see gunicorn.conf.py.
+    # The data was already loaded on import; keep it in sync with edits to the CSV
+    start_data_watcher()
     app.run(debug=True)
\ No newline at end of file
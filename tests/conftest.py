@@ -0,0 +1,88 @@
+"""
+Shared fixtures. The app module is imported from the repository root, like the benchmarks do;
+run the tests from there so its startup load finds the shipped sheet:
+    python -m pytest
+"""
+import hashlib
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import serviceproviderWeb as web  # noqa: E402
+
+SHIPPED_CSV = os.path.join(REPO_DIR, 'CapstoneSpreadsheet - Sheet1.csv')
+# Header row of the shipped sheet
+HEADER_ROW = ['NAME', 'DETAILS:', 'NUMBER:', 'VOLUNTEER LEAD/DIRECTOR', 'EMAIL ADDRESS ', 'ADDRESS:', 'WEBSITE:',
+              'FUNCTION:']
+
+
+def make_sheet_csv(blocks, header=True):
+    """
+    Writes a sheet in the shipped block format as CSV bytes: for each (category, rows) block a
+    label row, the header row (only before the first block unless header is False) and the
+    rows, given as {header: value} dicts.
+    """
+    lines = []
+    for i, (category, rows) in enumerate(blocks):
+        lines.append(['', '', '', f'Community Services- {category}', '', '', '', ''])
+        if header and i == 0:
+            lines.append(HEADER_ROW)
+        for row in rows:
+            lines.append([row.get(column.strip().rstrip(':'), '') for column in HEADER_ROW])
+    return ''.join(','.join(f'"{cell}"' for cell in line) + '\n' for line in lines).encode('utf-8')
+
+
+def index_values(index):
+    """An index with its array views turned into lists, for comparing."""
+    return {key: tuple(list(column) for column in values) if isinstance(values, tuple) else list(values)
+            for key, values in index.items()}
+
+
+def parse_csv(raw_csv):
+    """The DataSnapshot of the CSV bytes, as load_data() builds it."""
+    return web.parse_csv_snapshot(raw_csv, hashlib.sha1(raw_csv).hexdigest(), None)
+
+
+@pytest.fixture(scope='session')
+def shipped_csv():
+    with open(SHIPPED_CSV, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='session')
+def shipped_snapshot(shipped_csv):
+    return parse_csv(shipped_csv)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A test client of the app serving the shipped sheet, with the search log off."""
+    monkeypatch.setattr(web, 'SEARCH_LOG', None)
+    return web.app.test_client()
+
+
+@pytest.fixture
+def live_csv(tmp_path, monkeypatch, shipped_csv):
+    """
+    Points the app at a copy of the shipped sheet in tmp_path and loads it, returning the copy's
+    path, so a test can edit it and call load_data(). The live data is put back afterwards.
+    """
+    for name in ('CSV_FILE_NAME', 'SNAPSHOT', 'ROW_ID_MAP', 'DATA_HEALTH', 'REJECTED_DATA_HEALTH'):
+        monkeypatch.setattr(web, name, getattr(web, name))
+    path = tmp_path / 'sheet.csv'
+    path.write_bytes(shipped_csv)
+    web.CSV_FILE_NAME = str(path)
+    web.ROW_ID_MAP = {}
+    web.load_data()
+    assert web.SNAPSHOT.version == hashlib.sha1(shipped_csv).hexdigest()
+    return path
+
+
+def edit_csv(path, old, new):
+    """Replaces text in the sheet at path and reloads it."""
+    path.write_bytes(path.read_bytes().replace(old.encode('utf-8'), new.encode('utf-8')))
+    web.load_data()
@@ -0,0 +1,58 @@
+"""The paged JSON search API and its NDJSON stream."""
+import json
+
+import pytest
+
+import serviceproviderWeb as web
+
+
+def search(client, **args):
+    return client.get('/api/search', query_string=args)
+
+
+def test_pages_cover_the_results_once(client):
+    everything = search(client, query='food', limit=web.API_MAX_PAGE_SIZE).get_json()
+    assert everything['total'] > 10
+
+    ids = []
+    offset = 0
+    while offset is not None:
+        page = search(client, query='food', limit=4, offset=offset).get_json()
+        assert page['total'] == everything['total'] and page['offset'] == offset and page['limit'] == 4
+        ids += [result['id'] for result in page['results']]
+        offset = page['next_offset']
+    assert len(ids) == len(set(ids)) == everything['total']
+    assert ids[:web.API_MAX_PAGE_SIZE] == [result['id'] for result in everything['results']]
+
+
+def test_default_page(client):
+    page = search(client, query='food').get_json()
+    assert page['limit'] == web.API_DEFAULT_PAGE_SIZE
+    assert len(page['results']) == min(page['total'], web.API_DEFAULT_PAGE_SIZE)
+    assert all(set(result) == set(web.API_DEFAULT_SEARCH_FIELDS) for result in page['results'])
+
+
+def test_fields_select_the_resource_attributes(client):
+    results = search(client, query='ymca', fields='id, name,category,details').get_json()['results']
+    resource = web.SNAPSHOT.resources_by_id[results[0]['id']]
+    assert results[0] == {'id': resource.resource_id, 'name': resource.name, 'category': resource.category,
+                          'details': [list(pair) for pair in resource.details]}
+
+
+@pytest.mark.parametrize('args', [{'fields': 'id,secret'}, {'limit': 0}, {'limit': web.API_MAX_PAGE_SIZE + 1},
+                                  {'offset': -1}, {}])
+def test_bad_requests(client, args):
+    response = search(client, **{'query': 'food', **args} if args else args)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('headers, args', [({}, {'format': 'ndjson'}), ({'Accept': 'application/x-ndjson'}, {})])
+def test_ndjson_streams_every_match(client, headers, args):
+    response = client.get('/api/search', query_string={'query': 'food', 'fields': 'id', **args}, headers=headers)
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+    total = int(response.headers['X-Total-Count'])
+    # No page size cap on the stream
+    assert len(lines) == total == search(client, query='food').get_json()['total']
+    assert lines[:3] == search(client, query='food', fields='id', limit=3).get_json()['results']
@@ -0,0 +1,35 @@
+"""Cached pages and search results never outlive the data they were built from."""
+from conftest import edit_csv
+
+import serviceproviderWeb as web
+
+FOOD_PAGE = '/results?query=FOOD&search_type=category'
+
+
+def test_category_page_is_rendered_once(client):
+    client.get(FOOD_PAGE)
+    hits = web.RENDER_CACHE.hits
+    assert client.get(FOOD_PAGE).data == client.get(FOOD_PAGE).data
+    assert web.RENDER_CACHE.hits >= hits + 2
+
+
+def test_reload_replaces_cached_pages(client, live_csv):
+    assert b'BMAC Food Bank' in client.get(FOOD_PAGE).data
+    assert any(key[-1] == web.SNAPSHOT.version for key in web.RENDER_CACHE.entries)
+
+    edit_csv(live_csv, 'BMAC Food Bank', 'BMAC Community Pantry')
+    assert not web.RENDER_CACHE.entries
+    page = client.get(FOOD_PAGE).data
+    assert b'BMAC Community Pantry' in page and b'BMAC Food Bank' not in page
+
+
+def test_search_results_are_cached_per_data_version(client, live_csv):
+    assert client.get('/api/search?query=zucchini').get_json()['total'] == 0
+    hits = web.RESULT_CACHE.hits
+    client.get('/api/search?query=zucchini&limit=5')
+    assert web.RESULT_CACHE.hits == hits + 1
+
+    edit_csv(live_csv, 'BMAC Food Bank', 'BMAC Zucchini Bank')
+    assert all(key[-1] == web.SNAPSHOT.version for key in web.RESULT_CACHE.entries)
+    results = client.get('/api/search?query=zucchini&fields=name').get_json()['results']
+    assert results == [{'name': 'BMAC Zucchini Bank'}]
@@ -0,0 +1,66 @@
+"""Content negotiation of brotli and gzip, and the cache of compressed bodies."""
+import gzip
+
+import pytest
+
+import serviceproviderWeb as web
+
+ENCODINGS = ['gzip'] + (['br'] if web.brotli is not None else [])
+CATEGORY_PAGE = '/results?query=FOOD&search_type=category'
+# Streamed, see render_search()
+KEYWORD_PAGE = '/results?query=food&search_type=keyword'
+
+
+def decompress(body, encoding):
+    return web.brotli.decompress(body) if encoding == 'br' else gzip.decompress(body)
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+@pytest.mark.parametrize('url', [CATEGORY_PAGE, KEYWORD_PAGE, '/api/search?query=food&limit=50'])
+def test_compressed_page_matches_the_plain_one(client, url, encoding):
+    plain = client.get(url)
+    assert plain.content_encoding is None
+
+    response = client.get(url, headers={'Accept-Encoding': f'{encoding}, identity'})
+    assert response.content_encoding == encoding
+    assert 'Accept-Encoding' in response.vary
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + f'-{encoding}"'
+    assert decompress(response.data, encoding) == plain.data
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+@pytest.mark.parametrize('url', [CATEGORY_PAGE, KEYWORD_PAGE])
+def test_compressed_body_is_reused(client, url, encoding):
+    headers = {'Accept-Encoding': encoding}
+    first = client.get(url, headers=headers)
+    etag = first.headers['ETag']
+    assert web.COMPRESSED_CACHE.get(etag.strip('"')) is not None
+
+    hits = web.COMPRESSED_CACHE.hits
+    again = client.get(url, headers=headers)
+    assert web.COMPRESSED_CACHE.hits == hits + 1
+    assert again.content_encoding == encoding
+    assert decompress(again.data, encoding) == decompress(first.data, encoding)
+    assert client.get(url, headers={**headers, 'If-None-Match': etag}).status_code == 304
+
+
+def test_brotli_is_preferred():
+    if web.brotli is None:
+        pytest.skip('Brotli is not installed')
+    with web.app.test_request_context(headers={'Accept-Encoding': 'gzip, deflate, br'}):
+        assert web.accepted_encoding() == 'br'
+
+
+def test_small_and_unaccepted_responses_are_not_compressed(client):
+    resource_id = next(iter(web.SNAPSHOT.resources_by_id))
+    small = client.get(f'/api/resource/{resource_id}?fields=id', headers={'Accept-Encoding': 'gzip'})
+    assert len(small.data) < web.COMPRESS_MIN_BYTES and small.content_encoding is None
+    assert client.get(CATEGORY_PAGE, headers={'Accept-Encoding': 'identity'}).content_encoding is None
+
+
+@pytest.mark.parametrize('encoding', ENCODINGS)
+def test_stylesheet_is_precompressed(client, encoding):
+    response = client.get(f'/assets/style.{web.STYLESHEET_VERSION}.css', headers={'Accept-Encoding': encoding})
+    assert response.content_encoding == encoding
+    assert decompress(response.data, encoding) == web.STYLESHEET_BODIES[None]
+    assert response.cache_control.immutable
@@ -0,0 +1,33 @@
+"""ETags and 304 Not Modified answers to conditional GETs."""
+import pytest
+from conftest import edit_csv
+
+
+@pytest.mark.parametrize('url', ['/', '/results?query=FOOD&search_type=category', '/api/search?query=food',
+                                 '/api/categories'])
+def test_known_etag_gets_304(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+
+def test_etag_names_the_request(client):
+    etags = {client.get(url).headers['ETag'] for url in ('/results?query=FOOD&search_type=category',
+                                                         '/results?query=HEALTH&search_type=category',
+                                                         '/results?query=FOOD&search_type=keyword')}
+    assert len(etags) == 3
+    assert client.get('/', headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_reload_changes_the_etag(client, live_csv):
+    etag = client.get('/').headers['ETag']
+    edit_csv(live_csv, 'BMAC Food Bank', 'BMAC Community Pantry')
+    response = client.get('/', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
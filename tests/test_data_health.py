@@ -0,0 +1,82 @@
+"""The data health checks run on each load before it is published."""
+from conftest import make_sheet_csv, parse_csv
+
+import serviceproviderWeb as web
+
+HELPLINE = {'NAME': 'Helpline', 'DETAILS': 'Food vouchers', 'NUMBER': '509-529-3377', 'WEBSITE': 'helpline.org',
+            'EMAIL ADDRESS': 'info@helpline.org', 'ADDRESS': '408 W Poplar St, Walla Walla, WA 99362'}
+
+
+def test_shipped_sheet_is_accepted(shipped_snapshot):
+    report = web.validate_snapshot(shipped_snapshot)
+    assert report.ok
+    assert report.resources == len(shipped_snapshot.resource_names)
+    assert all(web.DATA_HEALTH_CHECKS[check][0] == 'warning' for check in report.counts)
+
+
+def test_sheet_without_header_row_is_rejected():
+    report = web.validate_snapshot(parse_csv(make_sheet_csv([('FOOD', [HELPLINE])], header=False)))
+    assert not report.ok
+    assert 'missing_headers' in report.errors
+
+
+def test_warnings_are_counted_per_row():
+    snapshot = parse_csv(make_sheet_csv([('FOOD', [
+        HELPLINE,
+        dict(HELPLINE, DETAILS='Rent help', NUMBER='call the front desk'),
+        dict(HELPLINE, NAME='Enclosed Garden Pantry'),
+        dict(HELPLINE, NAME='Food Bank', NUMBER='N/A', DETAILS='Closed on Sundays'),
+    ])]))
+    report = web.validate_snapshot(snapshot)
+
+    assert report.ok
+    assert report.counts['malformed_phone'] == 1
+    assert report.examples['malformed_phone'][0]['value'] == 'call the front desk'
+    assert report.counts['duplicate_name'] == 1
+    assert report.examples['duplicate_name'][0]['name'] == 'Helpline'
+    assert report.counts['closed_inside_word'] == 1
+    assert report.counts['closed_outside_name'] == 1
+    assert 'malformed_website' not in report.counts and 'malformed_email' not in report.counts
+
+
+def test_missing_column_is_a_warning():
+    raw_csv = b'"","","","Community Services- FOOD"\n"NAME","DETAILS:","NUMBER:"\n"Helpline","Food","509-529-3377"\n'
+    report = web.validate_snapshot(parse_csv(raw_csv))
+    assert report.ok
+    assert {example['value'] for example in report.examples['missing_column']} == \
+        set(web.DATA_HEALTH_COLUMNS) - {'NAME', 'NUMBER'}
+
+
+def test_reload_that_loses_most_resources_is_rejected(shipped_snapshot):
+    snapshot = parse_csv(make_sheet_csv([('FOOD', [HELPLINE])]))
+    report = web.validate_snapshot(snapshot, live=shipped_snapshot)
+    assert report.errors == ['resources_dropped']
+
+    assert web.validate_snapshot(shipped_snapshot, live=snapshot).ok
+
+
+def test_load_data_rejects_a_failing_reload(client, live_csv):
+    live = web.SNAPSHOT
+    live_csv.write_bytes(make_sheet_csv([('FOOD', [HELPLINE])]))
+    web.load_data()
+
+    assert web.SNAPSHOT is live
+    assert web.REJECTED_DATA_HEALTH.errors == ['resources_dropped']
+    health = client.get('/api/data-health').get_json()
+    assert health['live']['ok'] and not health['rejected']['ok']
+    assert health['rejected']['resources'] == 1
+    assert client.get('/api/search?query=food').get_json()['total'] > 1
+
+    # The next good reload is published and clears the rejection
+    live_csv.write_bytes(make_sheet_csv([('FOOD', [HELPLINE] * len(live.resources_by_id))]))
+    web.load_data()
+    assert web.SNAPSHOT is not live and web.REJECTED_DATA_HEALTH is None
+    assert client.get('/api/data-health').get_json()['rejected'] is None
+
+
+def test_load_data_rejects_a_sheet_without_headers(live_csv):
+    live = web.SNAPSHOT
+    live_csv.write_bytes(make_sheet_csv([('FOOD', [HELPLINE])], header=False))
+    web.load_data()
+    assert web.SNAPSHOT is live
+    assert 'missing_headers' in web.REJECTED_DATA_HEALTH.errors
@@ -0,0 +1,89 @@
+"""Address parsing and the nearest-first search of the near search."""
+import math
+import random
+
+import pytest
+
+import serviceproviderWeb as web
+
+GAZETTEER_ROWS = [
+    ('99362', 'Walla Walla', 'WA', 46.0646, -118.3430),
+    ('99324', 'College Place', 'WA', 46.0493, -118.3885),
+    ('97862', 'Milton-Freewater', 'OR', 45.9326, -118.3877),
+]
+
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    return web.Gazetteer(GAZETTEER_ROWS, 'test')
+
+
+def address_parts(location):
+    return location.street, location.city, location.state, location.zip_code, location.latitude, location.longitude
+
+
+@pytest.mark.parametrize('address, expected', [
+    ('408 W Poplar St, Walla Walla, WA 99362', ('408 W Poplar St', 'Walla Walla', 'WA', '99362', 46.0646, -118.3430)),
+    # Spread over two lines, as many addresses of the sheet are
+    ('1520 Kelly Place Suite 180\nWalla Walla, WA 99362',
+     ('1520 Kelly Place Suite 180', 'Walla Walla', 'WA', '99362', 46.0646, -118.3430)),
+    # No ZIP code: the town's coordinates, the state spelled out
+    ('85 Main St, Milton-Freewater, Oregon', ('85 Main St', 'Milton-Freewater', 'OR', '', 45.9326, -118.3877)),
+    # No town or state: both come from the ZIP code
+    ('12 NE Rose Ave 99324', ('12 NE Rose Ave', 'College Place', 'WA', '99324', 46.0493, -118.3885)),
+    # A ZIP code missing from the table leaves the address unlocated
+    ('1 Main St, Boise, ID 83702', ('1 Main St, Boise', '', 'ID', '83702', None, None)),
+])
+def test_parse_address(gazetteer, address, expected):
+    assert address_parts(web.parse_address(address, gazetteer)) == expected
+
+
+@pytest.mark.parametrize('address', ['', '   ', 'N/A', 'none'])
+def test_parse_address_without_address(gazetteer, address):
+    assert web.parse_address(address, gazetteer) is None
+
+
+@pytest.fixture(scope='module')
+def scattered_locations():
+    """300 locations around Walla Walla, many sharing a point like resources sharing a ZIP code."""
+    rng = random.Random(0)
+    points = [(46.06 + rng.uniform(-0.5, 0.5), -118.34 + rng.uniform(-0.7, 0.7)) for _ in range(120)]
+    return {index: web.Location('', '', '', '', *rng.choice(points)) for index in range(300)}
+
+
+def nearest_by_hand(grid, locations, latitude, longitude, indices):
+    return sorted((grid.miles(locations[index], latitude, longitude), index) for index in indices)
+
+
+@pytest.mark.parametrize('latitude, longitude', [(46.06, -118.34), (45.5, -119.2), (47.0, -117.0)])
+def test_nearest_matches_sorting_every_distance(scattered_locations, latitude, longitude):
+    grid = web.SpatialGrid(scattered_locations)
+    expected = nearest_by_hand(grid, scattered_locations, latitude, longitude, scattered_locations)
+
+    found = grid.nearest(latitude, longitude)
+    assert [index for _, index in found] == [index for _, index in expected]
+    assert all(math.isclose(a, b) for (a, _), (b, _) in zip(found, expected))
+
+    assert [index for _, index in grid.nearest(latitude, longitude, limit=10)] == \
+        [index for _, index in expected[:10]]
+    within = [index for miles, index in expected if miles <= 15]
+    assert [index for _, index in grid.nearest(latitude, longitude, max_miles=15)] == within
+
+
+def test_nearest_in_mask_and_rank_order(scattered_locations):
+    grid = web.SpatialGrid(scattered_locations)
+    odd = [index for index in scattered_locations if index % 2]
+    expected = nearest_by_hand(grid, scattered_locations, 46.06, -118.34, odd)
+    found = grid.nearest(46.06, -118.34, mask=web.make_bitset(odd), limit=25)
+    assert [index for _, index in found] == [index for _, index in expected[:25]]
+
+    # Equally distant resources come in rank order instead of file order
+    reverse = grid.nearest(46.06, -118.34, rank=lambda index: -index)
+    expected = sorted((grid.miles(location, 46.06, -118.34), -index) for index, location in scattered_locations.items())
+    assert [index for _, index in reverse] == [-index for _, index in expected]
+
+
+def test_nearest_skips_unlocated_resources():
+    locations = {0: web.Location('', '', '', '', None, None), 1: web.Location('', '', '', '', 46.0, -118.0)}
+    assert [index for _, index in web.SpatialGrid(locations).nearest(46.0, -118.0)] == [1]
+    assert web.SpatialGrid({}).nearest(46.0, -118.0) == []
@@ -0,0 +1,21 @@
+"""The stdlib CSV loader, which replaced pandas.read_csv."""
+import io
+
+import pytest
+
+import serviceproviderWeb as web
+
+
+def test_shipped_sheet_rows_match_pandas(shipped_csv):
+    pd = pytest.importorskip('pandas')
+    expected = pd.read_csv(io.BytesIO(shipped_csv), header=None, keep_default_na=False).astype(str).values.tolist()
+    assert web.read_csv_rows(shipped_csv) == expected
+
+
+def test_blank_lines_skipped_and_short_rows_padded():
+    raw_csv = b'\xef\xbb\xbfNAME,DETAILS:,NUMBER:\n\nHelpline,"Food\nvouchers"\nYMCA\n'
+    assert web.read_csv_rows(raw_csv) == [
+        ['NAME', 'DETAILS:', 'NUMBER:'],
+        ['Helpline', 'Food\nvouchers', ''],
+        ['YMCA', '', ''],
+    ]
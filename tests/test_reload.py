@@ -0,0 +1,30 @@
+"""Hot reloads publish a whole new snapshot, or keep serving the current one."""
+import pytest
+from conftest import edit_csv
+
+import serviceproviderWeb as web
+
+
+def test_reload_publishes_the_edited_data(client, live_csv):
+    before = web.SNAPSHOT
+    edit_csv(live_csv, 'BMAC Food Bank', 'BMAC Zucchini Pantry')
+
+    assert web.SNAPSHOT is not before
+    assert 'BMAC Zucchini Pantry' in {resource.name for resource in web.SNAPSHOT.resources}
+    # Snapshots are never modified, so requests still holding the old one see it whole
+    assert 'BMAC Food Bank' in {resource.name for resource in before.resources}
+    assert client.get('/api/search?query=zucchini&fields=name').get_json()['results'] == \
+        [{'name': 'BMAC Zucchini Pantry'}]
+
+
+@pytest.mark.parametrize('contents', [None, b'\xff\xfe not a UTF-8 sheet \xff'])
+def test_unreadable_reload_keeps_the_current_data(client, live_csv, contents):
+    before = web.SNAPSHOT
+    if contents is None:
+        live_csv.unlink()
+    else:
+        live_csv.write_bytes(contents)
+    web.load_data()
+
+    assert web.SNAPSHOT is before
+    assert client.get('/api/search?query=food').get_json()['total'] > 0
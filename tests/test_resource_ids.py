@@ -0,0 +1,46 @@
+"""Stable resource IDs, and the redirects from the old row index links."""
+import pytest
+from conftest import edit_csv
+
+import serviceproviderWeb as web
+
+
+@pytest.mark.parametrize('name', ['211', '2-1-1', '', '!!!', 'Walla Walla YMCA'])
+def test_ids_are_never_all_digits(name):
+    resource_id = web.make_resource_id(name, 'FOOD', 1)
+    assert not resource_id.isdigit()
+    # So the /resource/<int:row_index> route never takes it
+    endpoint, _ = web.app.url_map.bind('').match(f'/resource/{resource_id}')
+    assert endpoint == 'resource_detail'
+
+
+def test_shipped_ids_are_unique_and_not_numbers(shipped_snapshot):
+    ids = [resource.resource_id for resource in shipped_snapshot.resources if resource.resource_id]
+    assert len(ids) == len(set(ids)) == len(shipped_snapshot.resources_by_id)
+    assert not any(resource_id.isdigit() for resource_id in ids)
+
+
+def test_row_links_redirect_permanently(client):
+    row_index, resource_id = next(iter(web.ROW_ID_MAP.items()))
+    response = client.get(f'/resource/{row_index}')
+    assert response.status_code == 301
+    assert response.headers['Location'] == f'/resource/{resource_id}'
+    assert client.get(response.headers['Location']).status_code == 200
+
+    api = client.get(f'/api/resource/{row_index}?fields=name')
+    assert api.status_code == 301
+    assert api.headers['Location'] == f'/api/resource/{resource_id}?fields=name'
+
+
+def test_unknown_row_is_not_found(client):
+    assert b'Resource not found.' in client.get('/resource/999999').data
+    assert client.get('/api/resource/999999').status_code == 404
+
+
+def test_row_links_keep_their_resource_across_reloads(client, live_csv):
+    row_index, resource = next((resource.row_index, resource) for resource in web.SNAPSHOT.resources
+                               if resource.name == 'BMAC Food Bank')
+    # A new first row moves every resource down one row
+    edit_csv(live_csv, 'FUNCTION:,\r\n', 'FUNCTION:,\r\nAdded Provider,Food boxes,509-555-0199,,,,,,\r\n')
+    assert web.SNAPSHOT.resources[row_index].resource_id != resource.resource_id
+    assert client.get(f'/resource/{row_index}').headers['Location'] == f'/resource/{resource.resource_id}'
@@ -0,0 +1,124 @@
+"""Keyword ranking, typo correction and the facet bitsets, on the shipped sheet."""
+import pytest
+
+import serviceproviderWeb as web
+
+
+@pytest.mark.parametrize('a, b, max_edits, expected', [
+    ('FOOD', 'FOOD', 2, 0),
+    ('KITTEN', 'SITTING', 3, 3),
+    # Swapping two neighbouring letters is one edit
+    ('FOOD', 'FODO', 2, 1),
+    ('CONUSELING', 'COUNSELING', 2, 1),
+    # Stops at max_edits + 1
+    ('ABC', 'WXYZ', 1, 2),
+    ('COUNSELING', 'HOUSING', 2, 3),
+])
+def test_edit_distance(a, b, max_edits, expected):
+    assert web.edit_distance(a, b, max_edits) == expected
+
+
+@pytest.mark.parametrize('term, expected', [
+    ('COUNSELNG', 'COUNSELING'),
+    ('CONUSELING', 'COUNSELING'),
+    ('YMAC', 'YMCA'),
+    ('FOOOD', 'FOOD'),
+    ('HOUSNIG', 'HOUSING'),
+    ('ZZZZZZ', None),
+    # Too short to correct, and numbers are only looked up exactly
+    ('XQ', None),
+    ('99361', None),
+])
+def test_correct_term(shipped_snapshot, term, expected):
+    assert web.correct_term(term, shipped_snapshot) == expected
+
+
+@pytest.mark.parametrize('query', ['WALLA', 'WALLA WALLA', 'WASHINGTON', 'COUNTY', 'VALLEY', 'OREGON'])
+def test_place_words_are_ranked(shipped_snapshot, query):
+    assert web.ranked_search(query, shipped_snapshot) != []
+
+
+def test_function_words_fall_back_to_keyword_search(shipped_snapshot):
+    assert web.ranked_search('THE', shipped_snapshot, None) == web.keyword_search('THE', shipped_snapshot)
+
+
+@pytest.mark.parametrize('query', ['FOOD BANK', 'YOUTH COUNSELING', 'MENTAL HEALTH SERVICES', 'WALLA WALLA HOUSING',
+                                   'FAMILY SUPPORT'])
+def test_limited_ranking_is_a_prefix_of_the_full_ranking(shipped_snapshot, query):
+    ranked = [index for index, _ in web.ranked_search(query, shipped_snapshot, None)]
+    for limit in (1, 5, 10, 100):
+        assert [index for index, _ in web.ranked_search(query, shipped_snapshot, limit)] == ranked[:limit]
+
+
+@pytest.mark.parametrize('query', ['WALLA WALLA HOUSING', 'CHILDREN SERVICES', 'FAMILY SUPPORT'])
+def test_ranking_adds_up_the_postings(shipped_snapshot, query):
+    terms = web.get_query_terms(query, shipped_snapshot)
+    assert any(term in shipped_snapshot.rank_dense for term in terms)
+    scores = {}
+    for term in sorted(terms):
+        for index, score in zip(*shipped_snapshot.rank_index[term]):
+            scores[index] = scores.get(index, 0.0) + score
+    expected = sorted(scores, key=lambda index: (-scores[index], index))
+    assert [index for index, _ in web.ranked_search(query, shipped_snapshot, None)] == expected
+
+
+def test_dense_scores_match_the_postings(shipped_snapshot):
+    row_count = len(shipped_snapshot.resources)
+    for term, row_scores in shipped_snapshot.rank_dense.items():
+        indices, scores = shipped_snapshot.rank_index[term]
+        assert len(indices) * web.RANK_DENSE_FRACTION >= row_count
+        assert len(row_scores) == row_count
+        assert {index: row_scores[index] for index in range(row_count) if row_scores[index]} == \
+            dict(zip(indices, scores))
+
+
+def test_bitset_round_trip():
+    indices = [0, 3, 7, 8, 64, 1000]
+    bitset = web.make_bitset(indices)
+    assert web.bitset_indices(bitset) == indices
+    assert web.filter_indices([1000, 5, 8, 2000, 0], bitset) == [1000, 8, 0]
+    assert web.make_bitset([]) == 0
+
+
+def facet_rows_by_hand(snapshot):
+    """The rows of every facet value, read from the resources instead of the bitsets."""
+    named = [resource for resource in snapshot.resources if resource.resource_id]
+    rows = {'category': {}, 'has': {}, 'status': {}}
+    for category in snapshot.categories:
+        rows['category'][category] = {resource.row_index for resource in named if category in resource.category}
+    for value, header in web.FACET_FIELDS.items():
+        rows['has'][value] = {resource.row_index for resource in named
+                              if dict(resource.details).get(header, 'N/A').upper() not in web.FACET_MISSING_VALUES}
+    rows['status']['open'] = {resource.row_index for resource in named if resource.valid}
+    rows['status']['closed'] = {resource.row_index for resource in named if not resource.valid}
+    return rows
+
+
+def test_facet_bitsets_hold_the_matching_resources(shipped_snapshot):
+    by_hand = facet_rows_by_hand(shipped_snapshot)
+    for group, values in shipped_snapshot.facets.items():
+        for value, bitset in values.items():
+            assert set(web.bitset_indices(bitset)) == by_hand[group][value], (group, value)
+
+    # The open resources of a category facet are its button's results
+    for category, rows in by_hand['category'].items():
+        assert rows & by_hand['status']['open'] == \
+            {index for index, _ in shipped_snapshot.category_results[category]}, category
+
+
+@pytest.mark.parametrize('filters', [(), (('has', ('phone',)),), (('has', ('phone', 'email')), ('status', ('open',))),
+                                     (('status', ('open', 'closed')),)])
+def test_count_facets_matches_counting_by_hand(shipped_snapshot, filters):
+    by_hand = facet_rows_by_hand(shipped_snapshot)
+    matches = web.make_bitset(index for index, _ in web.ranked_search('FOOD', shipped_snapshot, None))
+    selected = dict(filters)
+    selected.setdefault('status', web.FACET_DEFAULT_STATUS)
+
+    counts = web.count_facets(shipped_snapshot, matches, filters)
+    for group, values in shipped_snapshot.facets.items():
+        rows = set(web.bitset_indices(matches))
+        for other_group, other_values in selected.items():
+            if other_group != group:
+                rows &= set().union(*(by_hand[other_group][value] for value in other_values))
+        for value in values:
+            assert counts[group][value] == len(rows & by_hand[group][value]), (group, value)
@@ -0,0 +1,57 @@
+"""The background search log of /results and its report."""
+import json
+
+import pytest
+
+import serviceproviderWeb as web
+
+
+@pytest.fixture
+def search_log(tmp_path, monkeypatch):
+    log = web.SearchLog(str(tmp_path / 'searches.jsonl'))
+    monkeypatch.setattr(web, 'SEARCH_LOG', log)
+    return log
+
+
+def get(client, url, **headers):
+    response = client.get(url, headers=headers)
+    # Entries are recorded once the response is closed, after its body was sent
+    response.close()
+    return response
+
+
+def read_entries(log):
+    log.flush()
+    with open(log.path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_searches_are_logged_with_their_hits(client, search_log):
+    page = get(client, '/results?query=youth counseling&search_type=keyword')
+    get(client, '/results?query=youth counseling&search_type=keyword', If_None_Match=page.headers['ETag'])
+    get(client, '/results?query=XQ&search_type=keyword')
+    get(client, '/results?query=FOOD&search_type=category&has=phone')
+    # The prompt for a search term and unknown filters aren't searches
+    get(client, '/results?query=')
+    get(client, '/results?query=FOOD&search_type=category&category=NOWHERE')
+
+    entries = read_entries(search_log)
+    assert [(entry['query'], entry['search_type'], entry['status']) for entry in entries] == [
+        ('YOUTH COUNSELING', 'keyword', 200), ('YOUTH COUNSELING', 'keyword', 304), ('XQ', 'keyword', 200),
+        ('FOOD', 'category', 200)]
+    assert entries[0]['hits'] > 0 and entries[0]['ms'] > 0
+    assert entries[1]['hits'] is None
+    assert entries[2]['hits'] == 0
+    assert entries[3]['filters'] == {'has': ['phone']}
+    assert search_log.written == 4 and search_log.dropped == 0
+
+
+def test_report_counts_top_and_zero_result_queries(client, search_log):
+    for url in ['/results?query=food&search_type=keyword'] * 3 + ['/results?query=XQ&search_type=keyword']:
+        get(client, url)
+    read_entries(search_log)
+
+    report = web.aggregate_search_log(search_log.path)
+    assert report['searches'] == 4 and report['queries'] == 2
+    assert report['top_queries'][0] == {'query': 'FOOD', 'search_type': 'keyword', 'searches': 3}
+    assert report['zero_result_queries'] == [{'query': 'XQ', 'search_type': 'keyword', 'searches': 1}]
@@ -0,0 +1,114 @@
+"""Merging the sheets of a data directory."""
+import hashlib
+import os
+
+from conftest import SHIPPED_CSV, index_values, make_sheet_csv, parse_csv
+
+import serviceproviderWeb as web
+
+FOOD_BANK = {'NAME': 'BMAC Food Bank', 'DETAILS': 'Food boxes', 'NUMBER': '509-555-0100',
+             'ADDRESS': '408 W Poplar St, Walla Walla, WA 99362'}
+HELPLINE = {'NAME': 'Helpline', 'DETAILS': 'Food vouchers', 'NUMBER': '509-529-3377'}
+YMCA = {'NAME': 'YMCA', 'DETAILS': 'Youth programs', 'NUMBER': '509-525-8863'}
+
+
+def write_sheets(tmp_path, *sheets):
+    paths = []
+    for i, blocks in enumerate(sheets):
+        path = tmp_path / f'county-{i}.csv'
+        path.write_bytes(make_sheet_csv(blocks))
+        paths.append(str(path))
+    return [web.parse_sheet(path) for path in paths]
+
+
+def merge(sheets):
+    return web.merge_sheets(sheets, hashlib.sha1(b''.join(sheet.version.encode() for sheet in sheets)).hexdigest(),
+                            None)
+
+
+def test_rows_numbered_sheet_after_sheet(tmp_path):
+    sheets = write_sheets(tmp_path, [('FOOD', [FOOD_BANK])], [('YOUTH', [YMCA])])
+    snapshot = merge(sheets)
+
+    assert len(snapshot.resources) == sum(len(sheet.resources) for sheet in sheets)
+    assert [resource.row_index for resource in snapshot.resources] == list(range(len(snapshot.resources)))
+    assert [resource.name for resource in snapshot.resources if resource.valid] == ['BMAC Food Bank', 'YMCA']
+    assert snapshot.categories == ['FOOD', 'YOUTH']
+    ymca = next(resource for resource in snapshot.resources if resource.name == 'YMCA')
+    assert [index for index, _ in web.ranked_search('YOUTH', snapshot, None)] == [ymca.row_index]
+    assert [index for index, _ in snapshot.category_results['YOUTH']] == [ymca.row_index]
+
+
+def test_provider_listed_in_an_earlier_sheet_is_left_out(tmp_path):
+    sheets = write_sheets(tmp_path, [('FOOD', [FOOD_BANK, HELPLINE])],
+                          [('FOOD', [dict(HELPLINE, DETAILS='Food vouchers and rent help'), YMCA])])
+    snapshot = merge(sheets)
+
+    helplines = [resource for resource in snapshot.resources if resource.name == 'Helpline']
+    assert [(resource.valid, bool(resource.resource_id)) for resource in helplines] == [(True, True), (False, False)]
+    # Its row stays, but no search or index finds it
+    assert [resource.name for _, resource in web.ranked_search('RENT', snapshot, None)] == []
+    assert [resource.name for _, resource in web.ranked_search('VOUCHERS', snapshot, None)] == ['Helpline']
+    assert len(snapshot.resources_by_id) == 3
+
+
+def test_same_name_in_another_category_is_kept_with_its_own_id(tmp_path):
+    sheets = write_sheets(tmp_path, [('FOOD', [HELPLINE])], [('HEALTH', [HELPLINE])])
+    snapshot = merge(sheets)
+
+    helplines = [resource for resource in snapshot.resources if resource.name == 'Helpline']
+    assert all(resource.valid for resource in helplines)
+    assert len({resource.resource_id for resource in helplines}) == 2
+
+
+def test_single_sheet_directory_matches_the_csv(shipped_csv):
+    merged = merge([web.parse_sheet(SHIPPED_CSV)])
+    parsed = parse_csv(shipped_csv)
+
+    assert [resource.snapshot_fields() for resource in merged.resources] == \
+        [resource.snapshot_fields() for resource in parsed.resources]
+    for name in web.SNAPSHOT_INDEXES:
+        assert index_values(getattr(merged, name)) == index_values(getattr(parsed, name)), name
+
+
+def write_directory(tmp_path, *sheets):
+    directory = tmp_path / 'sheets'
+    directory.mkdir()
+    for i, blocks in enumerate(sheets):
+        (directory / f'county-{i}.csv').write_bytes(make_sheet_csv(blocks))
+    return str(directory)
+
+
+def test_edit_after_a_restart_only_parses_the_edited_sheet(tmp_path, monkeypatch):
+    directory = write_directory(tmp_path, [('FOOD', [FOOD_BANK])], [('YOUTH', [YMCA])], [('FOOD', [HELPLINE])])
+    monkeypatch.setattr(web, 'SHEETS', {})
+    web.build_directory_snapshot(directory)
+
+    # A restart reads the snapshot file, so nothing is parsed and SHEETS stays empty
+    web.SHEETS.clear()
+    parsed = []
+    parse_sheets = web.parse_sheets
+    monkeypatch.setattr(web, 'parse_sheets', lambda paths: parsed.extend(paths) or parse_sheets(paths))
+    edited = os.path.join(directory, 'county-1.csv')
+    with open(edited, 'wb') as f:
+        f.write(make_sheet_csv([('YOUTH', [dict(YMCA, DETAILS='Youth programs and swim lessons')])]))
+    snapshot = web.build_directory_snapshot(directory)
+
+    assert parsed == [edited]
+    assert [resource.name for _, resource in web.ranked_search('SWIM', snapshot, None)] == ['YMCA']
+    assert [resource.name for _, resource in web.ranked_search('VOUCHERS', snapshot, None)] == ['Helpline']
+
+
+def test_merging_again_splices_the_placed_sheets(tmp_path):
+    sheets = write_sheets(tmp_path, [('FOOD', [FOOD_BANK, HELPLINE])],
+                          [('FOOD', [dict(HELPLINE, DETAILS='Food vouchers and rent help'), YMCA])])
+    first = merge(sheets)
+    placed = [sheet.placed for sheet in sheets]
+    second = merge(sheets)
+
+    assert all(sheet.placed is sheet_placed for sheet, sheet_placed in zip(sheets, placed))
+    assert placed[1][1] == {next(resource.row_index for resource in sheets[1].resources
+                                 if resource.name == 'Helpline')}
+    for name in web.SNAPSHOT_INDEXES:
+        assert index_values(getattr(second, name)) == index_values(getattr(first, name)), name
+    assert second.locations.keys() == first.locations.keys()
@@ -0,0 +1,49 @@
+"""The snapshot file: a load read back from it gives the snapshot that was saved."""
+from conftest import index_values
+
+import serviceproviderWeb as web
+
+
+def test_round_trip(shipped_snapshot, tmp_path):
+    path = str(tmp_path / 'sheet.csv.snapshot')
+    web.write_snapshot_file(path, shipped_snapshot)
+    restored = web.read_snapshot_file(path, shipped_snapshot.version, ('signature',))
+
+    assert restored.source_signature == ('signature',)
+    assert [(resource.row_index, *resource.snapshot_fields()) for resource in restored.resources] == \
+        [(resource.row_index, *resource.snapshot_fields()) for resource in shipped_snapshot.resources]
+    for name in web.SNAPSHOT_INDEXES:
+        assert index_values(getattr(restored, name)) == index_values(getattr(shipped_snapshot, name)), name
+    assert {index: location.snapshot_fields() for index, location in restored.locations.items()} == \
+        {index: location.snapshot_fields() for index, location in shipped_snapshot.locations.items()}
+    for name in ('headers', 'categories', 'common_keywords', 'facets', 'terms', 'resource_names'):
+        assert getattr(restored, name) == getattr(shipped_snapshot, name), name
+    assert list(restored.resources_by_id) == list(shipped_snapshot.resources_by_id)
+
+    # The rows of a sheet share the header strings of their details again
+    assert len({id(header) for resource in restored.resources for header, _ in resource.details}) == \
+        len({header for resource in restored.resources for header, _ in resource.details})
+    for query in ('FOOD BANK', 'YOUTH COUNSELING', 'WALLA'):
+        ranked = [index for index, _ in web.ranked_search(query, restored, None)]
+        assert ranked and ranked == [index for index, _ in web.ranked_search(query, shipped_snapshot, None)], query
+
+
+def test_other_version_or_format_is_not_read(shipped_snapshot, tmp_path):
+    path = str(tmp_path / 'sheet.csv.snapshot')
+    web.write_snapshot_file(path, shipped_snapshot)
+    assert web.read_snapshot_file(path, '0' * 40, None) is None
+
+    with open(path, 'r+b') as f:
+        magic, _, little_endian, digest, meta_length = web.SNAPSHOT_HEADER.unpack(f.read(web.SNAPSHOT_HEADER.size))
+        f.seek(0)
+        f.write(web.SNAPSHOT_HEADER.pack(magic, web.SNAPSHOT_FORMAT_VERSION - 1, little_endian, digest, meta_length))
+    assert web.read_snapshot_file(path, shipped_snapshot.version, None) is None
+
+
+def test_missing_or_truncated_file_is_not_read(shipped_snapshot, tmp_path):
+    path = tmp_path / 'sheet.csv.snapshot'
+    assert web.read_snapshot_file(str(path), shipped_snapshot.version, None) is None
+
+    web.write_snapshot_file(str(path), shipped_snapshot)
+    path.write_bytes(path.read_bytes()[:web.SNAPSHOT_HEADER.size + 100])
+    assert web.read_snapshot_file(str(path), shipped_snapshot.version, None) is None